@@ -1,12 +1,13 @@
 from dataclasses import dataclass
 from enum import StrEnum
+from functools import cache
 import os
 from pathlib import Path
 import platform
-from subprocess import Popen, PIPE
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
-from sofalite.conf.var_labels import yaml2varlabels
+if TYPE_CHECKING:
+    from sofalite.conf.var_labels import VarLabels
 
 SOFALITE_WEB_RESOURCES_ROOT = 'http://www.sofastatistics.com/sofalite'
 # SOFALITE_WEB_RESOURCES_ROOT = 'file:///home/g/projects/sofalite/src/sofalite/output/js'  ## local development - note tooltips won't work because the pngs aren't in the same place in dev as in prod - don't worry about that
@@ -15,7 +16,9 @@ SOFALITE_FS_RESOURCES_ROOT = Path('/home/g/Documents/sofalite/reports/report_ext
 MAX_CHI_SQUARE_CELLS = 200  ## was 25
 MAX_CHI_SQUARE_VALS_IN_DIM = 30  ## was 6
 MIN_CHI_SQUARE_VALS_IN_DIM = 2
+MAX_EXACT_DPS = 6  ## high precision stats use exact integer arithmetic for data with up to this many decimal places
 MAX_RANK_DATA_VALS = 100_000
+MOMENTS_CHUNK_SIZE = 50_000  ## rows fetched at a time when accumulating moments from values
 MAX_VALUE_LENGTH_IN_SQL_CLAUSE = 90
 
 AVG_LINE_HEIGHT_PIXELS = 12
@@ -66,6 +69,7 @@ PLATFORM = PLATFORMS.get(platform.system())
 def get_local_folder(my_platform: Platform) -> Path:
     home_path = Path(os.path.expanduser('~'))
     if my_platform == Platform.LINUX:  ## see https://bugs.launchpad.net/sofastatistics/+bug/952077
+        from subprocess import Popen, PIPE
         try:
             user_path = Path(str(Popen(['xdg-user-dir', 'DOCUMENTS'],
                 stdout=PIPE).communicate()[0], encoding='utf-8').strip())  ## get output i.e. [0]. err is 2nd.
@@ -76,15 +80,61 @@ def get_local_folder(my_platform: Platform) -> Path:
     local_path = user_path / 'sofalite'
     return local_path
 
-LOCAL_FOLDER = get_local_folder(PLATFORM)
-INTERNAL_FOLDER = LOCAL_FOLDER / '_internal'
-INTERNAL_DATABASE_FPATH = INTERNAL_FOLDER / 'sofalite.db'
-INTERNAL_REPORT_FOLDER = INTERNAL_FOLDER / 'reports'
-CUSTOM_STYLES_FOLDER = LOCAL_FOLDER / 'custom_styles'
-CUSTOM_DBS_FOLDER = LOCAL_FOLDER / 'custom_databases'
+@dataclass(frozen=True)
+class LocalPaths:
+    local_folder: Path
+    internal_folder: Path
+    internal_database_fpath: Path
+    internal_report_folder: Path
+    custom_styles_folder: Path
+    custom_dbs_folder: Path
+
+@cache
+def get_local_paths() -> LocalPaths:
+    """
+    Resolved on first use (not on import) because finding the local folder can mean a subprocess call
+    """
+    local_folder = get_local_folder(PLATFORM)
+    internal_folder = local_folder / '_internal'
+    return LocalPaths(
+        local_folder=local_folder,
+        internal_folder=internal_folder,
+        internal_database_fpath=internal_folder / 'sofalite.db',
+        internal_report_folder=internal_folder / 'reports',
+        custom_styles_folder=local_folder / 'custom_styles',
+        custom_dbs_folder=local_folder / 'custom_databases',
+    )
 
 YAML_FPATH = Path('/home/g/projects/sofalite/store/var_labels.yaml')
-VAR_LABELS = yaml2varlabels(YAML_FPATH)
+
+@cache
+def get_var_labels() -> 'VarLabels':
+    """
+    Parsed on first use (not on import)
+    """
+    from sofalite.conf.var_labels import yaml2varlabels  ## only pay for YAML parsing etc. when labels are needed
+    return yaml2varlabels(YAML_FPATH)
+
+_LAZY_NAME2GETTER = {
+    'LOCAL_FOLDER': lambda: get_local_paths().local_folder,
+    'INTERNAL_FOLDER': lambda: get_local_paths().internal_folder,
+    'INTERNAL_DATABASE_FPATH': lambda: get_local_paths().internal_database_fpath,
+    'INTERNAL_REPORT_FOLDER': lambda: get_local_paths().internal_report_folder,
+    'CUSTOM_STYLES_FOLDER': lambda: get_local_paths().custom_styles_folder,
+    'CUSTOM_DBS_FOLDER': lambda: get_local_paths().custom_dbs_folder,
+    'VAR_LABELS': get_var_labels,
+}
+
+def __getattr__(name: str):
+    """
+    The old module-level constants still work (e.g. from sofalite.conf.main import VAR_LABELS)
+    but are only worked out when first asked for. Library code should call the getters at the point of use.
+    """
+    try:
+        getter = _LAZY_NAME2GETTER[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    return getter()
 
 class DbeName(StrEnum):  ## database engine
     SQLITE = 'sqlite'
@@ -42,15 +42,44 @@ WARNING - if values are integers, and they are being used as categories e.g. in
 then the sort order of the categories will be by the string version of those values e.g. '1', '11', '12', '2', '3' etc.
 If this is not what is desired, then explicit value labels will have to be set in the YAML.
 """
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from functools import cached_property
 from itertools import groupby
 from pathlib import Path
+from typing import Any
 
 from ruamel.yaml import YAML
 
 yaml = YAML(typ='safe')  ## default, if not specified, is 'rt' (round-trip)
 
+def map_all(items, mapping: dict, default: Callable[[Any], Any]):
+    """
+    Map a whole pandas Series, numpy array, or sequence of items in one go.
+    Returns the same sort of thing supplied (Series keep their index and name; other sequences become lists).
+
+    Each distinct item is only looked up once (pd.factorize does the heavy lifting)
+    so there is no per-row Python work no matter how many rows.
+    Missing values (None, NaN) are looked up individually so None and NaN stay distinct (as with dict.get()).
+    """
+    import numpy as np
+    import pandas as pd
+    is_series = isinstance(items, pd.Series)
+    arr = items.to_numpy() if is_series else np.asarray(items, dtype=object)
+    codes, uniques = pd.factorize(arr)  ## missing values get code -1
+    mapped_uniques = np.empty(len(uniques) + 1, dtype=object)  ## extra slot at the end so code -1 has somewhere to land
+    mapped_uniques[:-1] = [mapping.get(unique, default(unique)) for unique in uniques]
+    mapped = mapped_uniques[codes]
+    missing_idxs = np.flatnonzero(codes == -1)
+    if len(missing_idxs):
+        mapped[missing_idxs] = [mapping.get(item, default(item)) for item in arr[missing_idxs]]
+    if is_series:
+        return pd.Series(mapped, index=items.index, name=items.name)
+    elif isinstance(items, np.ndarray):
+        return mapped
+    else:
+        return mapped.tolist()
+
 @dataclass(kw_only=True)
 class VarLabelSpec:
     name: str
@@ -67,6 +96,23 @@ class VarLabelSpec:
             raise ValueError("Different values cannot share the same label. "
                 f"The following labels are used more than once: {duplicate_lbls}")
 
+    @cached_property
+    def lbl2val(self) -> dict[str, int | str]:
+        return {val_lbl: val for val, val_lbl in self.val2lbl.items()}  ## labels are unique (validated)
+
+    def get_val_lbls(self, vals):
+        """
+        E.g. pd.Series([1, 5, 99]) => pd.Series(['< 20', '65+', '99'])
+        Unmapped values become their string representation. See map_all() for what can be supplied.
+        """
+        return map_all(vals, self.val2lbl, default=str)
+
+    def get_vals(self, val_lbls):
+        """
+        Inverse of get_val_lbls. Unmapped labels are left alone.
+        """
+        return map_all(val_lbls, self.lbl2val, default=lambda val_lbl: val_lbl)
+
     @property
     def pandas_var(self) -> str:
         """
@@ -137,6 +183,26 @@ class VarLabels:
         var2val2lbl = {var: var_label_spec.val2lbl for var, var_label_spec in self.var2var_label_spec.items()}
         return var2val2lbl
 
+    @cached_property
+    def var2lbl2val(self) -> dict[str, dict[str, int | str]]:
+        var2lbl2val = {var: var_label_spec.lbl2val for var, var_label_spec in self.var2var_label_spec.items()}
+        return var2lbl2val
+
+    def get_val_lbls(self, var: str, vals):
+        """
+        Values for a variable => value labels (whole Series / array at once - see map_all()).
+        Variables not in the YAML just get string representations of the values.
+        """
+        var_label_spec = self.var2var_label_spec.get(var)
+        val2lbl = var_label_spec.val2lbl if var_label_spec else {}
+        return map_all(vals, val2lbl, default=str)
+
+    def get_vals(self, var: str, val_lbls):
+        """
+        Value labels for a variable => values. Unmapped labels are left alone.
+        """
+        return map_all(val_lbls, self.var2lbl2val.get(var, {}), default=lambda val_lbl: val_lbl)
+
     def __str__(self) -> str:
         return '\n'.join(str(var_lbl_spec) for var_lbl_spec in self.var_label_specs)
 
@@ -1,19 +1,51 @@
 from collections import defaultdict
 from collections.abc import Sequence
 from dataclasses import dataclass
-from itertools import groupby  ## actually quite performant
+from typing import TYPE_CHECKING
 
 from sofalite.conf.main import DbeSpec
 from sofalite.data_extraction.db import ExtendedCursor, get_dbe_spec
 from sofalite.data_extraction.interfaces import CategorySpec
+from sofalite.data_extraction.vector_cache import get_grouped_vals, get_val2idxs
 from sofalite.stats_calc.interfaces import BoxResult, BoxplotType, SortOrder
 from sofalite.stats_calc.utils import get_optimal_axis_bounds
 
+if TYPE_CHECKING:
+    import numpy as np
+
+def _sqlite_order_key(val) -> tuple[int, float | str]:
+    """
+    Numbers before text - the same order as ORDER BY gives us in SQLite
+    """
+    if isinstance(val, (int, float)):
+        return 0, val
+    return 1, str(val)
+
+def _get_sorted_val2idxs(vals: 'np.ndarray') -> dict:
+    """
+    Row indexes for each distinct value - values in the same order as ORDER BY gives us in SQLite
+    """
+    val2idxs = get_val2idxs(vals)
+    return {val: val2idxs[val] for val in sorted(val2idxs, key=_sqlite_order_key)}
+
+def _get_box_vals(vals: 'np.ndarray') -> tuple[Sequence[float], bool]:
+    """
+    Numeric arrays are passed on as is - BoxResult only needs linear-time selection, not a sort.
+    Mixed ints and floats (object arrays) are sorted here so BoxResult can read positions straight off
+    while keeping ints as ints.
+
+    Returns vals, and whether they are sorted
+    """
+    if vals.dtype == object:
+        return sorted(vals.tolist(), key=_sqlite_order_key), True
+    return vals, False
+
 @dataclass(frozen=False)
 class BoxplotCategoryItemValsSpec:
     category_val: float | str  ## e.g. 1
     category_val_lbl: str  ## e.g. Japan
     vals: Sequence[float]
+    vals_are_sorted: bool = False
 
 @dataclass(frozen=False)
 class BoxplotSeriesItemCategoryValsSpecs:
@@ -107,7 +139,8 @@ class BoxplotCategoryValsSpecs:
         box_items = []
         for category_vals_spec in self.category_vals_specs:
             n_records += len(category_vals_spec.vals)
-            box_result = BoxResult(category_vals_spec.vals, self.boxplot_type)
+            box_result = BoxResult(category_vals_spec.vals, self.boxplot_type,
+                is_sorted=category_vals_spec.vals_are_sorted)
             box_item = BoxplotDataItem(
                 box_bottom=box_result.box_bottom,
                 box_bottom_rounded=round(box_result.box_bottom, dp),
@@ -141,33 +174,17 @@ def get_by_category_charting_spec(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src
         category_sort_order: SortOrder = SortOrder.VALUE,
         boxplot_type: BoxplotType = BoxplotType.INSIDE_1_POINT_5_TIMES_IQR) -> BoxplotCategoryValsSpecs:
     category_vals2lbls = {} if category_vals2lbls is None else category_vals2lbls
-    ## prepare items
-    and_tbl_filt_clause = f"AND ({tbl_filt_clause})" if tbl_filt_clause else ''
-    category_fld_name_quoted = dbe_spec.entity_quoter(category_fld_name)
-    src_tbl_name_quoted = dbe_spec.entity_quoter(src_tbl_name)
-    fld_name_quoted = dbe_spec.entity_quoter(fld_name)
-    ## assemble SQL
-    sql = f"""\
-    SELECT
-        {category_fld_name_quoted} AS
-      category_val,
-      {fld_name_quoted}
-    FROM {src_tbl_name_quoted}
-    WHERE {category_fld_name_quoted} IS NOT NULL
-    AND {fld_name_quoted} IS NOT NULL
-    {and_tbl_filt_clause}
-    ORDER BY {category_fld_name_quoted}, {fld_name_quoted}
-    """
     ## get data
-    cur.exe(sql)
-    sorted_data = cur.fetchall()
+    grouped_vals = get_grouped_vals(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
+        fld_name=fld_name, grouping_fld_names=[category_fld_name, ], tbl_filt_clause=tbl_filt_clause)
+    category_vals = grouped_vals.grouping_vals[0]
     ## build result
     category_vals_specs = []
-    for category_val, raw_vals in groupby(sorted_data, lambda t: t[0]):
-        vals = [measure_val for _cat_val, measure_val in raw_vals]
+    for category_val, idxs in _get_sorted_val2idxs(category_vals).items():
+        vals, vals_are_sorted = _get_box_vals(grouped_vals.vals[idxs])
         category_vals_spec = BoxplotCategoryItemValsSpec(
             category_val=category_val, category_val_lbl=category_vals2lbls.get(category_val, str(category_val)),
-            vals=vals,
+            vals=vals, vals_are_sorted=vals_are_sorted,
         )
         category_vals_specs.append(category_vals_spec)
     result = BoxplotCategoryValsSpecs(
@@ -201,7 +218,8 @@ class BoxplotSeriesCategoryValsSpecs:
             box_items = []
             for category_vals_spec in series_item_category_vals_specs.category_vals_specs:
                 n_records += len(category_vals_spec.vals)
-                box_result = BoxResult(category_vals_spec.vals, self.boxplot_type)
+                box_result = BoxResult(category_vals_spec.vals, self.boxplot_type,
+                    is_sorted=category_vals_spec.vals_are_sorted)
                 box_item = BoxplotDataItem(
                     box_bottom=box_result.box_bottom,
                     box_bottom_rounded=round(box_result.box_bottom, dp),
@@ -238,41 +256,21 @@ def get_by_series_category_charting_spec(*, cur: ExtendedCursor, dbe_spec: DbeSp
         category_sort_order: SortOrder = SortOrder.VALUE,
         boxplot_type: BoxplotType = BoxplotType.INSIDE_1_POINT_5_TIMES_IQR) -> BoxplotSeriesCategoryValsSpecs:
     category_vals2lbls = {} if category_vals2lbls is None else category_vals2lbls
-    ## prepare items
-    and_tbl_filt_clause = f"AND ({tbl_filt_clause})" if tbl_filt_clause else ''
-    category_vals2lbls = {} if category_vals2lbls is None else category_vals2lbls
-    fld_name_quoted = dbe_spec.entity_quoter(fld_name)
-    series_fld_name_quoted = dbe_spec.entity_quoter(series_fld_name)
-    category_fld_name_quoted = dbe_spec.entity_quoter(category_fld_name)
-    src_tbl_name_quoted = dbe_spec.entity_quoter(src_tbl_name)
-    ## assemble SQL
-    sql = f"""\
-    SELECT
-        {series_fld_name_quoted} AS
-      series_val,
-        {category_fld_name_quoted} AS
-      category_val,
-      {fld_name_quoted}
-    FROM {src_tbl_name_quoted}
-    WHERE {series_fld_name_quoted} IS NOT NULL
-    AND {category_fld_name_quoted} IS NOT NULL
-    AND {fld_name_quoted} IS NOT NULL
-    {and_tbl_filt_clause}
-    ORDER BY {series_fld_name_quoted}, {category_fld_name_quoted}, {fld_name_quoted}
-    """
     ## get data
-    cur.exe(sql)
-    sorted_data = cur.fetchall()
+    grouped_vals = get_grouped_vals(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
+        fld_name=fld_name, grouping_fld_names=[series_fld_name, category_fld_name], tbl_filt_clause=tbl_filt_clause)
+    series_vals, category_vals = grouped_vals.grouping_vals
     ## build result
     series_category_vals_specs_dict = defaultdict(list)
-    for (series_val, category_val), raw_vals in groupby(sorted_data, lambda t: t[:2]):
+    for series_val, series_idxs in _get_sorted_val2idxs(series_vals).items():
         ## Gather by series
-        vals = [measure_val for _chart_val, _cat_val, measure_val in raw_vals]
-        category_vals_spec = BoxplotCategoryItemValsSpec(
-            category_val=category_val, category_val_lbl=category_vals2lbls.get(category_val, str(category_val)),
-            vals=vals,
-        )
-        series_category_vals_specs_dict[series_val].append(category_vals_spec)
+        for category_val, series_category_idxs in _get_sorted_val2idxs(category_vals[series_idxs]).items():
+            vals, vals_are_sorted = _get_box_vals(grouped_vals.vals[series_idxs[series_category_idxs]])
+            category_vals_spec = BoxplotCategoryItemValsSpec(
+                category_val=category_val, category_val_lbl=category_vals2lbls.get(category_val, str(category_val)),
+                vals=vals, vals_are_sorted=vals_are_sorted,
+            )
+            series_category_vals_specs_dict[series_val].append(category_vals_spec)
     ## make item for each series
     series_category_vals_specs = []
     for series_val, category_vals_specs in series_category_vals_specs_dict.items():
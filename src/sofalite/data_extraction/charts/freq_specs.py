@@ -19,7 +19,6 @@ For example:
 IN: chart_lbl
 OUT: rotate_x_lbls, show_n_records, legend_lbl (as such - might actually be one of the data labels)
 """
-import pandas as pd
 
 from collections.abc import Sequence
 from dataclasses import dataclass
@@ -523,6 +522,7 @@ def get_by_series_category_charting_spec(cur: ExtendedCursor, src_tbl_name: str,
     cur.exe(sql)
     data = cur.fetchall()
     cols = ['series_val', 'category_val', 'freq', 'raw_category_pct']
+    import pandas as pd
     df = pd.DataFrame(data, columns=cols)
     series_category_freq_specs = []
     for series_val in df['series_val'].unique():
@@ -593,6 +593,7 @@ def get_by_chart_category_charting_spec(*, cur: ExtendedCursor, dbe_spec: DbeSpe
     cur.exe(sql)
     data = cur.fetchall()
     cols = ['chart_val', 'category_val', 'freq', 'raw_category_pct']
+    import pandas as pd
     df = pd.DataFrame(data, columns=cols)
     chart_category_freq_specs = []
     for chart_val in df['chart_val'].unique():
@@ -671,6 +672,7 @@ def get_by_chart_series_category_charting_spec(*, cur: ExtendedCursor, dbe_spec:
     cur.exe(sql)
     data = cur.fetchall()
     cols = ['chart_val', 'series_val', 'category_val', 'freq', 'raw_category_pct']
+    import pandas as pd
     df = pd.DataFrame(data, columns=cols)
     chart_series_category_freq_specs = []
     for chart_val in df['chart_val'].unique():
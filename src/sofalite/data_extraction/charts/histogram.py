@@ -5,10 +5,9 @@ Then, using get_bin_freqs(vals, bin_spec), and the common bin_spec, get bin_freq
 from collections.abc import Sequence
 from dataclasses import dataclass
 
-import pandas as pd
-
 from sofalite.conf.main import DbeSpec
 from sofalite.data_extraction.db import ExtendedCursor, get_dbe_spec
+from sofalite.data_extraction.vector_cache import get_grouped_vals, get_val2idxs
 from sofalite.stats_calc.engine import get_normal_ys
 from sofalite.stats_calc.histogram import get_bin_details_from_vals
 
@@ -93,22 +92,10 @@ class HistoValsSpecs:
 def get_by_vals_charting_spec(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
         fld_name: str, fld_lbl: str,
         tbl_filt_clause: str | None = None) -> HistoValsSpec:
-    ## prepare items
-    and_tbl_filt_clause = f"AND ({tbl_filt_clause})" if tbl_filt_clause else ''
-    fld_name_quoted = dbe_spec.entity_quoter(fld_name)
-    src_tbl_name_quoted = dbe_spec.entity_quoter(src_tbl_name)
-    ## assemble SQL
-    sql = f"""\
-    SELECT
-        {fld_name_quoted} AS y
-    FROM {src_tbl_name_quoted}
-    WHERE {fld_name_quoted} IS NOT NULL
-    {and_tbl_filt_clause}
-    """
     ## get data
-    cur.exe(sql)
-    data = cur.fetchall()
-    vals = [row[0] for row in data]
+    grouped_vals = get_grouped_vals(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
+        fld_name=fld_name, tbl_filt_clause=tbl_filt_clause)
+    vals = grouped_vals.vals.tolist()
     ## build result
     data_spec = HistoValsSpec(
         chart_lbl=None,
@@ -122,32 +109,15 @@ def get_by_chart_charting_spec(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tb
         fld_name: str, fld_lbl: str,
         chart_vals2lbls: dict | None,
         tbl_filt_clause: str | None = None) -> HistoValsSpecs:
-    ## prepare items
-    and_tbl_filt_clause = f"AND ({tbl_filt_clause})" if tbl_filt_clause else ''
-    chart_fld_name_quoted = dbe_spec.entity_quoter(chart_fld_name)
-    fld_name_quoted = dbe_spec.entity_quoter(fld_name)
-    src_tbl_name_quoted = dbe_spec.entity_quoter(src_tbl_name)
-    ## assemble SQL
-    sql = f"""\
-    SELECT
-      {chart_fld_name_quoted},
-        {fld_name_quoted} AS
-      y
-    FROM {src_tbl_name_quoted}
-    WHERE {chart_fld_name_quoted} IS NOT NULL
-    AND {fld_name_quoted} IS NOT NULL
-    {and_tbl_filt_clause}
-    """
     ## get data
-    cur.exe(sql)
-    data = cur.fetchall()
-    cols = ['chart_val', 'val']
-    df = pd.DataFrame(data, columns=cols)
+    grouped_vals = get_grouped_vals(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
+        fld_name=fld_name, grouping_fld_names=[chart_fld_name, ], tbl_filt_clause=tbl_filt_clause)
+    chart_vals = grouped_vals.grouping_vals[0]
+    chart_val2idxs = get_val2idxs(chart_vals)
     chart_vals_specs = []
-    for chart_val in df['chart_val'].unique():
+    for chart_val in dict.fromkeys(chart_vals.tolist()):  ## in order of appearance
         chart_lbl = chart_vals2lbls.get(chart_val, chart_val)
-        df_vals = df.loc[df['chart_val'] == chart_val, ['val']]
-        vals = list(df_vals['val'])
+        vals = grouped_vals.vals[chart_val2idxs[chart_val]].tolist()
         vals_spec = HistoValsSpec(
             chart_lbl=chart_lbl,
             fld_lbl=fld_lbl,  ## needed when single chart but redundant / repeated here in multi-chart context
@@ -1,8 +1,6 @@
 from collections.abc import Sequence
 from dataclasses import dataclass
 
-import pandas as pd
-
 from sofalite.conf.main import DbeSpec
 from sofalite.data_extraction.charts.scatterplot import ScatterDataSeriesSpec, ScatterIndivChartSpec
 from sofalite.data_extraction.db import ExtendedCursor, get_dbe_spec
@@ -164,6 +162,7 @@ def get_by_series_xy_charting_spec(*, cur: ExtendedCursor, dbe_spec: DbeSpec, sr
     cur.exe(sql)
     data = cur.fetchall()
     cols = ['series_val', 'x', 'y']
+    import pandas as pd
     df = pd.DataFrame(data, columns=cols)
     ## build result
     series_xy_specs = []
@@ -210,6 +209,7 @@ def get_by_chart_xy_charting_spec(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src
     cur.exe(sql)
     data = cur.fetchall()
     cols = ['charts_val', 'x', 'y']
+    import pandas as pd
     df = pd.DataFrame(data, columns=cols)
     ## build result
     charts_xy_specs = []
@@ -260,6 +260,7 @@ def get_by_chart_series_xy_charting_spec(*, cur: ExtendedCursor, dbe_spec: DbeSp
     cur.exe(sql)
     data = cur.fetchall()
     cols = ['chart_val', 'series_val', 'x', 'y']
+    import pandas as pd
     df = pd.DataFrame(data, columns=cols)
     ## build result
     chart_series_xy_specs = []
@@ -0,0 +1,152 @@
+"""
+Count cubes - all the grouped counts an item (or a whole report's worth of items) needs, from one grouped query.
+
+One query groups by every variable needed (filter applied as usual).
+Each result row is one observed combination of values plus its count i.e. a sparse N-dimensional cube
+(each variable an axis; each distinct value a position along that axis).
+
+For any subset of the variables (e.g. country > gender by browser > agegroup) we sum out the rest
+(np.bincount on the combined codes) to get a small, dense array with one axis per variable.
+
+TOTALs are just sums along an axis so, for every totalled variable, an extra TOTAL slot is appended to the end of its axis
+e.g. agegroup: < 20, 20-29, 30-39, 40-64, 65+, TOTAL. Appending axis by axis means TOTAL x TOTAL etc. come for free.
+
+A cube can hold more variables than an item needs (they are summed out) so items over the same table and filter
+can share one cube - see CountsRequest and get_count_cube (and the report-level planning in output.utils).
+
+numpy is only imported when a cube is actually made or sliced
+so importing this module (e.g. via output.utils) stays light.
+"""
+from collections.abc import Collection, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from sofalite.conf.var_labels import VarLabels
+from sofalite.data_extraction.interfaces import TOTAL
+
+if TYPE_CHECKING:
+    import numpy as np
+
+@dataclass(frozen=True)
+class CountCube:
+    """
+    variables: e.g. ['country', 'gender', 'agegroup', 'browser']
+    var2vals: distinct values for each variable in the order of their codes e.g. {'country': [1, 2, 3], ...}
+    codes: one row per observed combination of values, one column per variable (in the order of variables)
+    freqs: count for each observed combination
+    """
+    variables: list[str]
+    var2vals: dict[str, list]
+    codes: 'np.ndarray'
+    freqs: 'np.ndarray'
+
+    @staticmethod
+    def from_src(cur, *, src_tbl_name: str, tbl_filt_clause: str | None, variables: Sequence[str],
+            debug=False) -> 'CountCube':
+        import numpy as np
+        variables = list(dict.fromkeys(variables))  ## a variable can be used in more than one spec - only need it once
+        flds = ', '.join(variables)
+        sql = f"""\
+        SELECT {flds}, COUNT(*) AS n
+        FROM {src_tbl_name}
+        {tbl_filt_clause or ''}
+        GROUP BY {flds}
+        """
+        if debug: print(f"count cube sql={sql}")
+        cur.exe(sql)
+        data = cur.fetchall()
+        var2vals = {}
+        codes = np.empty((len(data), len(variables)), dtype=np.int64)
+        for i, var in enumerate(variables):
+            val2code = {}  ## values exactly as they came from the database (NULL => None - a group like any other)
+            codes[:, i] = [val2code.setdefault(row[i], len(val2code)) for row in data]
+            var2vals[var] = list(val2code)
+        freqs = np.fromiter((row[-1] for row in data), dtype=np.int64, count=len(data))
+        return CountCube(variables=variables, var2vals=var2vals, codes=codes, freqs=freqs)
+
+    def get_freqs(self, variables: Sequence[str], *, totalled_variables: Collection[str] = ()) -> 'np.ndarray':
+        """
+        Dense array of freqs with one axis per variable (in the order supplied).
+        Every other variable in the cube is summed out.
+        Totalled variables get an extra TOTAL slot on the end of their axis.
+        """
+        import numpy as np
+        idxs = [self.variables.index(var) for var in variables]
+        shape = tuple(len(self.var2vals[var]) for var in variables)
+        flat_idxs = np.ravel_multi_index(tuple(self.codes[:, idx] for idx in idxs), shape) if idxs else np.zeros(
+            len(self.freqs), dtype=np.int64)
+        freqs = np.bincount(flat_idxs, weights=self.freqs, minlength=int(np.prod(shape))).astype(np.int64)
+        freqs = freqs.reshape(shape)
+        for axis, var in enumerate(variables):
+            if var in totalled_variables:
+                freqs = np.concatenate([freqs, freqs.sum(axis=axis, keepdims=True)], axis=axis)
+        return freqs
+
+    def get_data(self, variables: Sequence[str], *, totalled_variables: Collection[str] = ()) -> list[list]:
+        """
+        Long-format rows - one per cell with a count: the value for each variable (TOTAL for a totalled slot)
+        then the count. The same rows the old GROUP BY per combination of totalled variables gave us
+        but sliced from the cube instead of queried.
+        """
+        import numpy as np
+        freqs = self.get_freqs(variables, totalled_variables=totalled_variables)
+        vals_by_var = [self.var2vals[var] + ([TOTAL, ] if var in totalled_variables else []) for var in variables]
+        data = []
+        for idxs in zip(*np.nonzero(freqs)):
+            data.append([vals[idx] for vals, idx in zip(vals_by_var, idxs)] + [int(freqs[idxs])])
+        return data
+
+    def get_val_lbls(self, var: str, var_labels: VarLabels, *, is_totalled: bool) -> list[str]:
+        """
+        Value labels in the order of the positions along the variable's axis (TOTAL last if totalled)
+        """
+        val_lbls = list(var_labels.var2var_label_spec[var].get_val_lbls(self.var2vals[var]))
+        if is_totalled:
+            val_lbls.append(TOTAL)
+        return val_lbls
+
+@dataclass(frozen=True)
+class CountsRequest:
+    """
+    What an item needs (grouped counts over these variables from this table with this filter)
+    rather than how to get it. Lets a planner merge compatible requests into one scan.
+    """
+    src_tbl_name: str
+    tbl_filt_clause: str | None
+    variables: tuple[str, ...]
+
+    @property
+    def scan_key(self) -> tuple[str, str]:
+        return self.src_tbl_name, self.tbl_filt_clause or ''
+
+## cubes already fetched for the item being built e.g. by a report-level plan (scan_key => cube)
+_planned_count_cubes: ContextVar[Mapping[tuple[str, str], CountCube] | None] = ContextVar(
+    'planned_count_cubes', default=None)
+
+@contextmanager
+def planned_count_cubes(scan_key2cube: Mapping[tuple[str, str], CountCube] | None) -> Iterator[None]:
+    """
+    While in this context, get_count_cube() uses these cubes where they cover what is asked for.
+    Context variables are per thread so concurrent items can't see each other's cubes.
+    """
+    token = _planned_count_cubes.set(scan_key2cube)
+    try:
+        yield
+    finally:
+        _planned_count_cubes.reset(token)
+
+def get_count_cube(cur, *, src_tbl_name: str, tbl_filt_clause: str | None, variables: Sequence[str],
+        debug=False) -> CountCube:
+    """
+    Use a planned cube over the same table and filter if it has all the variables; otherwise query for one.
+    """
+    scan_key2cube = _planned_count_cubes.get()
+    if scan_key2cube:
+        cube = scan_key2cube.get(CountsRequest(src_tbl_name, tbl_filt_clause, tuple(variables)).scan_key)
+        if cube is not None and set(variables) <= set(cube.variables):
+            if debug: print(f"Using planned count cube over {cube.variables}")
+            return cube
+    return CountCube.from_src(cur, src_tbl_name=src_tbl_name, tbl_filt_clause=tbl_filt_clause,
+        variables=variables, debug=debug)
@@ -6,11 +6,14 @@ we would need to be able to quote and escape the content.
 Only internal SQLite (for CSV ingestion) requires us to close off cursors and connections.
 Otherwise, that is an external responsibility.
 """
+from dataclasses import fields
+from pathlib import Path
 from textwrap import dedent
+import threading
 
 from ruamel.yaml import YAML
 
-from sofalite.conf.main import CUSTOM_DBS_FOLDER, DbeName, DbeSpec
+from sofalite.conf.main import DbeName, DbeSpec, get_local_paths
 
 yaml = YAML(typ='safe')  ## default, if not specified, is 'rt' (round-trip)
 
@@ -33,8 +36,25 @@ Original SQL:
         method = getattr(self.cur, method_name)
         return method
 
+DBE_SPEC_YAML_KEYS = [fld.name for fld in fields(DbeSpec) if fld.name != 'dbe_name']
+
+def _validate_dbe_yaml_dict(yaml_dict: dict[str, str]):
+    """
+    Check everything at once so a broken definition reports all its problems, not just the first.
+    Empty values (e.g. summable:) come through from YAML as None - treated as empty strings.
+    """
+    if not isinstance(yaml_dict, dict):
+        raise TypeError(f"Expected a mapping of database engine settings but got {type(yaml_dict)}")
+    missing_keys = [key for key in DBE_SPEC_YAML_KEYS if key not in yaml_dict]
+    if missing_keys:
+        raise KeyError(f"Missing database engine settings: {', '.join(missing_keys)}")
+    bad_keys = [key for key in DBE_SPEC_YAML_KEYS if not isinstance(yaml_dict[key], str | None)]
+    if bad_keys:
+        raise TypeError(f"Database engine settings must be strings - check: {', '.join(bad_keys)}")
+
 def _yaml_to_dbe_spec(*, dbe_name: str, yaml_dict: dict[str, str]) -> DbeSpec:
-    y = yaml_dict
+    _validate_dbe_yaml_dict(yaml_dict)
+    y = {key: ('' if val is None else val) for key, val in yaml_dict.items()}
     return DbeSpec(
         dbe_name=dbe_name,
         if_clause=y['if_clause'],
@@ -63,31 +83,76 @@ std_dbe_name2spec = {
     )
 }
 
-def _get_std_dbe_spec(dbe_name: DbeName | str) -> DbeSpec:
-    return std_dbe_name2spec.get(dbe_name)
-
-def get_dbe_spec(dbe_name: str, *, debug=False) -> DbeSpec:
-    if not dbe_name:
-        raise ValueError(f"No dbe_name supplied to get_dbe_spec")
-    dbe_spec = _get_std_dbe_spec(dbe_name)
-    if not dbe_spec:
-        ## look for custom YAML file
-        yaml_fpath = CUSTOM_DBS_FOLDER / f"{dbe_name}.yaml"
-        if not yaml_fpath.exists():
-            raise ValueError(f"Unable to find YAML config for {dbe_name} in {CUSTOM_DBS_FOLDER}")
+def _load_custom_dbe_spec(dbe_name: str, *, custom_dbs_folder: Path, debug=False) -> DbeSpec:
+    ## look for custom YAML file
+    yaml_fpath = custom_dbs_folder / f"{dbe_name}.yaml"
+    if not yaml_fpath.exists():
+        raise ValueError(f"Unable to find YAML config for {dbe_name} in {custom_dbs_folder}")
+    try:
+        yaml_dict = yaml.load(yaml_fpath)
+    except FileNotFoundError as e:
+        e.add_note(f"Unable to open {yaml_fpath} to extract database engine specification for '{dbe_name}'")
+        raise
+    except Exception as e:
+        e.add_note(f"Experienced a problem extracting database engine information from '{yaml_fpath}'")
+        raise
+    else:
+        if debug: print(yaml_dict)
         try:
-            yaml_dict = yaml.load(yaml_fpath)
-        except FileNotFoundError as e:
-            e.add_note(f"Unable to open {yaml_fpath} to extract database engine specification for '{dbe_name}'")
+            dbe_spec = _yaml_to_dbe_spec(dbe_name=dbe_name, yaml_dict=yaml_dict)
+        except (KeyError, TypeError) as e:
+            e.add_note(f"Unable to create database engine spec from '{yaml_fpath}'")
             raise
-        except Exception as e:
-            e.add_note(f"Experienced a problem extracting database engine information from '{yaml_fpath}'")
-            raise
-        else:
-            if debug: print(yaml_dict)
-            try:
-                dbe_spec = _yaml_to_dbe_spec(dbe_name=dbe_name, yaml_dict=yaml_dict)
-            except KeyError as e:
-                e.add_note(f"Unable to create database engine spec from '{yaml_fpath}'")
-                raise
     return dbe_spec
+
+class DbeSpecRegistry:
+    """
+    Database engine specs - built-in ones plus custom ones defined in YAML files in the custom databases folder.
+
+    Custom definitions are read, validated, and turned into (frozen) DbeSpecs the first time they are asked for
+    and then served from memory - get_dbe_spec is called deep inside the extraction code
+    so we don't want file I/O and YAML parsing there.
+    If a YAML file is edited while the process is running, call reload() (or reload_dbe_specs()).
+    """
+    def __init__(self, custom_dbs_folder: Path | None = None):
+        self._custom_dbs_folder = custom_dbs_folder
+        self._lock = threading.Lock()
+        self._dbe_name2spec: dict[str, DbeSpec] = dict(std_dbe_name2spec)
+
+    @property
+    def custom_dbs_folder(self) -> Path:
+        """
+        Default resolved on first use - not when the registry is made on import
+        """
+        return self._custom_dbs_folder or get_local_paths().custom_dbs_folder
+
+    def get(self, dbe_name: str, *, debug=False) -> DbeSpec:
+        if not dbe_name:
+            raise ValueError(f"No dbe_name supplied to get_dbe_spec")
+        dbe_spec = self._dbe_name2spec.get(dbe_name)
+        if not dbe_spec:
+            with self._lock:
+                dbe_spec = self._dbe_name2spec.get(dbe_name)  ## another thread may have got here first
+                if not dbe_spec:
+                    dbe_spec = _load_custom_dbe_spec(dbe_name, custom_dbs_folder=self.custom_dbs_folder, debug=debug)
+                    self._dbe_name2spec[dbe_name] = dbe_spec
+        return dbe_spec
+
+    def reload(self, dbe_name: str | None = None):
+        """
+        Forget custom spec/s so they are re-read next time they are needed. Built-in specs are always kept.
+        If no dbe_name, forget all custom specs.
+        """
+        with self._lock:
+            if dbe_name is None:
+                self._dbe_name2spec = dict(std_dbe_name2spec)
+            elif dbe_name not in std_dbe_name2spec:
+                self._dbe_name2spec.pop(dbe_name, None)
+
+DBE_SPEC_REGISTRY = DbeSpecRegistry()
+
+def get_dbe_spec(dbe_name: str, *, debug=False) -> DbeSpec:
+    return DBE_SPEC_REGISTRY.get(dbe_name, debug=debug)
+
+def reload_dbe_specs(dbe_name: str | None = None):
+    DBE_SPEC_REGISTRY.reload(dbe_name)
@@ -4,6 +4,8 @@ from dataclasses import dataclass
 from enum import StrEnum
 from typing import Any
 
+TOTAL = 'TOTAL'  ## label for a total slot in grouped counts (see count_cube) - also what tables display
+
 ## Data Chart parts - multi-chart, chart, category, then series, containing data points
 ## The higher-level components are only needed by output e.g. ChartingSpec, ChartingSpecAxes, AreaChartingSpec,
 ## LineChartingSpec, and ChartingSpecNoAxes, so they are in output.charts.interfaces
@@ -9,7 +9,7 @@ from collections.abc import Sequence
 from sofalite.conf.main import DbeSpec
 from sofalite.data_extraction.db import ExtendedCursor
 from sofalite.data_extraction.interfaces import ValSpec
-from sofalite.data_extraction.utils import get_sample
+from sofalite.data_extraction.utils import get_sample, get_samples_moments
 from sofalite.stats_calc import interfaces as stats_interfaces, engine
 from sofalite.utils.misc import todict
 
@@ -40,20 +40,31 @@ def get_results(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
     :param numeric measure_fld_lbl: e.g. Weight
     :param numeric measure_fld_name: e.g. weight
     :param high_precision_required: determines whether
-     floating point approach used (much faster, some risk) or Decimal
+     floating point approach used (much faster, some risk) or Decimal.
+     The floating point approach only needs per-group sums from the database (see get_samples_moments)
+     whereas the Decimal approach needs every value.
     """
-    ## build sample results ready for anova function
-    samples = []
-    for grouping_fld_val_spec in grouping_fld_vals_spec:
-        sample = get_sample(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
+    if not high_precision_required:
+        ## only per-group sums are needed - let the database do the work (no values fetched)
+        samples_moments = get_samples_moments(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
             grouping_filt_fld_name=grouping_fld_name,
-            grouping_filt_val_spec=grouping_fld_val_spec,
+            grouping_filt_val_specs=grouping_fld_vals_spec,
             grouping_filt_val_is_numeric=grouping_val_is_numeric,
             measure_fld_name=measure_fld_name, tbl_filt_clause=tbl_filt_clause)
-        samples.append(sample)
-    ## get results
-    anova_results = engine.anova(grouping_fld_lbl, measure_fld_lbl,
-        samples, high=high_precision_required)
+        anova_results = engine.anova_from_moments(grouping_fld_lbl, measure_fld_lbl, samples_moments)
+    else:
+        ## build sample results ready for anova function
+        samples = []
+        for grouping_fld_val_spec in grouping_fld_vals_spec:
+            sample = get_sample(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
+                grouping_filt_fld_name=grouping_fld_name,
+                grouping_filt_val_spec=grouping_fld_val_spec,
+                grouping_filt_val_is_numeric=grouping_val_is_numeric,
+                measure_fld_name=measure_fld_name, tbl_filt_clause=tbl_filt_clause)
+            samples.append(sample)
+        ## get results
+        anova_results = engine.anova(grouping_fld_lbl, measure_fld_lbl,
+            samples, high=high_precision_required)
     anova_results_extended = stats_interfaces.AnovaResultExt(**todict(anova_results),
         group_lbl=grouping_fld_lbl, measure_fld_lbl=measure_fld_lbl)
     return anova_results_extended
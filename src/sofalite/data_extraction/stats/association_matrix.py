@@ -0,0 +1,87 @@
+"""
+Chi Square tests of association (plus Cramér's V) for every pair of a list of categorical variables.
+
+All the counts come from one count cube i.e. one grouped query over every variable (see data_extraction.count_cube)
+- not several queries per pair. Each pair's observed frequencies are sliced from the cube,
+and the expected frequencies, Chi Squares, and p values are calculated for every pair at once (engine.chisquare_tbls).
+As for a single Chi Square test, only records with values for both variables in a pair count towards that pair.
+
+A pair which can't be tested e.g. because a variable has too many separate values
+gets nan results and the reason (in pair2msg) rather than stopping the whole matrix.
+"""
+from collections.abc import Sequence
+from itertools import combinations
+
+import numpy as np
+
+from sofalite.conf.main import MAX_CHI_SQUARE_CELLS, MAX_CHI_SQUARE_VALS_IN_DIM, MIN_CHI_SQUARE_VALS_IN_DIM
+from sofalite.data_extraction.count_cube import CountCube, get_count_cube
+from sofalite.stats_calc import engine
+from sofalite.stats_calc.interfaces import AssociationMatrixResult
+
+def get_cube_filt_clause(tbl_filt_clause: str | None) -> str | None:
+    """
+    Stats specs take the bare condition (e.g. "age > 30") but count cubes take the full clause
+    (same as the tables so a report with both can share the one scan)
+    """
+    return f"WHERE {tbl_filt_clause}" if tbl_filt_clause else None
+
+def get_pair_observed(cube: CountCube, variable_a_name: str, variable_b_name: str) -> tuple[np.ndarray | None, str]:
+    """
+    Observed frequencies for the pair - values of A down, values of B across. Missing values left out.
+    Only values with at least one record (with a value for the other variable as well) are included.
+
+    Returns the observed frequencies (None if the pair can't be tested) and the reason if it can't.
+    """
+    freqs = cube.get_freqs([variable_a_name, variable_b_name])
+    a_idxs = [idx for idx, val in enumerate(cube.var2vals[variable_a_name]) if val is not None]
+    b_idxs = [idx for idx, val in enumerate(cube.var2vals[variable_b_name]) if val is not None]
+    freqs = freqs[np.ix_(a_idxs, b_idxs)]
+    freqs = freqs[freqs.sum(axis=1) > 0][:, freqs.sum(axis=0) > 0]
+    for variable_name, n_vals in [(variable_a_name, freqs.shape[0]), (variable_b_name, freqs.shape[1])]:
+        if n_vals > MAX_CHI_SQUARE_VALS_IN_DIM:
+            return None, (f"Too many separate values ({n_vals} vs "
+                f"maximum allowed of {MAX_CHI_SQUARE_VALS_IN_DIM}) in variable '{variable_name}'")
+        if n_vals < MIN_CHI_SQUARE_VALS_IN_DIM:
+            return None, (f"Not enough separate values ({n_vals} vs "
+                f"minimum allowed of {MIN_CHI_SQUARE_VALS_IN_DIM}) in variable '{variable_name}'")
+    n_cells = freqs.size
+    if n_cells > MAX_CHI_SQUARE_CELLS:
+        return None, (f"Too many cells in Chi Square cross tab ({n_cells:,} "
+            f"vs maximum allowed of {MAX_CHI_SQUARE_CELLS:,})")
+    return freqs, ''
+
+def get_results(cur, *, src_tbl_name: str, tbl_filt_clause: str | None,
+        variable_names: Sequence[str]) -> AssociationMatrixResult:
+    if len(variable_names) < 2:
+        raise ValueError("At least two variables are needed for an association matrix")
+    if len(set(variable_names)) != len(variable_names):
+        raise ValueError(f"Variables can only be included once in an association matrix - {variable_names}")
+    cube = get_count_cube(cur, src_tbl_name=src_tbl_name, tbl_filt_clause=get_cube_filt_clause(tbl_filt_clause),
+        variables=variable_names)
+    ## observed frequencies for every testable pair - padded with zeros to a common shape so one calculation does them all
+    pair_idxs = []
+    observed_tbls = []
+    pair2msg = {}
+    for (idx_a, variable_a_name), (idx_b, variable_b_name) in combinations(enumerate(variable_names), 2):
+        observed, msg = get_pair_observed(cube, variable_a_name, variable_b_name)
+        if observed is None:
+            pair2msg[(variable_a_name, variable_b_name)] = msg
+            continue
+        pair_idxs.append((idx_a, idx_b))
+        observed_tbls.append(observed)
+    n_vars = len(variable_names)
+    matrices = {attr: np.full((n_vars, n_vars), np.nan) for attr in
+        ['chi_squares', 'ps', 'degrees_of_freedom', 'cramers_vs', 'ns', 'minimum_cell_counts', 'pcts_cells_lt_5']}
+    if observed_tbls:
+        max_rows = max(observed.shape[0] for observed in observed_tbls)
+        max_cols = max(observed.shape[1] for observed in observed_tbls)
+        padded_tbls = np.zeros((len(observed_tbls), max_rows, max_cols), dtype=np.int64)
+        for padded_tbl, observed in zip(padded_tbls, observed_tbls):
+            padded_tbl[:observed.shape[0], :observed.shape[1]] = observed
+        tbls_result = engine.chisquare_tbls(padded_tbls)
+        idxs_a, idxs_b = np.array(pair_idxs).T
+        for attr, matrix in matrices.items():
+            matrix[idxs_a, idxs_b] = getattr(tbls_result, attr)
+            matrix[idxs_b, idxs_a] = getattr(tbls_result, attr)
+    return AssociationMatrixResult(variable_names=list(variable_names), pair2msg=pair2msg, **matrices)
@@ -0,0 +1,33 @@
+"""
+Pearson's and Spearman's correlations for every pair of a list of numeric variables
+from one scan of the source data
+"""
+from collections.abc import Sequence
+
+from sofalite.conf.main import DbeSpec
+from sofalite.data_extraction.db import ExtendedCursor
+from sofalite.data_extraction.utils import get_complete_cases_vals
+from sofalite.stats_calc import engine
+from sofalite.stats_calc.interfaces import CorrelationMatrixResult
+
+def get_results(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
+        variable_names: Sequence[str], tbl_filt_clause: str | None = None) -> CorrelationMatrixResult:
+    """
+    Only rows with values for every variable are used (so n is the same for every pair).
+    Running Pearson's R or Spearman's R for a single pair may use more rows.
+    """
+    if len(variable_names) < 2:
+        raise ValueError("A correlation matrix needs at least two variables")
+    if len(set(variable_names)) != len(variable_names):
+        raise ValueError(f"Repeated variable in correlation matrix variables: {variable_names}")
+    vals = get_complete_cases_vals(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
+        fld_names=variable_names, tbl_filt_clause=tbl_filt_clause)
+    n = len(vals)
+    if n < 3:
+        raise Exception(f"Only {n} rows have values for every variable - need at least 3 for a correlation matrix")
+    return CorrelationMatrixResult(
+        variable_names=list(variable_names),
+        n=n,
+        pearsons=engine.pearsonr_matrix(vals),
+        spearmans=engine.spearmansr_matrix(vals),
+    )
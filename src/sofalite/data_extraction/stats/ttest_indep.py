@@ -1,7 +1,7 @@
 from sofalite.conf.main import DbeSpec
 from sofalite.data_extraction.db import ExtendedCursor
 from sofalite.data_extraction.interfaces import ValSpec
-from sofalite.data_extraction.utils import get_sample
+from sofalite.data_extraction.utils import get_samples_moments
 from sofalite.stats_calc import interfaces as stats_interfaces, engine
 from sofalite.utils.misc import todict
 
@@ -31,19 +31,14 @@ def get_results(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
     :param measure_fld_lbl: e.g. Weight
     :param measure_fld_name: e.g. weight
     """
-    ## build samples ready for ttest_indep function
-    sample_a = get_sample(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
+    ## only per-group sums are needed - let the database do the work (no values fetched)
+    sample_a_moments, sample_b_moments = get_samples_moments(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
         grouping_filt_fld_name=grouping_fld_name,
-        grouping_filt_val_spec=group_a_val_spec,
-        grouping_filt_val_is_numeric=grouping_val_is_numeric,
-        measure_fld_name=measure_fld_name, tbl_filt_clause=tbl_filt_clause)
-    sample_b = get_sample(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
-        grouping_filt_fld_name=grouping_fld_name,
-        grouping_filt_val_spec=group_b_val_spec,
+        grouping_filt_val_specs=[group_a_val_spec, group_b_val_spec],
         grouping_filt_val_is_numeric=grouping_val_is_numeric,
         measure_fld_name=measure_fld_name, tbl_filt_clause=tbl_filt_clause)
     ## get results
-    ttest_indep_results = engine.ttest_ind(sample_a, sample_b)
+    ttest_indep_results = engine.ttest_ind_from_moments(sample_a_moments, sample_b_moments)
     ttest_indep_results_extended = stats_interfaces.TTestIndepResultExt(**todict(ttest_indep_results),
         group_lbl=grouping_fld_lbl, measure_fld_lbl=measure_fld_lbl)
     return ttest_indep_results_extended
@@ -1,7 +1,14 @@
-from sofalite.conf.main import DbeName, DbeSpec
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+
+from sofalite.conf.main import MOMENTS_CHUNK_SIZE, DbeName, DbeSpec
 from sofalite.data_extraction.db import ExtendedCursor
 from sofalite.data_extraction.interfaces import ValSpec
-from sofalite.stats_calc.interfaces import PairedData, Sample
+from sofalite.data_extraction.vector_cache import get_grouped_vals
+from sofalite.stats_calc.interfaces import PairedData, Sample, SampleMoments
+from sofalite.stats_calc.moments import MomentsAccumulator
 
 def get_paired_data(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
         variable_a_name: str, variable_b_name: str,
@@ -41,6 +48,48 @@ def get_paired_data(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str
         variable_b_vals=variable_b_vals,
     )
 
+def get_complete_cases_vals(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
+        fld_names: Sequence[str], tbl_filt_clause: str | None = None) -> np.ndarray:
+    """
+    One query for all the fields - only rows with a value for every field (complete cases).
+    Returns n rows x k fields float array, columns in the same order as fld_names.
+    """
+    and_tbl_filt_clause = f"AND {tbl_filt_clause}" if tbl_filt_clause else ''
+    src_tbl_name_quoted = dbe_spec.entity_quoter(src_tbl_name)
+    fld_names_quoted = [dbe_spec.entity_quoter(fld_name) for fld_name in fld_names]
+    not_null_clauses = '\n        AND '.join(f"{fld_name_quoted} IS NOT NULL" for fld_name_quoted in fld_names_quoted)
+    sql_get_vals = f"""\
+        SELECT {', '.join(fld_names_quoted)}
+        FROM {src_tbl_name_quoted}
+        WHERE {not_null_clauses} {and_tbl_filt_clause}"""
+    cur.exe(sql_get_vals)
+    ## SQLite sometimes returns strings even if REAL - numpy converts them along with everything else
+    vals = np.array(cur.fetchall(), dtype=np.float64)
+    return vals.reshape(-1, len(fld_names))
+
+def get_grouping_filt_clause(grouping_filt_fld_name: str, grouping_filt_val: Any, *,
+        grouping_filt_val_is_numeric: bool) -> str:
+    """
+    e.g. gender = 1 or country = 'NZ'
+    """
+    if grouping_filt_val_is_numeric:
+        return f"{grouping_filt_fld_name} = {grouping_filt_val}"
+    return f"{grouping_filt_fld_name} = '{grouping_filt_val}'"
+
+def get_grouping_idx_clause(grouping_filt_fld_name: str, grouping_filt_val_specs: Sequence[ValSpec], *,
+        grouping_filt_val_is_numeric: bool) -> str:
+    """
+    Position of the row's group in grouping_filt_val_specs (NULL if in none of them)
+    - the database matches the rows to the groups so its comparison rules apply
+    (e.g. a TEXT field holding '1' is in group 1) exactly as when filtering to one group at a time.
+    """
+    whens = []
+    for idx, grouping_filt_val_spec in enumerate(grouping_filt_val_specs):
+        grouping_filt_clause = get_grouping_filt_clause(grouping_filt_fld_name, grouping_filt_val_spec.val,
+            grouping_filt_val_is_numeric=grouping_filt_val_is_numeric)
+        whens.append(f"WHEN {grouping_filt_clause} THEN {idx}")
+    return f"CASE {' '.join(whens)} END"
+
 def get_sample(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
         grouping_filt_fld_name: str, grouping_filt_val_spec: ValSpec, grouping_filt_val_is_numeric: bool,
         measure_fld_name: str,
@@ -69,31 +118,143 @@ def get_sample(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
     :param measure_fld_name: e.g. weight
     """
     ## prepare items
-    and_tbl_filt_clause = f"AND {tbl_filt_clause}" if tbl_filt_clause else ''
-    if grouping_filt_val_is_numeric:
-        grouping_filt_clause = f"{grouping_filt_fld_name} = {grouping_filt_val_spec.val}"
-    else:
-        grouping_filt_clause = f"{grouping_filt_fld_name} = '{grouping_filt_val_spec.val}'"
-    and_grouping_filt_clause = f"AND {grouping_filt_clause}"
+    grouping_filt_clause = get_grouping_filt_clause(grouping_filt_fld_name, grouping_filt_val_spec.val,
+        grouping_filt_val_is_numeric=grouping_filt_val_is_numeric)
+    ## get data (all groups at once - shared with other samples, charts etc. via the vector cache)
+    grouped_vals = get_grouped_vals(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
+        fld_name=measure_fld_name, grouping_fld_names=[grouping_filt_fld_name, ], tbl_filt_clause=tbl_filt_clause)
+    group_mask = grouped_vals.get_group_mask(grouping_filt_fld_name, grouping_filt_val_spec.val,
+        grouping_val_is_numeric=grouping_filt_val_is_numeric)
+    sample_vals = grouped_vals.vals[group_mask].tolist()
+    ## coerce into floats because SQLite sometimes returns strings even if REAL TODO: reuse coerce logic and desc
+    if dbe_spec.dbe_name == DbeName.SQLITE:
+        sample_vals = [float(val) for val in sample_vals]
+    if len(sample_vals) < 2:
+        raise Exception(f"Too few {measure_fld_name} values in sample for analysis "
+            f"when getting sample for {grouping_filt_clause}")
+    sample = Sample(lbl=grouping_filt_val_spec.lbl, vals=sample_vals)
+    return sample
+
+def get_samples_moments(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
+        grouping_filt_fld_name: str, grouping_filt_val_specs: Sequence[ValSpec], grouping_filt_val_is_numeric: bool,
+        measure_fld_name: str,
+        tbl_filt_clause: str | None = None) -> list[SampleMoments]:
+    """
+    Moments (n, mean, sums of 2nd, 3rd, and 4th power deviations, min, and max) of the non-missing values
+    in numeric measure field for each group - all from one aggregate query so no values have to be fetched.
+    Enough for t-tests and ANOVA plus the skew, kurtosis, and normality tests for each group.
+
+    The database subtracts each group's mean from every value before summing powers
+    so the sums stay as precise as they would be if we did it ourselves with the values.
+
+    See get_sample for the meaning of the parameters. Samples are in the same order as grouping_filt_val_specs.
+
+    Only SQLite's arithmetic in the aggregate query has been checked. Other database engines stream the values
+    instead (see get_samples_moments_streamed) - same moments, more rows fetched, but still constant memory.
+    """
+    if dbe_spec.dbe_name != DbeName.SQLITE:
+        return get_samples_moments_streamed(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
+            grouping_filt_fld_name=grouping_filt_fld_name, grouping_filt_val_specs=grouping_filt_val_specs,
+            grouping_filt_val_is_numeric=grouping_filt_val_is_numeric, measure_fld_name=measure_fld_name,
+            tbl_filt_clause=tbl_filt_clause)
+    ## prepare items
+    and_tbl_filt_clause = f"AND ({tbl_filt_clause})" if tbl_filt_clause else ''
     src_tbl_name_quoted = dbe_spec.entity_quoter(src_tbl_name)
+    grouping_fld_name_quoted = dbe_spec.entity_quoter(grouping_filt_fld_name)
     measure_fld_name_quoted = dbe_spec.entity_quoter(measure_fld_name)
+    grouping_idx_clause = get_grouping_idx_clause(grouping_fld_name_quoted, grouping_filt_val_specs,
+        grouping_filt_val_is_numeric=grouping_filt_val_is_numeric)
+    src_grouping_idx_clause = get_grouping_idx_clause(f"src.{grouping_fld_name_quoted}", grouping_filt_val_specs,
+        grouping_filt_val_is_numeric=grouping_filt_val_is_numeric)
     ## assemble SQL
-    sql = f"""
-    SELECT {measure_fld_name_quoted}
+    sql = f"""\
+    SELECT grp_idx,
+      COUNT(*) AS n, MAX(grp_mean) AS shift,
+      SUM(d), SUM(d * d), SUM(d * d * d), SUM(d * d * d * d),
+      MIN(measure_val), MAX(measure_val)
+    FROM (
+      SELECT
+        grp_means.grp_idx,
+          src.{measure_fld_name_quoted} AS
+        measure_val,
+        grp_means.grp_mean,
+          src.{measure_fld_name_quoted} - grp_means.grp_mean AS
+        d
+      FROM {src_tbl_name_quoted} AS src
+      INNER JOIN (
+        SELECT {grouping_idx_clause} AS grp_idx, AVG({measure_fld_name_quoted}) AS grp_mean
+        FROM {src_tbl_name_quoted}
+        WHERE {measure_fld_name_quoted} IS NOT NULL
+        AND {grouping_fld_name_quoted} IS NOT NULL
+        {and_tbl_filt_clause}
+        GROUP BY grp_idx
+      ) AS grp_means
+      ON {src_grouping_idx_clause} = grp_means.grp_idx
+      WHERE src.{measure_fld_name_quoted} IS NOT NULL
+      {and_tbl_filt_clause}
+    ) AS deviations
+    GROUP BY grp_idx
+    """
+    ## get data
+    cur.exe(sql)
+    grp_idx2row = {row[0]: row for row in cur.fetchall()}
+    samples_moments = []
+    for grp_idx, grouping_filt_val_spec in enumerate(grouping_filt_val_specs):
+        row = grp_idx2row.get(grp_idx)
+        if row is None or row[1] < 2:
+            grouping_filt_clause = get_grouping_filt_clause(grouping_filt_fld_name, grouping_filt_val_spec.val,
+                grouping_filt_val_is_numeric=grouping_filt_val_is_numeric)
+            raise Exception(f"Too few {measure_fld_name} values in sample for analysis "
+                f"when getting sample for {grouping_filt_clause}")
+        _grp_idx, n, shift, sum_d, sum_d2, sum_d3, sum_d4, sample_min, sample_max = row
+        ## coerce into floats because SQLite sometimes returns strings even if REAL
+        if dbe_spec.dbe_name == DbeName.SQLITE:
+            sample_min, sample_max = float(sample_min), float(sample_max)
+        moments = MomentsAccumulator.from_shifted_sums(n=n, shift=float(shift),
+            sum_d=float(sum_d), sum_d2=float(sum_d2), sum_d3=float(sum_d3), sum_d4=float(sum_d4),
+            sample_min=sample_min, sample_max=sample_max)
+        samples_moments.append(moments.to_sample_moments(grouping_filt_val_spec.lbl))
+    return samples_moments
+
+def get_samples_moments_streamed(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
+        grouping_filt_fld_name: str, grouping_filt_val_specs: Sequence[ValSpec], grouping_filt_val_is_numeric: bool,
+        measure_fld_name: str,
+        tbl_filt_clause: str | None = None, chunk_size: int = MOMENTS_CHUNK_SIZE) -> list[SampleMoments]:
+    """
+    Same as get_samples_moments but the database only supplies the values - a chunk of rows at a time,
+    each chunk folded into a MomentsAccumulator per group. So memory use is constant no matter how big the table.
+    For when the aggregate query isn't an option for the database engine (or its arithmetic can't be trusted).
+    """
+    ## prepare items
+    and_tbl_filt_clause = f"AND ({tbl_filt_clause})" if tbl_filt_clause else ''
+    src_tbl_name_quoted = dbe_spec.entity_quoter(src_tbl_name)
+    grouping_fld_name_quoted = dbe_spec.entity_quoter(grouping_filt_fld_name)
+    measure_fld_name_quoted = dbe_spec.entity_quoter(measure_fld_name)
+    grouping_idx_clause = get_grouping_idx_clause(grouping_fld_name_quoted, grouping_filt_val_specs,
+        grouping_filt_val_is_numeric=grouping_filt_val_is_numeric)
+    ## assemble SQL
+    sql = f"""\
+    SELECT {grouping_idx_clause} AS grp_idx, {measure_fld_name_quoted}
     FROM {src_tbl_name_quoted}
     WHERE {measure_fld_name_quoted} IS NOT NULL
+    AND {grouping_fld_name_quoted} IS NOT NULL
     {and_tbl_filt_clause}
-    {and_grouping_filt_clause}
     """
     ## get data
     cur.exe(sql)
-    data = cur.fetchall()
-    sample_vals = [row[0] for row in data]
-    ## coerce into floats because SQLite sometimes returns strings even if REAL TODO: reuse coerce logic and desc
-    if dbe_spec.dbe_name == DbeName.SQLITE:
-        sample_vals = [float(val) for val in sample_vals]
-    if len(sample_vals) < 2:
-        raise Exception(f"Too few {measure_fld_name} values in sample for analysis "
-            f"when getting sample for {grouping_filt_clause}")
-    sample = Sample(lbl=grouping_filt_val_spec.lbl, vals=sample_vals)
-    return sample
+    accumulators = [MomentsAccumulator() for _grouping_filt_val_spec in grouping_filt_val_specs]
+    while data := cur.fetchmany(chunk_size):
+        grp_idxs = np.array([-1 if row[0] is None else row[0] for row in data], dtype=np.int64)  ## -1 - in no group
+        ## coerce into floats because SQLite sometimes returns strings even if REAL
+        vals = np.array([float(row[1]) for row in data], dtype=np.float64)
+        for grp_idx, accumulator in enumerate(accumulators):
+            accumulator.update(vals[grp_idxs == grp_idx])
+    samples_moments = []
+    for grouping_filt_val_spec, accumulator in zip(grouping_filt_val_specs, accumulators):
+        if accumulator.n < 2:
+            grouping_filt_clause = get_grouping_filt_clause(grouping_filt_fld_name, grouping_filt_val_spec.val,
+                grouping_filt_val_is_numeric=grouping_filt_val_is_numeric)
+            raise Exception(f"Too few {measure_fld_name} values in sample for analysis "
+                f"when getting sample for {grouping_filt_clause}")
+        samples_moments.append(accumulator.to_sample_moments(grouping_filt_val_spec.lbl))
+    return samples_moments
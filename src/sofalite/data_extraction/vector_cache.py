@@ -0,0 +1,272 @@
+"""
+A histogram, a boxplot, an ANOVA, and a t-test over the same measure, grouping variable, and filter
+all need the same raw values. Rather than each pulling them from the database,
+the first one fetches them (as numpy arrays) and the rest reuse them.
+
+The cache is per session (in-process) and keyed on everything which determines the values:
+the data source (e.g. which SQLite database file), table, measure field, grouping field(s), filter,
+and a data version (so changed data is never served stale).
+Total size is kept within a memory budget by dropping the least recently used vectors.
+
+Only SQLite data versions can be determined cheaply and reliably so only SQLite data is cached.
+Everything else is fetched every time exactly as before.
+
+numpy is only imported when values are actually fetched or grouped so importing chart modules stays light.
+"""
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from itertools import count
+import os
+import sqlite3 as sqlite
+import sys
+import threading
+from typing import TYPE_CHECKING, Any
+from weakref import WeakKeyDictionary
+
+from sofalite import logger
+from sofalite.conf.main import DbeSpec
+from sofalite.data_extraction.db import ExtendedCursor
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_VECTOR_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+@dataclass(frozen=True)
+class GroupedVals:
+    """
+    Non-missing values of a measure (in the order the database returned them)
+    plus, for each grouping field, the (non-missing) grouping value of each of those rows.
+
+    grouping_fld_names: e.g. ('gender', )
+    grouping_vals: one array per grouping field e.g. (array([1, 2, 2, 1, ...], dtype=object), )
+    vals: e.g. array([23., 45.5, ...]) - int64 if all ints, float64 if all floats, otherwise object
+    """
+    grouping_fld_names: tuple[str, ...]
+    grouping_vals: tuple['np.ndarray', ...]
+    vals: 'np.ndarray'
+
+    @property
+    def nbytes(self) -> int:
+        arrays = self.grouping_vals + (self.vals, )
+        return sum(_get_array_nbytes(array) for array in arrays)
+
+    def get_group_mask(self, grouping_fld_name: str, grouping_val: Any, *,
+            grouping_val_is_numeric: bool) -> 'np.ndarray':
+        """
+        Same rows as WHERE grouping_fld_name = grouping_val (quoted if not numeric).
+        Compared the way the database compares - against a number, numbers are compared as numbers (so 1 = 1.0)
+        and text as text (so a TEXT field holding '1' matches 1 but '1.0' doesn't).
+        """
+        import numpy as np
+        grouping_vals = self.grouping_vals[self.grouping_fld_names.index(grouping_fld_name)]
+        if not grouping_val_is_numeric:
+            return grouping_vals.astype(str) == str(grouping_val)
+        group_mask = grouping_vals == grouping_val
+        if grouping_vals.dtype == object:
+            is_text = np.fromiter((isinstance(val, str) for val in grouping_vals), dtype=bool, count=len(grouping_vals))
+            if is_text.any():
+                group_mask = np.where(is_text, grouping_vals.astype(str) == str(grouping_val), group_mask)
+        return group_mask
+
+def _get_array_nbytes(array: 'np.ndarray') -> int:
+    nbytes = array.nbytes
+    if array.dtype == object:
+        nbytes += sum(sys.getsizeof(item) for item in array)  ## the Python objects the pointers point at
+    return nbytes
+
+def _to_array(vals: list) -> 'np.ndarray':
+    """
+    Keep the values exactly as they came from the database (ints stay ints etc.) so .tolist() gives them back unchanged
+    """
+    import numpy as np
+    if vals and all(type(val) is int for val in vals):
+        return np.array(vals, dtype=np.int64)
+    if vals and all(type(val) is float for val in vals):
+        return np.array(vals, dtype=np.float64)
+    array = np.empty(len(vals), dtype=object)
+    array[:] = vals
+    return array
+
+def get_val2idxs(vals: 'np.ndarray') -> dict[Any, 'np.ndarray']:
+    """
+    Row indexes for each distinct value (in their original order within each group) - from one pass over the values
+    (np.unique plus one stable argsort) rather than comparing every row against every distinct value.
+    Same groups as vals == val (so e.g. 1 and 1.0 are one group).
+    Keys are in ascending order if numpy can sort the values; otherwise in order of appearance.
+    """
+    import numpy as np
+    try:
+        distinct_vals, codes = np.unique(vals, return_inverse=True)
+    except TypeError:  ## e.g. a mix of numbers and text which can't be compared with <
+        val2code = {}
+        codes = np.fromiter((val2code.setdefault(val, len(val2code)) for val in vals.tolist()),
+            dtype=np.int64, count=len(vals))
+        distinct_vals = list(val2code)
+    else:
+        distinct_vals = distinct_vals.tolist()
+    codes = codes.ravel()
+    idxs_in_group_order = np.argsort(codes, kind='stable')
+    group_ends = np.cumsum(np.bincount(codes, minlength=len(distinct_vals)))
+    return dict(zip(distinct_vals, np.split(idxs_in_group_order, group_ends[:-1])))
+
+@dataclass(frozen=True)
+class VectorKey:
+    data_src: tuple
+    src_tbl_name: str
+    fld_name: str
+    grouping_fld_names: tuple[str, ...]
+    tbl_filt_clause: str
+    data_version: tuple
+
+_in_memory_cur2token: WeakKeyDictionary[sqlite.Cursor, int] = WeakKeyDictionary()
+_in_memory_tokens = count()
+_in_memory_tokens_lock = threading.Lock()
+
+def _get_in_memory_db_token(raw_cur: sqlite.Cursor) -> int:
+    """
+    Identifies an in-memory database for as long as its connection exists - unlike id(con) which a later connection
+    can reuse (and would then be served vectors from a dead database).
+
+    sqlite3 connections can't be weakly referenced but their cursors can, and a live cursor keeps its connection alive.
+    So tokens are held against cursors - shared by every live cursor on the same connection -
+    and dropped along with the cursors. A new connection always gets a new token.
+    """
+    con = raw_cur.connection
+    with _in_memory_tokens_lock:
+        token = _in_memory_cur2token.get(raw_cur)
+        if token is None:
+            token = next((other_token for other_cur, other_token in _in_memory_cur2token.items()
+                if other_cur.connection is con), None)
+            if token is None:
+                token = next(_in_memory_tokens)
+            _in_memory_cur2token[raw_cur] = token
+        return token
+
+def get_data_src_and_version(cur) -> tuple[tuple, tuple] | None:
+    """
+    Which data source a cursor is on, and a version which changes whenever its data might have.
+    None if not known (so don't cache).
+
+    SQLite file: the file path - so different connections to the same file (e.g. report workers) share vectors.
+      The version is the size and modification time of the file (and of any write-ahead log)
+      plus the number of rows this connection has changed (it might have been writing to a temp table).
+    SQLite in-memory: only the connection itself can see the data so that identifies it
+      (by a token never reused by a later connection - see _get_in_memory_db_token).
+    Uncommitted changes are only visible to the connection making them so nothing is cached mid-transaction.
+    """
+    raw_cur = cur
+    while isinstance(raw_cur, ExtendedCursor):
+        raw_cur = raw_cur.cur
+    con = getattr(raw_cur, 'connection', None)
+    if not isinstance(con, sqlite.Connection) or con.in_transaction:
+        return None
+    try:
+        db_fpath = next((row[2] for row in con.execute("PRAGMA database_list") if row[1] == 'main'), '')
+        if not db_fpath:
+            return ('sqlite', _get_in_memory_db_token(raw_cur)), (con.total_changes, )
+        file_stats = []
+        for fpath in (db_fpath, f"{db_fpath}-wal"):
+            try:
+                stat = os.stat(fpath)
+            except FileNotFoundError:
+                file_stats.append(None)
+            else:
+                file_stats.append((stat.st_size, stat.st_mtime_ns))
+    except Exception as e:
+        logger.debug(f"Unable to get data version so not caching. Error: {e}")
+        return None
+    return ('sqlite', db_fpath), (*file_stats, con.total_changes)
+
+class VectorCache:
+    """
+    Least recently used vectors are dropped once max_bytes is exceeded.
+    A single vector bigger than max_bytes is never cached.
+    """
+    def __init__(self, max_bytes: int = DEFAULT_VECTOR_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._key2grouped_vals: OrderedDict[VectorKey, GroupedVals] = OrderedDict()
+        self.n_bytes = 0
+        self.n_hits = 0
+        self.n_misses = 0
+
+    def get(self, key: VectorKey, fetch: Callable[[], GroupedVals]) -> GroupedVals:
+        with self._lock:
+            grouped_vals = self._key2grouped_vals.get(key)
+            if grouped_vals is not None:
+                self._key2grouped_vals.move_to_end(key)
+                self.n_hits += 1
+                return grouped_vals
+            self.n_misses += 1
+        grouped_vals = fetch()  ## not under the lock - a slow query shouldn't hold up everyone else
+        nbytes = grouped_vals.nbytes
+        if nbytes > self.max_bytes:
+            return grouped_vals
+        with self._lock:
+            if key not in self._key2grouped_vals:
+                self._key2grouped_vals[key] = grouped_vals
+                self.n_bytes += nbytes
+            while self.n_bytes > self.max_bytes:
+                _dropped_key, dropped_grouped_vals = self._key2grouped_vals.popitem(last=False)
+                self.n_bytes -= dropped_grouped_vals.nbytes
+        return grouped_vals
+
+    def set_max_bytes(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self.n_bytes > self.max_bytes:
+                _dropped_key, dropped_grouped_vals = self._key2grouped_vals.popitem(last=False)
+                self.n_bytes -= dropped_grouped_vals.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._key2grouped_vals.clear()
+            self.n_bytes = 0
+
+VECTOR_CACHE = VectorCache()
+
+def _get_uncached_grouped_vals(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
+        fld_name: str, grouping_fld_names: tuple[str, ...], tbl_filt_clause: str | None) -> GroupedVals:
+    src_tbl_name_quoted = dbe_spec.entity_quoter(src_tbl_name)
+    fld_name_quoted = dbe_spec.entity_quoter(fld_name)
+    grouping_fld_names_quoted = [dbe_spec.entity_quoter(grouping_fld_name) for grouping_fld_name in grouping_fld_names]
+    select_flds = ', '.join(grouping_fld_names_quoted + [fld_name_quoted, ])
+    and_not_null_clauses = ''.join(
+        f"\n    AND {grouping_fld_name_quoted} IS NOT NULL" for grouping_fld_name_quoted in grouping_fld_names_quoted)
+    and_tbl_filt_clause = f"AND ({tbl_filt_clause})" if tbl_filt_clause else ''
+    sql = f"""\
+    SELECT {select_flds}
+    FROM {src_tbl_name_quoted}
+    WHERE {fld_name_quoted} IS NOT NULL{and_not_null_clauses}
+    {and_tbl_filt_clause}
+    """
+    cur.exe(sql)
+    data = cur.fetchall()
+    n_grouping_flds = len(grouping_fld_names)
+    grouping_vals = tuple(_to_array([row[i] for row in data]) for i in range(n_grouping_flds))
+    grouping_vals = tuple(array.astype(object) for array in grouping_vals)  ## compared against values of any type
+    vals = _to_array([row[n_grouping_flds] for row in data])
+    return GroupedVals(grouping_fld_names=grouping_fld_names, grouping_vals=grouping_vals, vals=vals)
+
+def get_grouped_vals(*, cur: ExtendedCursor, dbe_spec: DbeSpec, src_tbl_name: str,
+        fld_name: str, grouping_fld_names: Sequence[str] = (), tbl_filt_clause: str | None = None,
+        vector_cache: VectorCache | None = VECTOR_CACHE) -> GroupedVals:
+    """
+    Non-missing values of fld_name (only from rows where no grouping field is missing either) - from the cache
+    if possible. Supply vector_cache=None to always go to the database.
+    """
+    grouping_fld_names = tuple(grouping_fld_names)
+    fetch = lambda: _get_uncached_grouped_vals(cur=cur, dbe_spec=dbe_spec, src_tbl_name=src_tbl_name,
+        fld_name=fld_name, grouping_fld_names=grouping_fld_names, tbl_filt_clause=tbl_filt_clause)
+    data_src_and_version = get_data_src_and_version(cur) if vector_cache is not None else None
+    if data_src_and_version is None:
+        return fetch()
+    data_src, data_version = data_src_and_version
+    key = VectorKey(data_src=data_src, src_tbl_name=src_tbl_name, fld_name=fld_name,
+        grouping_fld_names=grouping_fld_names, tbl_filt_clause=tbl_filt_clause or '', data_version=data_version)
+    return vector_cache.get(key, fetch)
+
+def clear_vector_cache():
+    VECTOR_CACHE.clear()
@@ -2,7 +2,9 @@ from pathlib import Path
 from webbrowser import open_new_tab
 
 from sofalite.output.stats.anova import AnovaSpec
+from sofalite.output.stats.association_matrix import AssociationMatrixSpec
 from sofalite.output.stats.chi_square import ChiSquareSpec
+from sofalite.output.stats.correlation_matrix import CorrelationMatrixSpec
 from sofalite.output.stats.pearsonsr import PearsonsRSpec
 from sofalite.output.stats.spearmansr import SpearmansRSpec
 from sofalite.output.stats.ttest_indep import TTestIndepSpec
@@ -87,6 +89,34 @@ def run_spearmansr():
     html_item_spec.to_file(fpath, "Spearman's R Test")
     open_new_tab(url=f"file://{fpath}")
 
+def run_correlation_matrix():
+    stats = CorrelationMatrixSpec(
+        style_name='default',
+        src_tbl_name='demo_tbl',
+        variable_names=['age', 'weight', 'car'],
+        tbl_filt_clause=None,
+        cur=None,
+        dp=3,
+    )
+    html_item_spec = stats.to_html_spec()
+    fpath = Path('/home/g/Documents/sofalite/reports/correlation_matrix.html')
+    html_item_spec.to_file(fpath, 'Correlation Matrix')
+    open_new_tab(url=f"file://{fpath}")
+
+def run_association_matrix():
+    stats = AssociationMatrixSpec(
+        style_name='default',
+        src_tbl_name='demo_tbl',
+        variable_names=['agegroup', 'country', 'gender', 'browser'],
+        tbl_filt_clause=None,
+        cur=None,
+        dp=3,
+    )
+    html_item_spec = stats.to_html_spec()
+    fpath = Path('/home/g/Documents/sofalite/reports/association_matrix.html')
+    html_item_spec.to_file(fpath, 'Association Matrix')
+    open_new_tab(url=f"file://{fpath}")
+
 if __name__ == '__main__':
     pass
     # run_anova()
@@ -94,3 +124,5 @@ if __name__ == '__main__':
     # run_chi_square()
     # run_pearsonsr()
     run_spearmansr()
+    # run_correlation_matrix()
+    # run_association_matrix()
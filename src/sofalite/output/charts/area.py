@@ -1,22 +1,22 @@
 from dataclasses import astuple, dataclass
 from pathlib import Path
 from typing import Any
-import uuid
 
 import jinja2
 
-from sofalite.conf.main import VAR_LABELS
+from sofalite.conf.main import get_var_labels
 from sofalite.data_extraction.charts.freq_specs import get_by_chart_category_charting_spec
 from sofalite.output.charts.common import (
     get_common_charting_spec, get_html, get_indiv_chart_html,get_line_area_misc_spec)
 from sofalite.output.charts.interfaces import (
     AreaChartingSpec, DojoSeriesSpec, IndivChartSpec, JSBool, LeftMarginOffsetSpec, LineArea, PlotStyle)
+from sofalite.output.charts.utils import JSDataSerialiser
 from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
 from sofalite.output.styles.interfaces import StyleSpec
 from sofalite.output.styles.utils import get_style_spec
 from sofalite.stats_calc.interfaces import SortOrder
 from sofalite.utils.maths import format_num
-from sofalite.utils.misc import todict
+from sofalite.utils.misc import ELEMENT_ID_PLACEHOLDER, set_stable_element_id, todict
 
 @dataclass(frozen=True)
 class CommonColourSpec(LineArea.CommonColourSpec):
@@ -60,6 +60,7 @@ def get_common_charting_spec(charting_spec: AreaChartingSpec, style_specs: Style
     )
     misc_spec = get_line_area_misc_spec(charting_spec, style_specs, legend_lbl, left_margin_offset_spec)
     options = LineArea.CommonOptions(
+        js_data_conf=charting_spec.js_data_conf,
         has_micro_ticks_js_bool=has_micro_ticks_js_bool,
         has_minor_ticks_js_bool=has_minor_ticks_js_bool,
         is_multi_chart=charting_spec.is_multi_chart,
@@ -83,26 +84,27 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
     context.update(todict(common_charting_spec.options, shallow=True))
     if not common_charting_spec.options.is_single_series:
         raise Exception("Area charts must be single series charts")
-    chart_uuid = str(uuid.uuid4()).replace('-', '_')  ## needs to work in JS variable names
+    chart_uuid = ELEMENT_ID_PLACEHOLDER  ## swapped for an id derived from the rendered chart - so same chart, same bytes
     page_break = 'page-break-after: always;' if chart_counter % 2 == 0 else ''
     indiv_title_html = (f"<p><b>{indiv_chart_spec.lbl}</b></p>" if common_charting_spec.options.is_multi_chart else '')
     n_records = 'N = ' + format_num(indiv_chart_spec.n_records) if common_charting_spec.options.show_n_records else ''
     ## the standard series
+    js_data = JSDataSerialiser(common_charting_spec.options.js_data_conf)
     dojo_series_specs = []
     marker_plot_style = PlotStyle.DEFAULT if common_charting_spec.options.show_markers else PlotStyle.UNMARKED
     only_series = indiv_chart_spec.data_series_specs[0]
     series_id = '00'
     series_lbl = only_series.lbl
     if common_charting_spec.options.is_time_series:
-        series_vals = LineArea.get_time_series_vals(common_charting_spec.misc_spec.x_axis_specs,
-            only_series.amounts, common_charting_spec.misc_spec.x_axis_title)
+        series_vals = js_data.dicts(LineArea.get_time_series_xys(common_charting_spec.misc_spec.x_axis_specs,
+            only_series.amounts, common_charting_spec.misc_spec.x_axis_title))
     else:
-        series_vals = str(only_series.amounts)
+        series_vals = js_data.nums(only_series.amounts)
     ## options
-    ## e.g. {stroke: {color: '#e95f29', width: '6px'}, yLbls: ['x-val: 2016-01-01<br>y-val: 12<br>0.8%', ... ], plot: 'default'};
+    ## e.g. {stroke: {color: '#e95f29', width: '6px'}, yLbls: ["x-val: 2016-01-01<br>y-val: 12<br>0.8%", ... ], plot: 'default'};
     line_colour = common_charting_spec.colour_spec.line
     fill_colour = common_charting_spec.colour_spec.fill
-    y_lbls_str = str(only_series.tooltips)
+    y_lbls_str = js_data.strs(only_series.tooltips)
     options = (f"""{{stroke: {{color: "{line_colour}", width: "6px"}}, """
         f"""fill: "{fill_colour}", """
         f"""yLbls: {y_lbls_str}, plot: "{marker_plot_style}"}}""")
@@ -111,13 +113,14 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
         'chart_uuid': chart_uuid,
         'dojo_series_specs': dojo_series_specs,
         'indiv_title_html': indiv_title_html,
+        'lookup_strs': js_data.lookup_strs,
         'n_records': n_records,
         'page_break': page_break,
     }
     context.update(indiv_context)
     environment = jinja2.Environment()
     template = environment.from_string(LineArea.tpl_chart)
-    html_result = template.render(context)
+    html_result = set_stable_element_id(template.render(context), chart_counter)
     return html_result
 
 @dataclass(frozen=False)
@@ -148,10 +151,11 @@ class AreaChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        chart_fld_lbl = VAR_LABELS.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
-        category_fld_lbl = VAR_LABELS.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
-        chart_vals2lbls = VAR_LABELS.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
-        category_vals2lbls = VAR_LABELS.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
+        var_labels = get_var_labels()
+        chart_fld_lbl = var_labels.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
+        category_fld_lbl = var_labels.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
+        chart_vals2lbls = var_labels.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
+        category_vals2lbls = var_labels.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
         ## data
         intermediate_charting_spec = get_by_chart_category_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
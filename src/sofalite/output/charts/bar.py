@@ -2,26 +2,25 @@ from collections.abc import Collection, Sequence
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Literal
-import uuid
 
 import jinja2
 
 from sofalite.conf.main import (
-    AVG_CHAR_WIDTH_PIXELS, MIN_CHART_WIDTH_PIXELS, TEXT_WIDTH_WHEN_ROTATED, VAR_LABELS)
+    AVG_CHAR_WIDTH_PIXELS, MIN_CHART_WIDTH_PIXELS, TEXT_WIDTH_WHEN_ROTATED, get_var_labels)
 from sofalite.data_extraction.charts.freq_specs import (get_by_category_charting_spec,
     get_by_chart_category_charting_spec, get_by_chart_series_category_charting_spec,
     get_by_series_category_charting_spec)
 from sofalite.output.charts.common import get_common_charting_spec, get_html, get_indiv_chart_html
 from sofalite.output.charts.interfaces import (
-    ChartingSpecAxes, DojoSeriesSpec, IndivChartSpec, JSBool, LeftMarginOffsetSpec)
-from sofalite.output.charts.utils import (get_axis_lbl_drop, get_left_margin_offset, get_height,
+    ChartingSpecAxes, DojoSeriesSpec, IndivChartSpec, JSBool, JSDataConf, LeftMarginOffsetSpec)
+from sofalite.output.charts.utils import (JSDataSerialiser, get_axis_lbl_drop, get_left_margin_offset, get_height,
     get_x_axis_lbls_val_and_text, get_x_axis_font_size, get_y_axis_title_offset)
 from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
 from sofalite.output.styles.interfaces import ColourWithHighlight, StyleSpec
 from sofalite.output.styles.utils import get_long_colour_list, get_style_spec
 from sofalite.stats_calc.interfaces import SortOrder
 from sofalite.utils.maths import format_num
-from sofalite.utils.misc import todict
+from sofalite.utils.misc import ELEMENT_ID_PLACEHOLDER, set_stable_element_id, todict
 
 MIN_PIXELS_PER_X_ITEM = 60
 MIN_CLUSTER_WIDTH_PIXELS = 60
@@ -54,8 +53,9 @@ class SimpleBarChartSpec(Source):
         ## style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        category_fld_lbl = VAR_LABELS.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
-        category_vals2lbls = VAR_LABELS.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
+        var_labels = get_var_labels()
+        category_fld_lbl = var_labels.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
+        category_vals2lbls = var_labels.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
         ## data
         intermediate_charting_spec = get_by_category_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
@@ -111,10 +111,11 @@ class MultiBarChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        chart_fld_lbl = VAR_LABELS.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
-        category_fld_lbl = VAR_LABELS.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
-        chart_vals2lbls = VAR_LABELS.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
-        category_vals2lbls = VAR_LABELS.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
+        var_labels = get_var_labels()
+        chart_fld_lbl = var_labels.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
+        category_fld_lbl = var_labels.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
+        chart_vals2lbls = var_labels.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
+        category_vals2lbls = var_labels.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
         ## data
         intermediate_charting_spec = get_by_chart_category_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
@@ -171,10 +172,11 @@ class ClusteredBarChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        series_fld_lbl = VAR_LABELS.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
-        category_fld_lbl = VAR_LABELS.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
-        series_vals2lbls = VAR_LABELS.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
-        category_vals2lbls = VAR_LABELS.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
+        var_labels = get_var_labels()
+        series_fld_lbl = var_labels.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
+        category_fld_lbl = var_labels.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
+        series_vals2lbls = var_labels.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
+        category_vals2lbls = var_labels.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
         ## data
         intermediate_charting_spec = get_by_series_category_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
@@ -232,12 +234,13 @@ class MultiClusteredBarChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        chart_fld_lbl = VAR_LABELS.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
-        series_fld_lbl = VAR_LABELS.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
-        category_fld_lbl = VAR_LABELS.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
-        series_vals2lbls = VAR_LABELS.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
-        chart_vals2lbls = VAR_LABELS.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
-        category_vals2lbls = VAR_LABELS.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
+        var_labels = get_var_labels()
+        chart_fld_lbl = var_labels.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
+        series_fld_lbl = var_labels.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
+        category_fld_lbl = var_labels.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
+        series_vals2lbls = var_labels.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
+        chart_vals2lbls = var_labels.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
+        category_vals2lbls = var_labels.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
         ## data
         intermediate_charting_spec = get_by_chart_series_category_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
@@ -287,6 +290,7 @@ class CommonColourSpec:
 
 @dataclass(frozen=True)
 class CommonOptions:
+    js_data_conf: JSDataConf
     has_minor_ticks_js_bool: Literal['true', 'false']
     is_multi_chart: bool
     show_borders: bool
@@ -336,6 +340,7 @@ var highlight_{{chart_uuid}} = function(colour){
 
 make_chart_{{chart_uuid}} = function(){
 
+    var lookup_strs = {{lookup_strs}};
     var series = new Array();
     {% for series_spec in dojo_series_specs %}
       var series_{{series_spec.series_id}} = new Array();
@@ -376,7 +381,7 @@ make_chart_{{chart_uuid}} = function(){
 
 <div class="screen-float-only" style="margin-right: 10px; {{page_break}}">
 {{indiv_title_html}}
-    <div id="bar_chart_{{chart_uuid}}"
+    <div id="bar_chart_{{chart_uuid}}" data-make-chart="make_chart_{{chart_uuid}}"
         style="width: {{width}}px; height: {{height}}px;">
     </div>
     {% if legend_lbl %}
@@ -512,6 +517,7 @@ def get_common_charting_spec(charting_spec: BarChartingSpec, style_spec: StyleSp
         y_axis_title_offset=y_axis_title_offset,
     )
     options = CommonOptions(
+        js_data_conf=charting_spec.js_data_conf,
         has_minor_ticks_js_bool=has_minor_ticks_js_bool,
         is_multi_chart=charting_spec.is_multi_chart,
         show_borders=charting_spec.show_borders,
@@ -529,18 +535,19 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
     context = todict(common_charting_spec.colour_spec, shallow=True)
     context.update(todict(common_charting_spec.misc_spec, shallow=True))
     context.update(todict(common_charting_spec.options, shallow=True))
-    chart_uuid = str(uuid.uuid4()).replace('-', '_')  ## needs to work in JS variable names
+    chart_uuid = ELEMENT_ID_PLACEHOLDER  ## swapped for an id derived from the rendered chart - so same chart, same bytes
     page_break = 'page-break-after: always;' if chart_counter % 2 == 0 else ''
     indiv_title_html = f"<p><b>{indiv_chart_spec.lbl}</b></p>" if common_charting_spec.options.is_multi_chart else ''
     n_records = 'N = ' + format_num(indiv_chart_spec.n_records) if common_charting_spec.options.show_n_records else ''
+    js_data = JSDataSerialiser(common_charting_spec.options.js_data_conf)
     dojo_series_specs = []
     for i, data_series_spec in enumerate(indiv_chart_spec.data_series_specs):
         series_id = f"{i:>02}"
         series_lbl = data_series_spec.lbl
-        series_vals = str(data_series_spec.amounts)
-        ## options e.g. {stroke: {color: "white", width: "0px"}, fill: "#e95f29", yLbls: ['66.38', ...]}
+        series_vals = js_data.nums(data_series_spec.amounts)
+        ## options e.g. {stroke: {color: "white", width: "0px"}, fill: "#e95f29", yLbls: ["66.38", ...]}
         fill_colour = common_charting_spec.colour_spec.colours[i]
-        y_lbls_str = str(data_series_spec.tooltips)
+        y_lbls_str = js_data.strs(data_series_spec.tooltips)
         options = (f"""{{stroke: {{color: "white", width: "{common_charting_spec.misc_spec.stroke_width}px"}}, """
             f"""fill: "{fill_colour}", yLbls: {y_lbls_str}}}""")
         dojo_series_specs.append(DojoSeriesSpec(series_id, series_lbl, series_vals, options))
@@ -548,11 +555,12 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
         'chart_uuid': chart_uuid,
         'dojo_series_specs': dojo_series_specs,
         'indiv_title_html': indiv_title_html,
+        'lookup_strs': js_data.lookup_strs,
         'n_records': n_records,
         'page_break': page_break,
     }
     context.update(indiv_context)
     environment = jinja2.Environment()
     template = environment.from_string(tpl_chart)
-    html_result = template.render(context)
+    html_result = set_stable_element_id(template.render(context), chart_counter)
     return html_result
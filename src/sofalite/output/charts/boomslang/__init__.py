@@ -1,6 +0,0 @@
-__all__ = [
-    "Bar", "Plot", "PlotLayout", "Scatter", "ClusteredBars",
-    "PlotInfo", "Line", "Utils", "StackedBars", "Label", ]
-
-for __mySrcDir__ in __all__:
-    exec(f"from . {__mySrcDir__} import *")
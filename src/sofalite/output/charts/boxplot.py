@@ -2,24 +2,23 @@ from collections.abc import Sequence
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
-import uuid
 
 import jinja2
 
-from sofalite.conf.main import AVG_CHAR_WIDTH_PIXELS, TEXT_WIDTH_WHEN_ROTATED, VAR_LABELS
+from sofalite.conf.main import AVG_CHAR_WIDTH_PIXELS, TEXT_WIDTH_WHEN_ROTATED, get_var_labels
 from sofalite.data_extraction.charts.boxplot import (
     BoxplotChartingSpec, BoxplotIndivChartSpec, get_by_category_charting_spec, get_by_series_category_charting_spec)
 from sofalite.output.charts.common import get_common_charting_spec, get_html, get_indiv_chart_html
-from sofalite.output.charts.interfaces import JSBool, LeftMarginOffsetSpec
+from sofalite.output.charts.interfaces import JSBool, JSDataConf, LeftMarginOffsetSpec
 from sofalite.output.charts.utils import (
-    get_axis_lbl_drop, get_height, get_left_margin_offset, get_x_axis_lbls_val_and_text,
+    JSDataSerialiser, get_axis_lbl_drop, get_height, get_left_margin_offset, get_x_axis_lbls_val_and_text,
     get_x_axis_font_size, get_y_axis_title_offset)
 from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
 from sofalite.output.styles.interfaces import ColourWithHighlight, StyleSpec
 from sofalite.output.styles.utils import get_long_colour_list, get_style_spec
 from sofalite.stats_calc.interfaces import BoxplotType, SortOrder
 from sofalite.utils.maths import format_num
-from sofalite.utils.misc import todict
+from sofalite.utils.misc import ELEMENT_ID_PLACEHOLDER, set_stable_element_id, todict
 
 left_margin_offset_spec = LeftMarginOffsetSpec(
     initial_offset=25, wide_offset=35, rotate_offset=10, multi_chart_offset=0)
@@ -37,8 +36,8 @@ class DojoBoxSpec:
     bottom_whisker_rounded: float
     median: float
     median_rounded: float
-    outliers: Sequence[float] | None
-    outliers_rounded: Sequence[float] | None
+    outliers: str  ## JS literal e.g. [1.5,99]
+    outliers_rounded: str
     box_top: float
     box_top_rounded: float
     top_whisker: float
@@ -150,7 +149,7 @@ make_chart_{{chart_uuid}} = function(){
 
 <div class="screen-float-only" style="margin-right: 10px; {{page_break}}">
 {{indiv_title_html}}
-    <div id="boxplot_{{chart_uuid}}"
+    <div id="boxplot_{{chart_uuid}}" data-make-chart="make_chart_{{chart_uuid}}"
         style="width: {{width}}px; height: {{height}}px;">
     </div>
     {% if legend_lbl %}
@@ -179,6 +178,7 @@ class CommonColourSpec:
 
 @dataclass(frozen=True)
 class CommonOptions:
+    js_data_conf: JSDataConf
     has_minor_ticks_js_bool: JSBool
     show_n_records: bool
 
@@ -285,6 +285,7 @@ def get_common_charting_spec(charting_spec: BoxplotChartingSpec, style_spec: Sty
         y_axis_title_offset=y_axis_title_offset,
     )
     options = CommonOptions(
+        js_data_conf=JSDataConf(),  ## BoxplotChartingSpec is defined in data_extraction so can't carry output settings
         has_minor_ticks_js_bool=has_minor_ticks_js_bool,
         show_n_records=charting_spec.show_n_records,
     )
@@ -300,12 +301,13 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
     context = todict(common_charting_spec.colour_spec, shallow=True)
     context.update(todict(common_charting_spec.misc_spec, shallow=True))
     context.update(todict(common_charting_spec.options, shallow=True))
-    chart_uuid = str(uuid.uuid4()).replace('-', '_')  ## needs to work in JS variable names
+    chart_uuid = ELEMENT_ID_PLACEHOLDER  ## swapped for an id derived from the rendered chart - so same chart, same bytes
     page_break = 'page-break-after: always;' if chart_counter % 2 == 0 else ''
 
     bar_width = indiv_chart_spec.bar_width
     n_records = 'N = ' + format_num(indiv_chart_spec.n_records) if common_charting_spec.options.show_n_records else ''
 
+    js_data = JSDataSerialiser(common_charting_spec.options.js_data_conf)
     dojo_series_specs = []
     for i, data_series_spec in enumerate(indiv_chart_spec.data_series_specs):
         series_id = f"{i:>02}"
@@ -324,17 +326,17 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
             box_spec = DojoBoxSpec(
                 center=box_item.center,
                 indiv_box_lbl=box_item.indiv_box_lbl,
-                box_bottom=box_item.box_bottom,
+                box_bottom=js_data.round_num(box_item.box_bottom),
                 box_bottom_rounded=box_item.box_bottom_rounded,
-                bottom_whisker=box_item.bottom_whisker,
+                bottom_whisker=js_data.round_num(box_item.bottom_whisker),
                 bottom_whisker_rounded=box_item.bottom_whisker_rounded,
-                median=box_item.median,
+                median=js_data.round_num(box_item.median),
                 median_rounded=box_item.median_rounded,
-                outliers=outliers,
-                outliers_rounded=outliers_rounded,
-                box_top=box_item.box_top,
+                outliers=js_data.nums(outliers),
+                outliers_rounded=js_data.nums(outliers_rounded),
+                box_top=js_data.round_num(box_item.box_top),
                 box_top_rounded=box_item.box_top_rounded,
-                top_whisker=box_item.top_whisker,
+                top_whisker=js_data.round_num(box_item.top_whisker),
                 top_whisker_rounded=box_item.top_whisker_rounded,
             )
             box_specs.append(box_spec)
@@ -355,7 +357,7 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
     context.update(indiv_context)
     environment = jinja2.Environment()
     template = environment.from_string(tpl_chart)
-    html_result = template.render(context)
+    html_result = set_stable_element_id(template.render(context), chart_counter)
     return html_result
 
 @dataclass(frozen=False)
@@ -384,9 +386,10 @@ class BoxplotChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        category_fld_lbl = VAR_LABELS.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
-        category_vals2lbls = VAR_LABELS.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
-        fld_lbl = VAR_LABELS.var2var_lbl.get(self.fld_name, self.fld_name)
+        var_labels = get_var_labels()
+        category_fld_lbl = var_labels.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
+        category_vals2lbls = var_labels.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
+        fld_lbl = var_labels.var2var_lbl.get(self.fld_name, self.fld_name)
         ## data
         intermediate_charting_spec = get_by_category_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
@@ -444,11 +447,12 @@ class MultiSeriesBoxplotChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        series_fld_lbl = VAR_LABELS.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
-        category_fld_lbl = VAR_LABELS.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
-        series_vals2lbls = VAR_LABELS.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
-        category_vals2lbls = VAR_LABELS.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
-        fld_lbl = VAR_LABELS.var2var_lbl.get(self.fld_name, self.fld_name)
+        var_labels = get_var_labels()
+        series_fld_lbl = var_labels.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
+        category_fld_lbl = var_labels.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
+        series_vals2lbls = var_labels.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
+        category_vals2lbls = var_labels.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
+        fld_lbl = var_labels.var2var_lbl.get(self.fld_name, self.fld_name)
         ## data
         intermediate_charting_spec = get_by_series_category_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
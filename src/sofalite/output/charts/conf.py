@@ -1,5 +1,4 @@
 DOJO_CHART_JS = """\
-<script type="text/javascript">
 
 function getAllFunctions(){
     var allFunctions = [];
@@ -14,9 +13,37 @@ function getAllFunctions(){
    return allFunctions;
 }
 
+// each chart container names the function which builds its chart e.g. data-make-chart="make_chart_..."
+sofaliteMakeChart = function(container){
+    if (container.dataset.chartMade) {
+        return;
+    }
+    container.dataset.chartMade = "true";
+    window[container.dataset.makeChart]();
+}
+
 makeObjects = function(){
     functions = getAllFunctions();
-    functions.forEach(fn_name => window[fn_name]());
+    if (!(window.sofaliteLazyCharts && "IntersectionObserver" in window)) {
+        functions.forEach(fn_name => window[fn_name]());
+        return;
+    }
+    // lazy - only build charts when they come near the viewport (charts never scrolled to are never built)
+    var containers = Array.from(document.querySelectorAll("[data-make-chart]"));
+    var registered = new Set(containers.map(container => container.dataset.makeChart));
+    var observer = new IntersectionObserver(function(entries){
+        entries.forEach(function(entry){
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                sofaliteMakeChart(entry.target);
+            }
+        });
+    }, {rootMargin: "300px 0px"});  // start a little before it scrolls into view
+    containers.forEach(container => observer.observe(container));
+    functions.filter(fn_name => !registered.has(fn_name)).forEach(fn_name => window[fn_name]());  // no container to watch
+    window.addEventListener("beforeprint", function(){  // printing needs every chart
+        containers.forEach(container => sofaliteMakeChart(container));
+    });
 };
 dojo.addOnLoad(makeObjects);
 
@@ -63,5 +90,27 @@ makefaint = function(colour){
     return new dojox.color.Color(fainthex);
 }
 
-</script>
+// decode compact chart data written by output.charts.utils.JSDataSerialiser
+sofaliteNums = function(typeCode, b64){
+    var bin = atob(b64);
+    var bytes = new Uint8Array(bin.length);
+    for (var i = 0; i < bin.length; i++){
+        bytes[i] = bin.charCodeAt(i);
+    }
+    var typed = (typeCode == "i") ? new Int32Array(bytes.buffer) : new Float64Array(bytes.buffer);
+    return Array.prototype.slice.call(typed);
+}
+
+sofaliteStrs = function(lookupStrs, idxs){
+    var strs = new Array(idxs.length);
+    for (var i = 0; i < idxs.length; i++){
+        strs[i] = lookupStrs[idxs[i]];
+    }
+    return strs;
+}
+"""
+
+LAZY_CHARTS_FLAG_JS = """\
+// only build charts as they come near the viewport - see makeObjects
+window.sofaliteLazyCharts = true;
 """
@@ -2,11 +2,10 @@ from collections.abc import Sequence
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Literal
-import uuid
 
 import jinja2
 
-from sofalite.conf.main import HISTO_AVG_CHAR_WIDTH_PIXELS, VAR_LABELS
+from sofalite.conf.main import HISTO_AVG_CHAR_WIDTH_PIXELS, get_var_labels
 from sofalite.data_extraction.charts.histogram import (
     HistoIndivChartSpec, get_by_chart_charting_spec, get_by_vals_charting_spec)
 from sofalite.output.charts.common import get_common_charting_spec, get_html, get_indiv_chart_html
@@ -15,7 +14,7 @@ from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
 from sofalite.output.styles.interfaces import ColourWithHighlight, StyleSpec
 from sofalite.output.styles.utils import get_style_spec
 from sofalite.utils.maths import format_num
-from sofalite.utils.misc import todict
+from sofalite.utils.misc import ELEMENT_ID_PLACEHOLDER, set_stable_element_id, todict
 
 MIN_CHART_WIDTH = 700
 MIN_PIXELS_PER_BAR = 30
@@ -144,7 +143,7 @@ var highlight_{{chart_uuid}} = function(colour){
 
  <div class="screen-float-only" style="margin-right: 10px; {{page_break}}">
  {{indiv_title_html}}
-     <div id="histogram_{{chart_uuid}}"
+     <div id="histogram_{{chart_uuid}}" data-make-chart="make_chart_{{chart_uuid}}"
          style="width: {{width}}px; height: {{height}}px;">
      </div>
  </div>
@@ -259,7 +258,7 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
     context = todict(common_charting_spec.colour_spec, shallow=True)
     context.update(todict(common_charting_spec.misc_spec, shallow=True))
     context.update(todict(common_charting_spec.options, shallow=True))
-    chart_uuid = str(uuid.uuid4()).replace('-', '_')  ## needs to work in JS variable names
+    chart_uuid = ELEMENT_ID_PLACEHOLDER  ## swapped for an id derived from the rendered chart - so same chart, same bytes
     page_break = 'page-break-after: always;' if chart_counter % 2 == 0 else ''
     indiv_title_html = (f"<p><b>{indiv_chart_spec.lbl}</b></p>" if common_charting_spec.options.is_multi_chart else '')
     n_records = 'N = ' + format_num(indiv_chart_spec.n_records) if common_charting_spec.options.show_n_records else ''
@@ -274,7 +273,7 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
     context.update(indiv_context)
     environment = jinja2.Environment()
     template = environment.from_string(tpl_chart)
-    html_result = template.render(context)
+    html_result = set_stable_element_id(template.render(context), chart_counter)
     return html_result
 
 @dataclass(frozen=False)
@@ -301,7 +300,7 @@ class HistogramChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        fld_lbl = VAR_LABELS.var2var_lbl.get(self.fld_name, self.fld_name)
+        fld_lbl = get_var_labels().var2var_lbl.get(self.fld_name, self.fld_name)
         ## data
         intermediate_charting_spec = get_by_vals_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
@@ -354,9 +353,10 @@ class MultiChartHistogramChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        chart_fld_lbl = VAR_LABELS.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
-        chart_vals2lbls = VAR_LABELS.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
-        fld_lbl = VAR_LABELS.var2var_lbl.get(self.fld_name, self.fld_name)
+        var_labels = get_var_labels()
+        chart_fld_lbl = var_labels.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
+        chart_vals2lbls = var_labels.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
+        fld_lbl = var_labels.var2var_lbl.get(self.fld_name, self.fld_name)
         ## data
         intermediate_charting_spec = get_by_chart_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
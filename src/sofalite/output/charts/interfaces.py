@@ -1,6 +1,6 @@
 ## depends on conf (always OK), and utils and data_extraction which are lower level - so no problematic project dependencies :-)
 from collections.abc import Sequence
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import StrEnum
 from typing import Literal
 
@@ -12,11 +12,28 @@ JSBool = Literal['false', 'true']
 
 ## the lower-level components are needed by data_extraction e.g. CategorySpec, IndivChartSpec
 
+@dataclass(frozen=True)
+class JSDataConf:
+    """
+    How chart data is written into the JS fed to Dojo - see output.charts.utils.JSDataSerialiser.
+
+    dp: decimal places numbers are rounded to (None to keep full precision).
+    Only affects what is drawn - tooltips etc. are already formatted.
+    use_str_lookup: string arrays with repeated values (e.g. tooltips) are written as indexes
+    into a lookup table of the distinct strings in the chart.
+    typed_array_min_len: numeric arrays at least this long (and without gaps) are written as base64 typed arrays
+    (Int32 if all integers, otherwise Float64) which are faster for browsers to parse. None to never do this.
+    """
+    dp: int | None = 6
+    use_str_lookup: bool = True
+    typed_array_min_len: int | None = None
+
 @dataclass
 class ChartingSpec:
     category_specs: Sequence[CategorySpec]
     indiv_chart_specs: Sequence[IndivChartSpec]
     show_n_records: bool
+    js_data_conf: JSDataConf = field(default_factory=JSDataConf, kw_only=True)
 
     def __post_init__(self):
         ## Validation
@@ -122,7 +139,7 @@ class DojoSeriesSpec:
     """
     series_id: str  ## e.g. 01
     lbl: str
-    vals: Sequence[float | str]  ## str if time series
+    vals: str  ## JS literal e.g. [12,3.5] or, if time series, [{"x":1451606400000,"y":12}, ...]
     options: str  ## e.g. stroke, color, width etc. - things needed in a generic DOJO series
 
 @dataclass(frozen=True)
@@ -152,6 +169,7 @@ class LineArea:
 
     make_chart_{{chart_uuid}} = function(){
 
+        var lookup_strs = {{lookup_strs}};
         var series = new Array();
         {% for series_spec in dojo_series_specs %}
           var series_{{series_spec.series_id}} = new Array();
@@ -193,7 +211,7 @@ class LineArea:
 
     <div class="screen-float-only" style="margin-right: 10px; {{page_break}}">
     {{indiv_title_html}}
-        <div id="line_area_chart_{{chart_uuid}}"
+        <div id="line_area_chart_{{chart_uuid}}" data-make-chart="make_chart_{{chart_uuid}}"
             style="width: {{width}}px; height: {{height}}px;">
         </div>
         {% if legend_lbl %}
@@ -221,6 +239,7 @@ class LineArea:
 
     @dataclass(frozen=True)
     class CommonOptions:
+        js_data_conf: JSDataConf
         has_micro_ticks_js_bool: Literal['true', 'false']
         has_minor_ticks_js_bool: Literal['true', 'false']
         is_multi_chart: bool
@@ -252,8 +271,8 @@ class LineArea:
         width: float  ## pixels
 
     @staticmethod
-    def get_time_series_vals(
-            x_axis_specs: Sequence[CategorySpec], y_vals: Sequence[float], x_axis_title: str) -> str:
+    def get_time_series_xys(
+            x_axis_specs: Sequence[CategorySpec], y_vals: Sequence[float], x_axis_title: str) -> list[dict]:
         xs = []
         try:
             for x_axis_spec in x_axis_specs:
@@ -264,8 +283,7 @@ class LineArea:
                 f"Orig error: {e}")
         ys = y_vals
         xys = zip(xs, ys, strict=True)
-        series_vals = str([{'x': xy[0], 'y': xy[1]} for xy in xys])
-        return series_vals
+        return [{'x': xy[0], 'y': xy[1]} for xy in xys]
 
     @staticmethod
     def get_width_after_left_margin(*,
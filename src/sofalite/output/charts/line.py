@@ -3,24 +3,24 @@ from dataclasses import dataclass
 from pathlib import Path
 from statistics import median
 from typing import Any
-import uuid
 
 import jinja2
 
 from sofalite import logger
-from sofalite.conf.main import VAR_LABELS
+from sofalite.conf.main import get_var_labels
 from sofalite.data_extraction.charts.freq_specs import get_by_series_category_charting_spec
 from sofalite.data_extraction.interfaces import DataSeriesSpec
 from sofalite.output.charts.common import (
     get_common_charting_spec, get_html, get_indiv_chart_html, get_line_area_misc_spec)
 from sofalite.output.charts.interfaces import (
     DojoSeriesSpec, IndivChartSpec, JSBool, LeftMarginOffsetSpec, LineArea, LineChartingSpec, PlotStyle)
+from sofalite.output.charts.utils import JSDataSerialiser
 from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
 from sofalite.output.styles.interfaces import StyleSpec
 from sofalite.output.styles.utils import get_long_colour_list, get_style_spec
 from sofalite.stats_calc.interfaces import SortOrder
 from sofalite.utils.maths import format_num
-from sofalite.utils.misc import todict
+from sofalite.utils.misc import ELEMENT_ID_PLACEHOLDER, set_stable_element_id, todict
 
 @dataclass(frozen=True)
 class CommonColourSpec(LineArea.CommonColourSpec):
@@ -85,7 +85,7 @@ def get_smooth_y_vals(y_vals: Sequence[float]) -> Sequence[float]:
     return smooth_y_vals
 
 def get_dojo_trend_series_spec(common_charting_spec: CommonChartingSpec,
-        single_data_series_spec: DataSeriesSpec) -> DojoSeriesSpec:
+        single_data_series_spec: DataSeriesSpec, js_data: JSDataSerialiser) -> DojoSeriesSpec:
     """
     For time-series lines we're using coordinates so can just have the end points
     e.g. [all[0], all[-1]]
@@ -106,19 +106,19 @@ def get_dojo_trend_series_spec(common_charting_spec: CommonChartingSpec,
         trend_series_x_axis_specs = [
             common_charting_spec.misc_spec.x_axis_specs[0], common_charting_spec.misc_spec.x_axis_specs[-1]]
         trend_series_y_vals = [trend_y_vals[0], trend_y_vals[-1]]
-        trend_series_vals = LineArea.get_time_series_vals(
-            trend_series_x_axis_specs, trend_series_y_vals, common_charting_spec.misc_spec.x_axis_title)
+        trend_series_vals = js_data.dicts(LineArea.get_time_series_xys(
+            trend_series_x_axis_specs, trend_series_y_vals, common_charting_spec.misc_spec.x_axis_title))
         marker_plot_style = PlotStyle.DEFAULT if common_charting_spec.options.show_markers else PlotStyle.UNMARKED
     else:
-        trend_series_vals = trend_y_vals  ## need
+        trend_series_vals = js_data.nums(trend_y_vals)  ## need
         marker_plot_style = PlotStyle.UNMARKED
     trend_options = (f"""{{stroke: {{color: "{trend_line_colour}", width: "6px"}}, """
-        f"""yLbls: {LineArea.DUMMY_TOOL_TIPS}, plot: "{marker_plot_style}"}}""")
+        f"""yLbls: {js_data.strs(LineArea.DUMMY_TOOL_TIPS)}, plot: "{marker_plot_style}"}}""")
     trend_series_spec = DojoSeriesSpec(trend_series_id, trend_series_lbl, trend_series_vals, trend_options)
     return trend_series_spec
 
 def get_dojo_smooth_series_spec(common_charting_spec: CommonChartingSpec,
-        single_data_series_spec: DataSeriesSpec) -> DojoSeriesSpec:
+        single_data_series_spec: DataSeriesSpec, js_data: JSDataSerialiser) -> DojoSeriesSpec:
     """
     id is 02 because only a single other series and that will be 00
     trend will be 01
@@ -131,13 +131,13 @@ def get_dojo_smooth_series_spec(common_charting_spec: CommonChartingSpec,
     smooth_series_lbl = 'Smooth line'
     smooth_line_colour = common_charting_spec.colour_spec.colours[2]  ## obviously don't conflict with main series colour or possible trend line colour
     smooth_options = (f"""{{stroke: {{color: "{smooth_line_colour}", width: "6px"}}, """
-        f"""yLbls: {LineArea.DUMMY_TOOL_TIPS}, plot: "{PlotStyle.CURVED}"}}""")
+        f"""yLbls: {js_data.strs(LineArea.DUMMY_TOOL_TIPS)}, plot: "{PlotStyle.CURVED}"}}""")
     if common_charting_spec.options.is_time_series:
-        smooth_series_vals = LineArea.get_time_series_vals(
+        smooth_series_vals = js_data.dicts(LineArea.get_time_series_xys(
             common_charting_spec.misc_spec.x_axis_specs,
-            smooth_y_vals, common_charting_spec.misc_spec.x_axis_title)
+            smooth_y_vals, common_charting_spec.misc_spec.x_axis_title))
     else:
-        smooth_series_vals = smooth_y_vals
+        smooth_series_vals = js_data.nums(smooth_y_vals)
     smooth_series_spec = DojoSeriesSpec(smooth_series_id, smooth_series_lbl, smooth_series_vals, smooth_options)
     return smooth_series_spec
 
@@ -172,6 +172,7 @@ def get_common_charting_spec(charting_spec: LineChartingSpec, style_spec: StyleS
     )
     misc_spec = get_line_area_misc_spec(charting_spec, style_spec, legend_lbl, left_margin_offset_spec)
     options = CommonOptions(
+        js_data_conf=charting_spec.js_data_conf,
         has_micro_ticks_js_bool=has_micro_ticks_js_bool,
         has_minor_ticks_js_bool=has_minor_ticks_js_bool,
         is_multi_chart=charting_spec.is_multi_chart,
@@ -195,26 +196,27 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
     context = todict(common_charting_spec.colour_spec, shallow=True)
     context.update(todict(common_charting_spec.misc_spec, shallow=True))
     context.update(todict(common_charting_spec.options, shallow=True))
-    chart_uuid = str(uuid.uuid4()).replace('-', '_')  ## needs to work in JS variable names
+    chart_uuid = ELEMENT_ID_PLACEHOLDER  ## swapped for an id derived from the rendered chart - so same chart, same bytes
     page_break = 'page-break-after: always;' if chart_counter % 2 == 0 else ''
     indiv_title_html = (f"<p><b>{indiv_chart_spec.lbl}</b></p>" if common_charting_spec.options.is_multi_chart else '')
     n_records = 'N = ' + format_num(indiv_chart_spec.n_records) if common_charting_spec.options.show_n_records else ''
     ## each standard series
+    js_data = JSDataSerialiser(common_charting_spec.options.js_data_conf)
     dojo_series_specs = []
     marker_plot_style = PlotStyle.DEFAULT if common_charting_spec.options.show_markers else PlotStyle.UNMARKED
     for i, data_series_spec in enumerate(indiv_chart_spec.data_series_specs):
         series_id = f"{i:>02}"
         series_lbl = data_series_spec.lbl
         if common_charting_spec.options.is_time_series:
-            series_vals = LineArea.get_time_series_vals(
+            series_vals = js_data.dicts(LineArea.get_time_series_xys(
                 common_charting_spec.misc_spec.x_axis_specs, data_series_spec.amounts,
-                common_charting_spec.misc_spec.x_axis_title)
+                common_charting_spec.misc_spec.x_axis_title))
         else:
-            series_vals = str(data_series_spec.amounts)
+            series_vals = js_data.nums(data_series_spec.amounts)
         ## options
-        ## e.g. {stroke: {color: '#e95f29', width: '6px'}, yLbls: ['x-val: 2016-01-01<br>y-val: 12<br>0.8%', ... ], plot: 'default'};
+        ## e.g. {stroke: {color: '#e95f29', width: '6px'}, yLbls: ["x-val: 2016-01-01<br>y-val: 12<br>0.8%", ... ], plot: 'default'};
         line_colour = common_charting_spec.colour_spec.colours[i]
-        y_lbls_str = str(data_series_spec.tooltips)
+        y_lbls_str = js_data.strs(data_series_spec.tooltips)
         options = (f"""{{stroke: {{color: "{line_colour}", width: "6px"}}, """
             f"""yLbls: {y_lbls_str}, plot: "{marker_plot_style}"}}""")
         dojo_series_specs.append(DojoSeriesSpec(series_id, series_lbl, series_vals, options))
@@ -224,26 +226,27 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
         if not common_charting_spec.options.is_single_series:
             raise Exception("Can only show trend lines if one series of results.")
         trend_series_spec = get_dojo_trend_series_spec(
-            common_charting_spec, single_data_series_spec=single_data_series_spec)
+            common_charting_spec, single_data_series_spec=single_data_series_spec, js_data=js_data)
         dojo_series_specs.append(trend_series_spec)  ## seems that the later you add something the lower it is
     if common_charting_spec.options.show_smooth_line:
         if not common_charting_spec.options.is_single_series:
             raise Exception("Can only show trend lines if one series of results.")
         smooth_series_spec = get_dojo_smooth_series_spec(
-            common_charting_spec, single_data_series_spec=single_data_series_spec
+            common_charting_spec, single_data_series_spec=single_data_series_spec, js_data=js_data
         )
         dojo_series_specs.append(smooth_series_spec)
     indiv_context = {
         'chart_uuid': chart_uuid,
         'dojo_series_specs': dojo_series_specs,
         'indiv_title_html': indiv_title_html,
+        'lookup_strs': js_data.lookup_strs,
         'n_records': n_records,
         'page_break': page_break,
     }
     context.update(indiv_context)
     environment = jinja2.Environment()
     template = environment.from_string(LineArea.tpl_chart)
-    html_result = template.render(context)
+    html_result = set_stable_element_id(template.render(context), chart_counter)
     return html_result
 
 @dataclass(frozen=False)
@@ -276,10 +279,11 @@ class MultiLineChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        series_fld_lbl = VAR_LABELS.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
-        category_fld_lbl = VAR_LABELS.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
-        series_vals2lbls = VAR_LABELS.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
-        category_vals2lbls = VAR_LABELS.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
+        var_labels = get_var_labels()
+        series_fld_lbl = var_labels.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
+        category_fld_lbl = var_labels.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
+        series_vals2lbls = var_labels.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
+        category_vals2lbls = var_labels.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
         ## data
         intermediate_charting_spec = get_by_series_category_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
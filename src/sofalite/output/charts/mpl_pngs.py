@@ -1,11 +1,12 @@
 """
 https://matplotlib.org/matplotblog/posts/pyplot-vs-object-oriented-interface/
 """
+from dataclasses import dataclass
+import math
 from typing import Sequence
 
 from matplotlib import rcParams as mpl_settings
 from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
 
 from sofalite import logger
 from sofalite.stats_calc.engine import get_normal_ys, get_regression_result
@@ -13,6 +14,37 @@ from sofalite.output.charts.histogram import HistogramConf
 from sofalite.output.charts.scatterplot import ScatterplotConf, ScatterplotSeries
 from sofalite.stats_calc.histogram import get_bin_details_from_vals
 
+CLUSTERED_BAR_WIDTH = 0.8
+CLUSTERED_BAR_SPACING = 0.5  ## gap between clusters
+
+@dataclass(frozen=True)
+class ClusteredBarSeries:
+    """
+    One bar per cluster e.g. the "Female" bars across all the country clusters
+    """
+    lbl: str
+    y_vals: tuple[float, ...]
+    colour: str
+
+@dataclass(frozen=True, kw_only=True)
+class ClusteredBarChartConf:
+    """
+    Frozen and made of tuples so it is hashable (can be used as a cache key)
+    and picklable (can be handed to a process pool).
+    """
+    title: str
+    x_axis_lbl: str
+    y_axis_lbl: str
+    x_tick_lbls: tuple[str, ...]
+    series: tuple[ClusteredBarSeries, ...]
+    width_inches: float
+    height_inches: float | None = None  ## if not set, height is set by golden ratio
+    inner_bg_colour: str
+    title_font_size: int = 14
+    axes_lbl_font_size: int = 11
+    x_tick_lbl_font_size: int = 11
+    legend_font_size: int = 9
+
 def set_gen_mpl_settings(axes_lbl_size=14, xtick_lbl_size=10, ytick_lbl_size=10):
     mpl_settings['axes.labelsize'] = axes_lbl_size
     mpl_settings['xtick.labelsize'] = xtick_lbl_size
@@ -29,7 +61,8 @@ def get_histogram_fig(chart_conf: HistogramConf, vals: Sequence[float]) -> Figur
     Then try to fix any saw-toothing detected if it is possible.
     Requires enough bins to be able to reduce them and recalculate.
     """
-    fig, ax = plt.subplots()
+    fig = Figure()  ## not via pyplot so safe to build in worker threads and nothing left open
+    ax = fig.add_subplot(1, 1, 1)
     rect = ax.patch
     rect.set_facecolor(chart_conf.inner_bg_colour)
     bin_spec, bin_freqs = get_bin_details_from_vals(vals)
@@ -62,7 +95,8 @@ def get_histogram_fig(chart_conf: HistogramConf, vals: Sequence[float]) -> Figur
     return fig
 
 def get_scatterplot_fig(vars_series: Sequence[ScatterplotSeries], chart_conf: ScatterplotConf) -> Figure:
-    fig, ax = plt.subplots()
+    fig = Figure()  ## not via pyplot so safe to build in worker threads and nothing left open
+    ax = fig.add_subplot(1, 1, 1)
     fig.set_size_inches((chart_conf.width_inches, chart_conf.height_inches))
     if chart_conf.x_min is not None and chart_conf.x_max is not None:
         ax.axis(xmin=chart_conf.x_min, xmax=chart_conf.x_max)
@@ -88,3 +122,43 @@ def get_scatterplot_fig(vars_series: Sequence[ScatterplotSeries], chart_conf: Sc
                 color=var_series.dot_colour, linewidth=5, label=line_lbl)
     ax.set_facecolor(chart_conf.inner_background_colour)
     return fig
+
+def get_clustered_barchart_fig(chart_conf: ClusteredBarChartConf) -> Figure:
+    """
+    Stateless - uses a Figure directly rather than pyplot so nothing is registered in, or left open in,
+    global pyplot state, and no rcParams are changed. Safe to call from worker threads or processes.
+
+    Bars within a cluster are laid out side-by-side with a gap between clusters
+    and the x tick label centred under each cluster.
+    """
+    if chart_conf.height_inches is None:
+        golden_ratio = (math.sqrt(5) - 1.0) / 2.0
+        height_inches = golden_ratio * chart_conf.width_inches
+    else:
+        height_inches = chart_conf.height_inches
+    fig = Figure(figsize=(chart_conf.width_inches, height_inches))
+    ax = fig.add_subplot(1, 1, 1)
+    ax.set_title(chart_conf.title, fontsize=chart_conf.title_font_size)
+    ax.patch.set_facecolor(chart_conf.inner_bg_colour)
+    n_bars_per_cluster = len(chart_conf.series)
+    cluster_width = n_bars_per_cluster * CLUSTERED_BAR_WIDTH + CLUSTERED_BAR_SPACING
+    cluster_middle = (n_bars_per_cluster * CLUSTERED_BAR_WIDTH) / 2
+    x_tick_positions = [cluster_width * i + cluster_middle for i in range(len(chart_conf.x_tick_lbls))]
+    ax.set_xticks(x_tick_positions)
+    ax.set_xticklabels(chart_conf.x_tick_lbls)
+    ax.tick_params(axis='x', labelsize=chart_conf.x_tick_lbl_font_size)
+    handles = []
+    x_max = None
+    for i, series in enumerate(chart_conf.series):
+        xs = [(cluster_width * x) + (i * CLUSTERED_BAR_WIDTH) for x in range(len(series.y_vals))]
+        bars = ax.bar(xs, series.y_vals, width=CLUSTERED_BAR_WIDTH, color=series.colour, edgecolor='white',
+            label=series.lbl)
+        handles.append(bars[0])  ## only need first rectangle for legend
+        series_x_max = max(xs) + CLUSTERED_BAR_WIDTH
+        x_max = series_x_max if x_max is None else max(x_max, series_x_max)
+    ax.set_xlim(0, x_max)
+    ax.set_xlabel(chart_conf.x_axis_lbl, fontsize=chart_conf.axes_lbl_font_size)
+    ax.set_ylabel(chart_conf.y_axis_lbl, fontsize=chart_conf.axes_lbl_font_size)
+    ax.legend(handles, [series.lbl for series in chart_conf.series], loc='lower left',
+        ncol=n_bars_per_cluster, scatterpoints=3, prop={'size': chart_conf.legend_font_size})
+    return fig
@@ -2,19 +2,19 @@ from collections.abc import Sequence
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
-import uuid
 
 import jinja2
 
-from sofalite.conf.main import VAR_LABELS
+from sofalite.conf.main import get_var_labels
 from sofalite.data_extraction.charts.freq_specs import get_by_chart_category_charting_spec
-from sofalite.output.charts.interfaces import ChartingSpecNoAxes, IndivChartSpec
+from sofalite.output.charts.interfaces import ChartingSpecNoAxes, IndivChartSpec, JSDataConf
 from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
 from sofalite.output.styles.interfaces import StyleSpec
 from sofalite.output.charts.common import get_common_charting_spec, get_html, get_indiv_chart_html
+from sofalite.output.charts.utils import JSDataSerialiser
 from sofalite.output.styles.utils import get_long_colour_list, get_style_spec
 from sofalite.stats_calc.interfaces import SortOrder
-from sofalite.utils.misc import todict
+from sofalite.utils.misc import ELEMENT_ID_PLACEHOLDER, set_stable_element_id, todict
 
 @dataclass
 class PieChartingSpec(ChartingSpecNoAxes):
@@ -35,6 +35,7 @@ class CommonColourSpec:
 
 @dataclass(frozen=True)
 class CommonOptions:
+    js_data_conf: JSDataConf
     is_multi_chart: bool
 
 @dataclass(frozen=True)
@@ -73,9 +74,7 @@ var highlight_{{chart_uuid}} = function(colour){
 
  make_chart_{{chart_uuid}} = function(){
 
-     slices = [
-       {% for slice_str in slice_strs %}\n            {{slice_str}}{% endfor %}
-     ];
+     slices = {{slices}};
 
      var conf = new Array();
          conf["connector_style"] = "{{connector_style}}";
@@ -96,7 +95,7 @@ var highlight_{{chart_uuid}} = function(colour){
 
  <div class="screen-float-only" style="margin-right: 10px; {{page_break}}">
  {{indiv_title_html}}
-     <div id="pie_chart_{{chart_uuid}}"
+     <div id="pie_chart_{{chart_uuid}}" data-make-chart="make_chart_{{chart_uuid}}"
          style="width: {{width}}px; height: {{height}}px;">
      </div>
      {% if legend_lbl %}
@@ -145,6 +144,7 @@ def get_common_pie_charting_spec(charting_spec: PieChartingSpec, style_spec: Sty
         width=450,
     )
     options = CommonOptions(
+        js_data_conf=charting_spec.js_data_conf,
         is_multi_chart=charting_spec.is_multi_chart,
     )
     return CommonChartingSpec(
@@ -164,7 +164,7 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
     context = todict(common_charting_spec.colour_spec, shallow=True)
     context.update(todict(common_charting_spec.misc_spec, shallow=True))
     context.update(todict(common_charting_spec.options, shallow=True))
-    chart_uuid = str(uuid.uuid4()).replace('-', '_')  ## needs to work in JS variable names
+    chart_uuid = ELEMENT_ID_PLACEHOLDER  ## swapped for an id derived from the rendered chart - so same chart, same bytes
     page_break = 'page-break-after: always;' if chart_counter % 2 == 0 else ''
     indiv_title_html = (f"<p><b>{indiv_chart_spec.lbl}</b></p>" if common_charting_spec.options.is_multi_chart else '')
     ## slices
@@ -178,26 +178,25 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
         slice_colours,
         only_series.tooltips,
         strict=True)
-    slice_strs = []
+    js_data = JSDataSerialiser(common_charting_spec.options.js_data_conf)
+    slices = []
     slice_colours_as_displayed = []
     for slice_lbl, slice_val, colour, tool_tip in slice_details:
         if slice_val == 0:
             continue
-        slice_str = f"""{{"val": {slice_val}, "lbl": "{slice_lbl}", "tooltip": "{tool_tip}"}},"""
-        slice_strs.append(slice_str)
+        slices.append({'val': slice_val, 'lbl': slice_lbl, 'tooltip': tool_tip})
         slice_colours_as_displayed.append(colour)
-    slice_strs[-1] = slice_strs[-1].rstrip(',')
     indiv_context = {
         'chart_uuid': chart_uuid,
         'indiv_title_html': indiv_title_html,
         'page_break': page_break,
-        'slice_colours_as_displayed': slice_colours_as_displayed,
-        'slice_strs': slice_strs,
+        'slice_colours_as_displayed': js_data.to_js(slice_colours_as_displayed),
+        'slices': js_data.dicts(slices),
     }
     context.update(indiv_context)
     environment = jinja2.Environment()
     template = environment.from_string(tpl_chart)
-    html_result = template.render(context)
+    html_result = set_stable_element_id(template.render(context), chart_counter)
     return html_result
 
 @dataclass(frozen=False)
@@ -227,10 +226,11 @@ class PieChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        chart_fld_lbl = VAR_LABELS.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
-        category_fld_lbl = VAR_LABELS.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
-        chart_vals2lbls = VAR_LABELS.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
-        category_vals2lbls = VAR_LABELS.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
+        var_labels = get_var_labels()
+        chart_fld_lbl = var_labels.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
+        category_fld_lbl = var_labels.var2var_lbl.get(self.category_fld_name, self.category_fld_name)
+        chart_vals2lbls = var_labels.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
+        category_vals2lbls = var_labels.var2val2lbl.get(self.category_fld_name, self.category_fld_name)
         ## data
         intermediate_charting_spec = get_by_chart_category_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
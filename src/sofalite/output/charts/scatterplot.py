@@ -2,11 +2,10 @@ from collections.abc import Sequence
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Literal
-import uuid
 
 import jinja2
 
-from sofalite.conf.main import VAR_LABELS
+from sofalite.conf.main import get_var_labels
 from sofalite.data_extraction.charts.scatterplot import ScatterChartingSpec, ScatterIndivChartSpec
 from sofalite.data_extraction.charts.xys import (get_by_chart_series_xy_charting_spec, get_by_chart_xy_charting_spec,
     get_by_series_xy_charting_spec, get_by_xy_charting_spec)
@@ -17,7 +16,7 @@ from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
 from sofalite.output.styles.interfaces import ColourWithHighlight, StyleSpec
 from sofalite.output.styles.utils import get_long_colour_list, get_style_spec
 from sofalite.utils.maths import format_num
-from sofalite.utils.misc import todict
+from sofalite.utils.misc import ELEMENT_ID_PLACEHOLDER, set_stable_element_id, todict
 
 
 left_margin_offset_spec = LeftMarginOffsetSpec(
@@ -167,7 +166,7 @@ make_chart_{{chart_uuid}} = function(){
 
 <div class="screen-float-only" style="margin-right: 10px; {{page_break}}">
 {{indiv_title_html}}
-    <div id="scatterplot_{{chart_uuid}}"
+    <div id="scatterplot_{{chart_uuid}}" data-make-chart="make_chart_{{chart_uuid}}"
         style="width: {{width}}px; height: {{height}}px;">
     </div>
     {% if legend_lbl %}
@@ -255,7 +254,7 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
     context = todict(common_charting_spec.colour_spec, shallow=True)
     context.update(todict(common_charting_spec.misc_spec, shallow=True))
     context.update(todict(common_charting_spec.options, shallow=True))
-    chart_uuid = str(uuid.uuid4()).replace('-', '_')  ## needs to work in JS variable names
+    chart_uuid = ELEMENT_ID_PLACEHOLDER  ## swapped for an id derived from the rendered chart - so same chart, same bytes
     page_break = 'page-break-after: always;' if chart_counter % 2 == 0 else ''
     indiv_title_html = f"<p><b>{indiv_chart_spec.lbl}</b></p>" if common_charting_spec.options.is_multi_chart else ''
     n_records = 'N = ' + format_num(indiv_chart_spec.n_records) if common_charting_spec.options.show_n_records else ''
@@ -280,7 +279,7 @@ def get_indiv_chart_html(common_charting_spec: CommonChartingSpec, indiv_chart_s
     context.update(indiv_context)
     environment = jinja2.Environment()
     template = environment.from_string(tpl_chart)
-    html_result = template.render(context)
+    html_result = set_stable_element_id(template.render(context), chart_counter)
     return html_result
 
 @dataclass(frozen=False)
@@ -307,8 +306,9 @@ class SingleSeriesScatterChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        x_fld_lbl = VAR_LABELS.var2var_lbl.get(self.x_fld_name, self.x_fld_name)
-        y_fld_lbl = VAR_LABELS.var2var_lbl.get(self.y_fld_name, self.y_fld_name)
+        var_labels = get_var_labels()
+        x_fld_lbl = var_labels.var2var_lbl.get(self.x_fld_name, self.x_fld_name)
+        y_fld_lbl = var_labels.var2var_lbl.get(self.y_fld_name, self.y_fld_name)
         ## data
         intermediate_charting_spec = get_by_xy_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
@@ -360,10 +360,11 @@ class MultiSeriesScatterChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        series_fld_lbl = VAR_LABELS.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
-        series_vals2lbls = VAR_LABELS.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
-        x_fld_lbl = VAR_LABELS.var2var_lbl.get(self.x_fld_name, self.x_fld_name)
-        y_fld_lbl = VAR_LABELS.var2var_lbl.get(self.y_fld_name, self.y_fld_name)
+        var_labels = get_var_labels()
+        series_fld_lbl = var_labels.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
+        series_vals2lbls = var_labels.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
+        x_fld_lbl = var_labels.var2var_lbl.get(self.x_fld_name, self.x_fld_name)
+        y_fld_lbl = var_labels.var2var_lbl.get(self.y_fld_name, self.y_fld_name)
         ## data
         intermediate_charting_spec = get_by_series_xy_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
@@ -417,10 +418,11 @@ class MultiChartScatterChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        chart_fld_lbl = VAR_LABELS.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
-        chart_vals2lbls = VAR_LABELS.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
-        x_fld_lbl = VAR_LABELS.var2var_lbl.get(self.x_fld_name, self.x_fld_name)
-        y_fld_lbl = VAR_LABELS.var2var_lbl.get(self.y_fld_name, self.y_fld_name)
+        var_labels = get_var_labels()
+        chart_fld_lbl = var_labels.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
+        chart_vals2lbls = var_labels.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
+        x_fld_lbl = var_labels.var2var_lbl.get(self.x_fld_name, self.x_fld_name)
+        y_fld_lbl = var_labels.var2var_lbl.get(self.y_fld_name, self.y_fld_name)
         ## data
         intermediate_charting_spec = get_by_chart_xy_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
@@ -475,12 +477,13 @@ class MultiChartSeriesScatterChartSpec(Source):
         # style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        chart_fld_lbl = VAR_LABELS.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
-        series_fld_lbl = VAR_LABELS.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
-        chart_vals2lbls = VAR_LABELS.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
-        series_vals2lbls = VAR_LABELS.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
-        x_fld_lbl = VAR_LABELS.var2var_lbl.get(self.x_fld_name, self.x_fld_name)
-        y_fld_lbl = VAR_LABELS.var2var_lbl.get(self.y_fld_name, self.y_fld_name)
+        var_labels = get_var_labels()
+        chart_fld_lbl = var_labels.var2var_lbl.get(self.chart_fld_name, self.chart_fld_name)
+        series_fld_lbl = var_labels.var2var_lbl.get(self.series_fld_name, self.series_fld_name)
+        chart_vals2lbls = var_labels.var2val2lbl.get(self.chart_fld_name, self.chart_fld_name)
+        series_vals2lbls = var_labels.var2val2lbl.get(self.series_fld_name, self.series_fld_name)
+        x_fld_lbl = var_labels.var2var_lbl.get(self.x_fld_name, self.x_fld_name)
+        y_fld_lbl = var_labels.var2var_lbl.get(self.y_fld_name, self.y_fld_name)
         ## data
         intermediate_charting_spec = get_by_chart_series_xy_charting_spec(
             cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
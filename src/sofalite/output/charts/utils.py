@@ -1,9 +1,14 @@
+import base64
 from collections.abc import Sequence
+import json
+from numbers import Number
 
 from sofalite import logger
 from sofalite.conf.main import (AVG_CHAR_WIDTH_PIXELS, AVG_LINE_HEIGHT_PIXELS, DOJO_Y_AXIS_TITLE_OFFSET,
     MAX_SAFE_X_LBL_LEN_PIXELS)
-from sofalite.output.charts.interfaces import CategorySpec, LeftMarginOffsetSpec
+from sofalite.output.charts.interfaces import CategorySpec, JSDataConf, LeftMarginOffsetSpec
+
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
 
 def get_left_margin_offset(*, width_after_left_margin: float, offsets: LeftMarginOffsetSpec,
         is_multi_chart: bool, y_axis_title_offset: float, rotated_x_lbls: bool) -> float:
@@ -63,3 +68,88 @@ def get_x_axis_lbls_val_and_text(x_axis_specs: Sequence[CategorySpec]) -> list[s
     for n, x_axis_spec in enumerate(x_axis_specs, 1):
         lbls_val_and_text.append(f'{{value: {n}, text: "{x_axis_spec.lbl}"}}')
     return lbls_val_and_text
+
+class JSDataSerialiser:
+    """
+    Writes chart data as compact JS literals (JSON) rather than Python str() representations
+    which have full-precision floats, Python-specific quoting, and repeat the same strings over and over.
+    Needs the helper functions sofaliteNums and sofaliteStrs from DOJO_CHART_JS.
+
+    One per individual chart because the string lookup table belongs to the chart.
+    Once all the data has been serialised, lookup_strs gives the JS literal for the table
+    which must be assigned to the variable lookup_strs before any of the data is used.
+    """
+    def __init__(self, js_data_conf: JSDataConf):
+        self.js_data_conf = js_data_conf
+        self._lookup_str2idx: dict[str, int] = {}
+
+    @staticmethod
+    def _to_json_default(val):
+        """
+        Anything json can't serialise itself e.g. numpy scalars (str() used to cope with them fine)
+        """
+        if hasattr(val, 'item'):
+            return val.item()
+        raise TypeError(f"Object of type {type(val).__name__} is not JSON serializable")
+
+    @staticmethod
+    def to_js(val) -> str:
+        js = json.dumps(val, separators=(',', ':'), ensure_ascii=False, default=JSDataSerialiser._to_json_default)
+        return js.replace('</', '<\\/')  ## never let a string close the surrounding script tag
+
+    def round_num(self, val: float | None) -> float | int | None:
+        if val is None:
+            return None
+        if not isinstance(val, (int, float)) and hasattr(val, 'item'):
+            val = val.item()  ## e.g. numpy int64 -> int so 12.0 -> 12 etc. still applies
+        if self.js_data_conf.dp is not None:
+            val = round(val, self.js_data_conf.dp)
+        if isinstance(val, float) and val.is_integer():
+            val = int(val)  ## 12 not 12.0
+        return val
+
+    def num(self, val: float | None) -> str:
+        return self.to_js(self.round_num(val))
+
+    def nums(self, vals: Sequence[float | None]) -> str:
+        """
+        E.g. [12,3.5,null] or sofaliteNums("i","DAAAAAMAAAA=")
+        """
+        min_len = self.js_data_conf.typed_array_min_len
+        if min_len is not None and len(vals) >= min_len and None not in vals:
+            import numpy as np  ## only needed for typed arrays so not imported with the module
+            if self.js_data_conf.dp is not None:
+                arr = np.round(np.asarray(vals, dtype=np.float64), self.js_data_conf.dp)
+            else:
+                arr = np.asarray(vals, dtype=np.float64)
+            is_int32 = bool(np.all(arr == np.floor(arr)) and arr.min() >= INT32_MIN and arr.max() <= INT32_MAX)
+            if is_int32:
+                type_code, arr_bytes = 'i', arr.astype('<i4').tobytes()
+            else:
+                type_code, arr_bytes = 'f', arr.astype('<f8').tobytes()
+            return f'sofaliteNums("{type_code}","{base64.b64encode(arr_bytes).decode("ascii")}")'
+        return self.to_js([self.round_num(val) for val in vals])
+
+    def strs(self, vals: Sequence[str]) -> str:
+        """
+        E.g. ["a","b"] or, if any repeats, sofaliteStrs(lookup_strs,[0,1,0,0])
+        """
+        if not self.js_data_conf.use_str_lookup:
+            return self.to_js(list(vals))
+        has_repeats = len(set(vals)) < len(vals)
+        if not (has_repeats or any(val in self._lookup_str2idx for val in vals)):
+            return self.to_js(list(vals))
+        idxs = [self._lookup_str2idx.setdefault(val, len(self._lookup_str2idx)) for val in vals]
+        return f"sofaliteStrs(lookup_strs,{self.to_js(idxs)})"
+
+    def dicts(self, vals: Sequence[dict]) -> str:
+        """
+        E.g. [{"x":1451606400000,"y":12}, ...] with numeric values rounded
+        """
+        return self.to_js([
+            {k: self.round_num(v) if isinstance(v, Number) else v for k, v in val.items()}
+            for val in vals])
+
+    @property
+    def lookup_strs(self) -> str:
+        return self.to_js(list(self._lookup_str2idx))  ## dicts keep insertion order i.e. idx order
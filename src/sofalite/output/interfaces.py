@@ -1,24 +1,29 @@
 """
-Note - output.utils.get_report() replies on the template param names here so keep aligned.
+Note - get_asset_html() relies on the template param names here so keep aligned.
 Not worth formally aligning them given how easy to do manually and how static.
 """
 from abc import ABC
+import base64
+from collections.abc import Iterable
 from dataclasses import dataclass
 from enum import StrEnum
+import hashlib
+import os
 from pathlib import Path
+import re
 import sqlite3 as sqlite
+import threading
 from typing import Protocol
 
 import jinja2
-import pandas as pd
 
 from sofalite import SQLITE_DB, logger
-from sofalite.conf.main import INTERNAL_DATABASE_FPATH, SOFALITE_WEB_RESOURCES_ROOT, DbeName
+from sofalite.conf.main import SOFALITE_WEB_RESOURCES_ROOT, DbeName, get_local_paths
 from sofalite.data_extraction.db import ExtendedCursor, get_dbe_spec
-from sofalite.output.charts.conf import DOJO_CHART_JS
+from sofalite.output.charts.conf import DOJO_CHART_JS, LAZY_CHARTS_FLAG_JS
 from sofalite.output.styles.utils import (get_generic_unstyled_css, get_style_spec, get_styled_dojo_chart_css,
     get_styled_placeholder_css_for_main_tbls, get_styled_stats_tbl_css)
-from sofalite.utils.misc import get_safer_name
+from sofalite.utils.misc import STABLE_ELEMENT_ID_PATTERN, get_safer_name
 
 @dataclass(frozen=False)
 class Source(ABC):
@@ -73,13 +78,14 @@ class Source(ABC):
             if not self.csv_separator:
                 self.csv_separator = ','
             if not SQLITE_DB.get('sqlite_default_cur'):
-                SQLITE_DB['sqlite_default_con'] = sqlite.connect(INTERNAL_DATABASE_FPATH)
+                SQLITE_DB['sqlite_default_con'] = sqlite.connect(get_local_paths().internal_database_fpath)
                 SQLITE_DB['sqlite_default_cur'] = ExtendedCursor(SQLITE_DB['sqlite_default_con'].cursor())
             self.cur = SQLITE_DB['sqlite_default_cur']
             self.dbe_spec = get_dbe_spec(DbeName.SQLITE)
             if not self.src_tbl_name:
                 self.src_tbl_name = get_safer_name(self.csv_fpath.stem)
             ## ingest CSV into database
+            import pandas as pd
             df = pd.read_csv(self.csv_fpath, sep=self.csv_separator)
             if_exists = 'replace' if self.overwrite_csv_derived_tbl_if_there else 'fail'
             try:
@@ -100,7 +106,7 @@ class Source(ABC):
                 raise Exception("When supplying a cursor, a tbl_name must also be supplied")
         elif self.src_tbl_name:
             if not SQLITE_DB.get('sqlite_default_cur'):
-                SQLITE_DB['sqlite_default_con'] = sqlite.connect(INTERNAL_DATABASE_FPATH)
+                SQLITE_DB['sqlite_default_con'] = sqlite.connect(get_local_paths().internal_database_fpath)
                 SQLITE_DB['sqlite_default_cur'] = ExtendedCursor(SQLITE_DB['sqlite_default_con'].cursor())
             self.cur = SQLITE_DB['sqlite_default_cur']  ## not already set if in the third path - will have gone down first
             if self.dbe_name and self.dbe_name != DbeName.SQLITE:
@@ -117,11 +123,6 @@ HTML_AND_SOME_HEAD_TPL = """\
 <!DOCTYPE html>
 <head>
 <title>{{title}}</title>
-<style type="text/css">
-<!--
-{{generic_unstyled_css}}
--->
-</style>
 """
 
 CHARTING_LINKS_TPL = """\
@@ -131,9 +132,7 @@ CHARTING_LINKS_TPL = """\
 <script src="{{sofalite_web_resources_root}}/sofalite_charts.js"></script>            
 """
 
-CHARTING_CSS_TPL = """\
-<style type="text/css">
-<!--
+CHARTING_CSS = """\
     .dojoxLegendNode {
         border: 1px solid #ccc;
         margin: 5px 10px 5px 10px;
@@ -153,31 +152,26 @@ CHARTING_CSS_TPL = """\
         float: left;
         }
     }
-{{styled_dojo_chart_css}}
--->
-</style>
 """
 
-CHARTING_JS_TPL = """\
-{{dojo_chart_js}}
-"""
-
-SPACEHOLDER_CSS_TPL = """\
+INLINE_CSS_TPL = """\
 <style type="text/css">
 <!--
-{{styled_placeholder_css_for_main_tbls}}
+{{css}}
 -->
 </style>
 """
 
-STATS_TBL_TPL = """\
-<style type="text/css">
-<!--
-{{styled_stats_tbl_css}}
--->
-</style>
+INLINE_JS_TPL = """\
+<script type="text/javascript">
+{{js}}
+</script>
 """
 
+EXTERNAL_CSS_TPL = """<link rel='stylesheet' type='text/css' href="{{href}}" />"""
+
+EXTERNAL_JS_TPL = """<script src="{{src}}"></script>"""
+
 HEAD_END_TPL = "</head>"
 
 BODY_START_TPL = "<body class='tundra'>"
@@ -192,49 +186,240 @@ class OutputItemType(StrEnum):
     MAIN_TABLE = 'main_table'
     STATS = 'stats'
 
+class PoolType(StrEnum):
+    """
+    How report items are built concurrently - see output.utils.get_html_item_specs()
+    """
+    THREAD = 'thread'
+    PROCESS = 'process'
+
+class AssetType(StrEnum):
+    """
+    CSS and JS fragments report pages can need. Some are the same whatever the style, some are per style.
+    """
+    GENERIC_CSS = 'generic_css'  ## every page
+    CHARTING_LINKS = 'charting_links'
+    CHARTING_JS = 'charting_js'
+    CHARTING_CSS = 'charting_css'
+    STYLED_CHARTING_CSS = 'styled_charting_css'
+    STYLED_MAIN_TBL_CSS = 'styled_main_tbl_css'
+    STYLED_STATS_TBL_CSS = 'styled_stats_tbl_css'
+
+@dataclass(frozen=True)
+class AssetKey:
+    asset_type: AssetType
+    style_name: str | None = None  ## only for styled assets
+
+@dataclass(frozen=True)
+class ExternalAssetsConf:
+    """
+    For sites publishing lots of reports. Rather than inlining shared CSS and JS into every report,
+    write each once into asset_dpath under a content-hashed file name and link to it
+    so it is only stored once and browsers can cache it indefinitely (new content -> new name).
+
+    asset_url_root: how reports refer to asset_dpath e.g. 'assets' if the folder sits alongside the reports,
+    or a full URL if served from elsewhere.
+    images_as_files: also write embedded base64 images (e.g. Matplotlib PNGs) out as files.
+    """
+    asset_dpath: Path
+    asset_url_root: str
+    images_as_files: bool = False
+
+def write_hashed_asset(content: bytes, *, stem: str, extension: str, asset_dpath: Path) -> str:
+    """
+    Write content under a name derived from its hash (unless already there) and return the file name.
+    Written under a temporary name first and then renamed
+    so concurrent report writers never see a partial file.
+    """
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    fname = f"{stem}-{digest}.{extension}"
+    fpath = asset_dpath / fname
+    if not fpath.exists():
+        asset_dpath.mkdir(parents=True, exist_ok=True)
+        tmp_fpath = asset_dpath / f".{fname}.{os.getpid()}-{threading.get_ident()}.tmp"
+        tmp_fpath.write_bytes(content)
+        os.replace(tmp_fpath, fpath)
+    return fname
+
+EMBEDDED_IMG_PATTERN = re.compile(r'data:image/(png|gif|jpeg);base64,([A-Za-z0-9+/=]+)')
+
+def externalise_images(html: str, external_assets: ExternalAssetsConf, *, is_css_asset=False) -> str:
+    """
+    Swap embedded base64 images for URLs of the same images written out as hashed files.
+
+    is_css_asset: the content is CSS which will itself be written into asset_dpath.
+    URLs in a CSS file are resolved relative to the CSS file (which sits next to the images) so just the file name.
+    Otherwise (content in the report) they are resolved relative to the report so asset_url_root is needed.
+    """
+    def to_url(match: re.Match) -> str:
+        extension, img_base64 = match.groups()
+        fname = write_hashed_asset(base64.b64decode(img_base64),
+            stem='img', extension=extension, asset_dpath=external_assets.asset_dpath)
+        return fname if is_css_asset else f"{external_assets.asset_url_root}/{fname}"
+    return EMBEDDED_IMG_PATTERN.sub(to_url, html)
+
+def get_asset_content(asset_key: AssetKey, *, lazy_charts: bool = False) -> str:
+    """
+    Raw CSS or JS (not wrapped in tags)
+
+    lazy_charts: charts are only built as they come near the viewport
+    rather than all at once on page load (which can freeze the browser if there are hundreds)
+    """
+    asset_type = asset_key.asset_type
+    if asset_type == AssetType.GENERIC_CSS:
+        content = get_generic_unstyled_css()
+    elif asset_type == AssetType.CHARTING_JS:
+        content = f"{LAZY_CHARTS_FLAG_JS}{DOJO_CHART_JS}" if lazy_charts else DOJO_CHART_JS
+    elif asset_type == AssetType.CHARTING_CSS:
+        content = CHARTING_CSS
+    elif asset_type == AssetType.STYLED_CHARTING_CSS:
+        style_spec = get_style_spec(asset_key.style_name)
+        content = get_styled_dojo_chart_css(style_spec.dojo)
+    elif asset_type == AssetType.STYLED_MAIN_TBL_CSS:
+        content = get_styled_placeholder_css_for_main_tbls(asset_key.style_name)
+    elif asset_type == AssetType.STYLED_STATS_TBL_CSS:
+        style_spec = get_style_spec(asset_key.style_name)
+        content = get_styled_stats_tbl_css(style_spec)
+    else:
+        raise ValueError(f"Unexpected asset type '{asset_type}'")
+    return content
+
+def get_asset_html(asset_key: AssetKey, external_assets: ExternalAssetsConf | None = None, *,
+        lazy_charts: bool = False) -> str:
+    """
+    Inline <style> or <script> by default.
+    If external_assets, a <link> or <script src=...> pointing to the asset written out as a hashed file.
+    """
+    environment = jinja2.Environment()
+    if asset_key.asset_type == AssetType.CHARTING_LINKS:  ## always external - on the sofalite web resources server
+        return environment.from_string(CHARTING_LINKS_TPL).render(
+            {'sofalite_web_resources_root': SOFALITE_WEB_RESOURCES_ROOT})
+    content = get_asset_content(asset_key, lazy_charts=lazy_charts)
+    is_js = asset_key.asset_type == AssetType.CHARTING_JS
+    if not external_assets:
+        if is_js:
+            html = environment.from_string(INLINE_JS_TPL).render({'js': content})
+        else:
+            html = environment.from_string(INLINE_CSS_TPL).render({'css': content})
+        return html
+    if external_assets.images_as_files:
+        content = externalise_images(content, external_assets, is_css_asset=not is_js)  ## e.g. background images in table CSS
+    stem = asset_key.asset_type.value
+    if asset_key.style_name:
+        stem = f"{stem}-{get_safer_name(asset_key.style_name)}"
+    fname = write_hashed_asset(content.encode('utf-8'),
+        stem=stem, extension='js' if is_js else 'css', asset_dpath=external_assets.asset_dpath)
+    url = f"{external_assets.asset_url_root}/{fname}"
+    if is_js:
+        html = environment.from_string(EXTERNAL_JS_TPL).render({'src': url})
+    else:
+        html = environment.from_string(EXTERNAL_CSS_TPL).render({'href': url})
+    return html
+
+class AssetCollector:
+    """
+    Keeps track of which CSS and JS fragments (assets) have already been emitted for a page
+    so each is only emitted once no matter how many items need it.
+
+    Assets are inlined unless external_assets is supplied - see ExternalAssetsConf.
+    If lazy_charts, charts are only built as they come near the viewport (using IntersectionObserver).
+
+    Also keeps element ids unique across the page. Ids are derived from item content
+    (see get_stable_element_id) so the same item appearing twice would otherwise clash -
+    the repeats get a numbered suffix.
+    """
+    def __init__(self, external_assets: ExternalAssetsConf | None = None, *, lazy_charts: bool = False):
+        self.external_assets = external_assets
+        self.lazy_charts = lazy_charts
+        self.asset_keys_done = set()
+        self.element_id2n = {}
+
+    def get_new_asset_keys(self, asset_keys: Iterable[AssetKey]) -> list[AssetKey]:
+        """
+        Asset keys (in order) not already collected. All are now treated as collected.
+        """
+        new_asset_keys = []
+        for asset_key in asset_keys:
+            if asset_key not in self.asset_keys_done:
+                new_asset_keys.append(asset_key)
+                self.asset_keys_done.add(asset_key)
+        return new_asset_keys
+
+    def get_new_assets_html(self, asset_keys: Iterable[AssetKey]) -> str:
+        return '\n'.join(get_asset_html(asset_key, self.external_assets, lazy_charts=self.lazy_charts)
+            for asset_key in self.get_new_asset_keys(asset_keys))
+
+    def get_head_start_html(self, title: str) -> str:
+        """
+        Start of page up to, and including, the generic unstyled CSS every page gets
+        """
+        environment = jinja2.Environment()
+        html_and_some_head = environment.from_string(HTML_AND_SOME_HEAD_TPL).render({'title': title})
+        generic_css = self.get_new_assets_html([AssetKey(AssetType.GENERIC_CSS), ])
+        return f"{html_and_some_head}\n{generic_css}"
+
+    def get_item_html(self, html_item_str: str) -> str:
+        if self.external_assets and self.external_assets.images_as_files:
+            html_item_str = externalise_images(html_item_str, self.external_assets)
+        html_item_str = self._get_html_with_unique_element_ids(html_item_str)
+        return html_item_str
+
+    def _get_html_with_unique_element_ids(self, html_item_str: str) -> str:
+        item_element_ids = dict.fromkeys(STABLE_ELEMENT_ID_PATTERN.findall(html_item_str))  ## ordered and distinct
+        element_id2replacement = {}
+        for element_id in item_element_ids:
+            n = self.element_id2n.get(element_id, 0)
+            if n:
+                element_id2replacement[element_id] = f"{element_id}_{n}"
+            self.element_id2n[element_id] = n + 1
+        if element_id2replacement:
+            html_item_str = STABLE_ELEMENT_ID_PATTERN.sub(
+                lambda match: element_id2replacement.get(match.group(0), match.group(0)), html_item_str)
+        return html_item_str
+
 @dataclass(frozen=True)
 class HTMLItemSpec:
     html_item_str: str
     style_name: str
     output_item_type: OutputItemType
 
-    def to_standalone_html(self, title: str) -> str:
-        style_spec = get_style_spec(self.style_name)
-        tpl_bits = [HTML_AND_SOME_HEAD_TPL, ]
+    @property
+    def asset_keys(self) -> list[AssetKey]:
+        """
+        The CSS and JS fragments this item needs (beyond the generic unstyled CSS every page gets).
+        """
         if self.output_item_type == OutputItemType.CHART:
-            tpl_bits.append(CHARTING_LINKS_TPL)
-            tpl_bits.append(CHARTING_CSS_TPL)
-            tpl_bits.append(CHARTING_JS_TPL)
-        if self.output_item_type == OutputItemType.MAIN_TABLE:
-            tpl_bits.append(SPACEHOLDER_CSS_TPL)
-        if self.output_item_type == OutputItemType.STATS:
-            tpl_bits.append(STATS_TBL_TPL)
-        tpl_bits.append(HEAD_END_TPL)
-        tpl_bits.append(BODY_START_TPL)
-        tpl_bits.append(self.html_item_str)  ## <======= the actual item content e.g. chart
-        tpl_bits.append(BODY_AND_HTML_END_TPL)
-        tpl = '\n'.join(tpl_bits)
+            asset_keys = [
+                AssetKey(AssetType.CHARTING_LINKS),
+                AssetKey(AssetType.CHARTING_JS),
+                AssetKey(AssetType.CHARTING_CSS),
+                AssetKey(AssetType.STYLED_CHARTING_CSS, self.style_name),
+            ]
+        elif self.output_item_type == OutputItemType.MAIN_TABLE:
+            asset_keys = [AssetKey(AssetType.STYLED_MAIN_TBL_CSS, self.style_name), ]
+        elif self.output_item_type == OutputItemType.STATS:
+            asset_keys = [AssetKey(AssetType.STYLED_STATS_TBL_CSS, self.style_name), ]
+        else:
+            raise ValueError(f"Unexpected output item type '{self.output_item_type}'")
+        return asset_keys
 
-        environment = jinja2.Environment()
-        template = environment.from_string(tpl)
-        context = {
-            'generic_unstyled_css': get_generic_unstyled_css(),
-            'sofalite_web_resources_root': SOFALITE_WEB_RESOURCES_ROOT,
-            'title': title,
-        }
-        if self.output_item_type == OutputItemType.CHART:
-            context['styled_dojo_chart_css'] = get_styled_dojo_chart_css(style_spec.dojo)
-            context['dojo_chart_js'] = DOJO_CHART_JS
-        if self.output_item_type == OutputItemType.MAIN_TABLE:
-            context['styled_placeholder_css_for_main_tbls'] = get_styled_placeholder_css_for_main_tbls(self.style_name)
-        if self.output_item_type == OutputItemType.STATS:
-            context['styled_stats_tbl_css'] = get_styled_stats_tbl_css(style_spec)
-        html = template.render(context)
+    def to_standalone_html(self, title: str, *,
+            external_assets: ExternalAssetsConf | None = None, lazy_charts: bool = False) -> str:
+        asset_collector = AssetCollector(external_assets, lazy_charts=lazy_charts)
+        html = '\n'.join([
+            asset_collector.get_head_start_html(title),
+            asset_collector.get_new_assets_html(self.asset_keys),
+            HEAD_END_TPL,
+            BODY_START_TPL,
+            asset_collector.get_item_html(self.html_item_str),  ## <======= the actual item content e.g. chart
+            BODY_AND_HTML_END_TPL,
+        ])
         return html
 
-    def to_file(self, fpath: Path, title: str):
+    def to_file(self, fpath: Path, title: str, *,
+            external_assets: ExternalAssetsConf | None = None, lazy_charts: bool = False):
         with open(fpath, 'w') as f:
-            f.write(self.to_standalone_html(title))
+            f.write(self.to_standalone_html(title, external_assets=external_assets, lazy_charts=lazy_charts))
 
 class HasToHTMLItemSpec(Protocol):
     def to_html_spec(self) -> HTMLItemSpec: ...
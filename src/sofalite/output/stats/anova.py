@@ -1,13 +1,14 @@
-from collections.abc import Collection
+from collections.abc import Callable, Collection, Sequence
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 import jinja2
 
-from sofalite.conf.main import VAR_LABELS
+from sofalite.conf.main import get_var_labels
 from sofalite.data_extraction.interfaces import ValSpec
 from sofalite.data_extraction.stats.anova import get_results
+from sofalite.data_extraction.utils import get_sample
 from sofalite.data_extraction.stats.msgs import (
     ci_explain, kurtosis_explain,
     normality_measure_explain, obrien_explain, one_tail_explain,
@@ -18,18 +19,18 @@ from sofalite.output.charts import mpl_pngs
 from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
 from sofalite.output.stats.common import get_group_histogram_html
 from sofalite.output.styles.interfaces import StyleSpec
-from sofalite.output.styles.utils import get_generic_unstyled_css, get_style_spec, get_styled_stats_tbl_css
+from sofalite.output.styles.utils import get_style_spec
 from sofalite.stats_calc.interfaces import AnovaResultExt, NumericSampleSpecFormatted
 from sofalite.utils.maths import format_num, is_numeric
 from sofalite.utils.stats import get_p_str
 
-def make_anova_html(result: AnovaResultExt, style_spec: StyleSpec, *, dp: int) -> str:
+def make_anova_html(result: AnovaResultExt, style_spec: StyleSpec, *, dp: int,
+        get_group_vals: Callable[[str], Sequence[float]] | None = None) -> str:
+    """
+    get_group_vals: group lbl => values. Only needed for the histograms,
+     and only if the results were calculated without fetching the values (see SampleMoments).
+    """
     tpl = """\
-    <style>
-        {{ generic_unstyled_css }}
-        {{ styled_stats_tbl_css }}
-    </style>
-
     <div class='default'>
     <h2>{{ title }}</h2>
     <h3>Analysis of variance table</h3>
@@ -113,8 +114,6 @@ def make_anova_html(result: AnovaResultExt, style_spec: StyleSpec, *, dp: int) -
 
     </div>
     """
-    generic_unstyled_css = get_generic_unstyled_css()
-    styled_stats_tbl_css = get_styled_stats_tbl_css(style_spec)
     group_vals = [group_spec.lbl for group_spec in result.group_specs]
     if len(group_vals) < 2:
         raise Exception(f"Expected multiple groups in ANOVA. Details:\n{result}")
@@ -151,17 +150,16 @@ def make_anova_html(result: AnovaResultExt, style_spec: StyleSpec, *, dp: int) -
         formatted_group_specs.append(formatted_group_spec)
         ## make images
         try:
+            group_vals = orig_group_spec.vals if orig_group_spec.vals is not None else get_group_vals(orig_group_spec.lbl)
             histogram_html = get_group_histogram_html(
-                result.measure_fld_lbl, style_spec.chart, orig_group_spec.lbl, orig_group_spec.vals)
+                result.measure_fld_lbl, style_spec.chart, orig_group_spec.lbl, group_vals)
         except Exception as e:
             html_or_msg = f"<b>{orig_group_spec.lbl}</b> - unable to display histogram. Reason: {e}"
         else:
             html_or_msg = histogram_html
         histograms2show.append(html_or_msg)
     context = {
-        'generic_unstyled_css': generic_unstyled_css,
         'style_name_hyphens': style_spec.style_name_hyphens,
-        'styled_stats_tbl_css': styled_stats_tbl_css,
         'title': title,
 
         'degrees_freedom_between_groups': f"{result.degrees_freedom_between_groups:,}",
@@ -212,9 +210,10 @@ class AnovaSpec(Source):
         ## style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        grouping_fld_lbl = VAR_LABELS.var2var_lbl.get(self.grouping_fld_name, self.grouping_fld_name)
-        measure_fld_lbl = VAR_LABELS.var2var_lbl.get(self.measure_fld_name, self.measure_fld_name)
-        val2lbl = VAR_LABELS.var2val2lbl.get(self.grouping_fld_name)
+        var_labels = get_var_labels()
+        grouping_fld_lbl = var_labels.var2var_lbl.get(self.grouping_fld_name, self.grouping_fld_name)
+        measure_fld_lbl = var_labels.var2var_lbl.get(self.measure_fld_name, self.measure_fld_name)
+        val2lbl = var_labels.var2val2lbl.get(self.grouping_fld_name)
         grouping_fld_vals_spec = list({
             ValSpec(val=group_val, lbl=val2lbl.get(group_val, str(group_val))) for group_val in self.group_vals})
         grouping_fld_vals_spec.sort(key=lambda vs: vs.lbl)
@@ -226,7 +225,13 @@ class AnovaSpec(Source):
             grouping_val_is_numeric=grouping_val_is_numeric,
             measure_fld_name=self.measure_fld_name, measure_fld_lbl=measure_fld_lbl,
             high_precision_required=self.high_precision_required)
-        html = make_anova_html(results, style_spec, dp=self.dp)
+        lbl2val_spec = {val_spec.lbl: val_spec for val_spec in grouping_fld_vals_spec}
+        def get_group_vals(group_lbl: str) -> Sequence[float]:
+            sample = get_sample(cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
+                grouping_filt_fld_name=self.grouping_fld_name, grouping_filt_val_spec=lbl2val_spec[group_lbl],
+                grouping_filt_val_is_numeric=grouping_val_is_numeric, measure_fld_name=self.measure_fld_name)
+            return sample.vals
+        html = make_anova_html(results, style_spec, dp=self.dp, get_group_vals=get_group_vals)
         return HTMLItemSpec(
             html_item_str=html,
             style_name=self.style_name,
@@ -0,0 +1,152 @@
+"""
+Chi Square tests of association (plus Cramér's V) for every pair of a list of categorical variables.
+The results come from data_extraction.stats.association_matrix - here they are presented.
+
+A pair which can't be tested e.g. because a variable has too many separate values
+is shown as n/a with the reason rather than stopping the whole matrix.
+"""
+from collections.abc import Sequence
+from dataclasses import dataclass
+from html import escape as html_escape
+from pathlib import Path
+from typing import Any
+
+import jinja2
+import numpy as np
+
+from sofalite.conf.main import get_var_labels
+from sofalite.data_extraction.count_cube import CountsRequest
+from sofalite.data_extraction.stats.association_matrix import get_cube_filt_clause, get_results
+from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
+from sofalite.output.styles.interfaces import StyleSpec
+from sofalite.output.styles.utils import get_style_spec
+from sofalite.output.utils import get_variables_matrix_tbl
+from sofalite.stats_calc.interfaces import AssociationMatrixResult
+from sofalite.utils.stats import get_p_str
+
+PCT_CELLS_LT_5_WARNING_THRESHOLD = 20  ## the usual rule of thumb - more than this and the Chi Square may be unreliable
+
+def get_association_matrix_tbl(variable_labels: Sequence[str], result: AssociationMatrixResult,
+        style_name_hyphens: str, *, dp: int) -> str:
+    """
+    Chi Square (with df), p, and Cramér's V for every pair. Diagonal left blank.
+    """
+    def get_cell_content(row_idx: int, col_idx: int) -> str:
+        chi_square = result.chi_squares[row_idx, col_idx]
+        if np.isnan(chi_square):
+            return 'n/a'
+        p = float(result.ps[row_idx, col_idx])
+        cramers_v = float(result.cramers_vs[row_idx, col_idx])
+        degrees_of_freedom = int(result.degrees_of_freedom[row_idx, col_idx])
+        return (f"{round(float(chi_square), dp)} (df {degrees_of_freedom})"
+            f"<br>p {get_p_str(p)}<br>V {round(cramers_v, dp)}")
+    return get_variables_matrix_tbl(variable_labels, style_name_hyphens, get_cell_content=get_cell_content)
+
+def make_association_matrix_html(result: AssociationMatrixResult, style_spec: StyleSpec, *, dp: int) -> str:
+    tpl = """\
+    <div class='default'>
+    <h2>{{ title }}</h2>
+
+    <p>Pearson's Chi Square statistic (with Degrees of Freedom), p value<a href='#ft1'><sup>1</sup></a>,
+    and Cramér's V<a href='#ft2'><sup>2</sup></a> for each pair<a href='#ft3'><sup>3</sup></a></p>
+    {{ association_matrix_tbl }}
+
+    {% if untested_msgs %}
+      <p>Pairs not tested:</p>
+      <ul>
+      {% for untested_msg in untested_msgs %}
+        <li>{{ untested_msg }}</li>
+      {% endfor %}
+      </ul>
+    {% endif %}
+
+    {% if low_expected_msgs %}
+      <p>Pairs with more than {{ pct_cells_lt_5_threshold }}&#37; of cells with expected count < 5
+      (treat their results with caution):</p>
+      <ul>
+      {% for low_expected_msg in low_expected_msgs %}
+        <li>{{ low_expected_msg }}</li>
+      {% endfor %}
+      </ul>
+    {% endif %}
+
+    {% for footnote in footnotes %}
+      <p><a id='ft{{ loop.index }}'></a><sup>{{ loop.index }}</sup>{{ footnote }}</p>
+    {% endfor %}
+
+    <p>{{ workings_msg }}</p>
+    </div>
+    """
+    var2var_lbl = get_var_labels().var2var_lbl
+    variable_labels = [var2var_lbl.get(variable_name, variable_name) for variable_name in result.variable_names]
+    variable_name2lbl = dict(zip(result.variable_names, variable_labels))
+    quoted_variable_labels = ', '.join(f'"{variable_label}"' for variable_label in variable_labels)
+    title = f"Results of Pearson's Chi Square Tests of Association for {quoted_variable_labels}"
+    untested_msgs = [
+        html_escape(f'"{variable_name2lbl[variable_a_name]}" and "{variable_name2lbl[variable_b_name]}" - {msg}')
+        for (variable_a_name, variable_b_name), msg in result.pair2msg.items()]
+    low_expected_msgs = []
+    for idx_a, idx_b in zip(*np.triu_indices(len(variable_labels), k=1)):
+        pct_cells_lt_5 = result.pcts_cells_lt_5[idx_a, idx_b]
+        if pct_cells_lt_5 > PCT_CELLS_LT_5_WARNING_THRESHOLD:  ## nan (not tested) never is
+            min_count_rounded = round(float(result.minimum_cell_counts[idx_a, idx_b]), dp)
+            low_expected_msgs.append(html_escape(
+                f'"{variable_labels[idx_a]}" and "{variable_labels[idx_b]}" - {round(float(pct_cells_lt_5), 1)}% '
+                f"(minimum expected cell count: {min_count_rounded})"))
+    p_explain = ("If p is small, e.g. less than 0.01, or 0.001, you can assume the result is statistically significant "
+        "i.e. there is a relationship between the two variables. "
+        "Note: a statistically significant difference may not necessarily be of any practical significance.")
+    one_tail_explain = ("This is a one-tailed result "
+        "i.e. based on the likelihood of a difference in one particular direction")
+    p_full_explanation = f"{p_explain}</br></br>{one_tail_explain}"
+    cramers_v_explain = ("Cramér's V is a measure of the strength of association from 0 (none) to 1 (complete). "
+        "Unlike the Chi Square statistic it doesn't depend on the number of records or values "
+        "so pairs can be compared with each other.")
+    pairwise_explain = ("Only records with values for both variables in a pair are included in that pair's test "
+        "(the same as for a Chi Square test run on that pair alone).")
+    context = {
+        'association_matrix_tbl': get_association_matrix_tbl(
+            variable_labels, result, style_spec.style_name_hyphens, dp=dp),
+        'footnotes': [p_full_explanation, cramers_v_explain, pairwise_explain],
+        'low_expected_msgs': low_expected_msgs,
+        'pct_cells_lt_5_threshold': PCT_CELLS_LT_5_WARNING_THRESHOLD,
+        'title': title,
+        'untested_msgs': untested_msgs,
+        'workings_msg': "Run a Chi Square test on an individual pair to see its observed and expected frequencies.",
+    }
+    environment = jinja2.Environment()
+    template = environment.from_string(tpl)
+    html = template.render(context)
+    return html
+
+@dataclass(frozen=False)
+class AssociationMatrixSpec(Source):
+    style_name: str
+    variable_names: Sequence[str]
+    dp: int = 3
+
+    ## do not try to DRY this repeated code ;-) - see doc string for Source
+    csv_fpath: Path | None = None
+    csv_separator: str = ','
+    overwrite_csv_derived_tbl_if_there: bool = False
+    cur: Any | None = None
+    dbe_name: str | None = None  ## database engine name
+    src_tbl_name: str | None = None
+    tbl_filt_clause: str | None = None
+
+    def get_counts_requests(self) -> list[CountsRequest]:
+        return [CountsRequest(self.src_tbl_name, get_cube_filt_clause(self.tbl_filt_clause),
+            tuple(self.variable_names)), ]
+
+    def to_html_spec(self) -> HTMLItemSpec:
+        ## style
+        style_spec = get_style_spec(style_name=self.style_name)
+        ## data
+        result = get_results(self.cur, src_tbl_name=self.src_tbl_name, tbl_filt_clause=self.tbl_filt_clause,
+            variable_names=self.variable_names)
+        html = make_association_matrix_html(result, style_spec, dp=self.dp)
+        return HTMLItemSpec(
+            html_item_str=html,
+            style_name=self.style_name,
+            output_item_type=OutputItemType.STATS,
+        )
@@ -1,6 +1,7 @@
 import base64
 from collections.abc import Collection, Sequence
 from dataclasses import dataclass
+from functools import lru_cache
 from html import escape as html_escape
 from io import BytesIO
 from pathlib import Path
@@ -10,12 +11,13 @@ import numpy as np
 import jinja2
 
 from sofalite import logger
-from sofalite.conf.main import VAR_LABELS
+from sofalite.conf.main import get_var_labels
 from sofalite.data_extraction.stats.chi_square import get_results
-from sofalite.output.charts import boomslang
+from sofalite.output.charts import mpl_pngs
+from sofalite.output.charts.mpl_pngs import ClusteredBarChartConf, ClusteredBarSeries
 from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
 from sofalite.output.styles.interfaces import StyleSpec
-from sofalite.output.styles.utils import get_generic_unstyled_css, get_style_spec, get_styled_stats_tbl_css
+from sofalite.output.styles.utils import get_style_spec
 from sofalite.output.utils import format_num, get_p, get_p_explain
 from sofalite.stats_calc.interfaces import ChiSquareResult, ChiSquareWorkedResultData
 
@@ -233,40 +235,47 @@ def get_lbls_in_lines(orig_txt: str, max_width: int, *, dojo=False, rotate=False
     logger.debug(wrapped_txt)
     return wrapped_txt, actual_lbl_width, n_lines
 
-def config_clustered_barchart(plot, style_spec: StyleSpec, *,
-        variable_label_a: str, variable_a_labels: Sequence[str], variable_b_labels: Sequence[str], y_label,
-        as_in_bs_list: list[float]):
+def get_clustered_barchart_conf(style_spec: StyleSpec, *, title: str,
+        variable_label_a: str, variable_a_labels: Sequence[str], variable_b_labels: Sequence[str], y_label: str,
+        as_in_bs_list: Sequence[Sequence[float]], width: float, height: float | None,
+        x_tick_lbl_font_size: int) -> ClusteredBarChartConf:
     """
     Clustered bar charts
 
     Var A defines the clusters and B the split within the clusters e.g. gender
-    vs country = gender as boomslang bars and country as values within bars.
+    vs country = gender as bars and country as values within bars.
     """
-    grid_bg = style_spec.chart.chart_bg_colour
     bar_colours = [colour_with_highlight.main for colour_with_highlight in style_spec.chart.colour_mappings]
-    clustered_bars = boomslang.ClusteredBars()
-    clustered_bars.grid_bg = grid_bg
     labels_n = len(variable_b_labels)
+    max_width = 17 if labels_n < 5 else 10
+    series = []
     for i, val_label_b in enumerate(variable_b_labels):
-        cluster = boomslang.Bar()
-        x_vals = range(len(variable_a_labels))
-        cluster.xValues = x_vals
-        y_vals = as_in_bs_list[i]
-        logger.debug(f'x_vals={x_vals}')
-        logger.debug(f'y_vals={y_vals}')
-        cluster.yValues = y_vals
-        logger.debug(f"i={i}, bar_colours={bar_colours}")
-        cluster.color = bar_colours[i]
-        cluster.edgeColor = 'white'
-        max_width = 17 if labels_n < 5 else 10
-        cluster.label, _actual_lbl_width, _n_lines = get_lbls_in_lines(orig_txt=val_label_b, max_width=max_width)
-        clustered_bars.add(cluster)
-    clustered_bars.spacing = 0.5
-    clustered_bars.xTickLabels = variable_a_labels
-    logger.debug(f'xTickLabels: {clustered_bars.xTickLabels}')
-    plot.add(clustered_bars)
-    plot.setXLabel(variable_label_a)
-    plot.setYLabel(y_label)
+        series_lbl, _actual_lbl_width, _n_lines = get_lbls_in_lines(orig_txt=val_label_b, max_width=max_width)
+        series.append(ClusteredBarSeries(lbl=series_lbl, y_vals=tuple(as_in_bs_list[i]), colour=bar_colours[i]))
+    return ClusteredBarChartConf(
+        title=title,
+        x_axis_lbl=variable_label_a,
+        y_axis_lbl=y_label,
+        x_tick_lbls=tuple(variable_a_labels),
+        series=tuple(series),
+        width_inches=width,
+        height_inches=height,
+        inner_bg_colour=style_spec.chart.chart_bg_colour,
+        x_tick_lbl_font_size=x_tick_lbl_font_size,
+    )
+
+@lru_cache(maxsize=32)
+def get_clustered_barchart_html(chart_conf: ClusteredBarChartConf) -> str:
+    """
+    Delivered as base64-encoded binary image.
+    Cached on the (hashable) chart conf so re-rendering an unchanged result doesn't redraw.
+    """
+    fig = mpl_pngs.get_clustered_barchart_fig(chart_conf)
+    b_io = BytesIO()
+    fig.savefig(b_io, bbox_inches='tight')  ## save to a fake file
+    chart_base64 = base64.b64encode(b_io.getvalue()).decode('utf-8')
+    html = f'<img src="data:image/png;base64,{chart_base64}"/>'
+    return html
 
 def get_chi_square_charts(style_spec: StyleSpec,
         variable_label_a: str, variable_label_b: str,
@@ -275,7 +284,6 @@ def get_chi_square_charts(style_spec: StyleSpec,
     """
     Delivered as base64-encoded binary images
     """
-    html_bits = []
     ## NB observed_values_a_then_b_ordered is 'b's within 'a', and we need data structured the other way around
     n_clusters = variable_b_labels_n = len(variable_b_labels)
     if n_clusters < 8:
@@ -286,75 +294,37 @@ def get_chi_square_charts(style_spec: StyleSpec,
         height = 4.5
     rows_n = int(len(observed_values_a_then_b_ordered) / variable_b_labels_n)
     cols_n = variable_b_labels_n
-    bs_in_as = np.array(observed_values_a_then_b_ordered).reshape(rows_n, cols_n)
-    as_in_bs_list = bs_in_as.transpose().tolist()
+    bs_in_as = np.array(observed_values_a_then_b_ordered, dtype=float).reshape(rows_n, cols_n)
+    as_in_bs = bs_in_as.transpose()
     ## proportions of b within a
-    proportions_of_bs_in_as = []
     ## expected proportion of b's in a's - so we have a reference to compare rest to
-    total = sum(observed_values_a_then_b_ordered)
-    expected_proportion_of_bs_in_as = []
-    for as_in_b_list in as_in_bs_list:
-        expected_proportion_of_bs_in_as.append(float(sum(as_in_b_list)) / float(total))
-    proportions_of_bs_in_as.append(expected_proportion_of_bs_in_as)
+    expected_proportion_of_bs_in_as = as_in_bs.sum(axis=1) / bs_in_as.sum()
     ## actual observed b's in a's
-    bs_in_as_list = bs_in_as.tolist()
-    for bs in bs_in_as_list:
-        proportions_list = []
-        for b in bs:
-            proportions_list.append(float(b) / float(sum(bs)))
-        proportions_of_bs_in_as.append(proportions_list)
-    proportions_of_as_in_bs_list = np.array(proportions_of_bs_in_as).transpose().tolist()
+    proportions_of_bs_in_as = bs_in_as / bs_in_as.sum(axis=1, keepdims=True)
+    proportions_of_as_in_bs = np.vstack([expected_proportion_of_bs_in_as, proportions_of_bs_in_as]).transpose()
     logger.debug(observed_values_a_then_b_ordered)
     logger.debug(bs_in_as)
-    logger.debug(as_in_bs_list)
-    logger.debug(bs_in_as_list)
-    title_overrides = {'fontsize': 14}
+    x_tick_lbl_font_size = get_x_axis_font_size(variable_a_labels)
     ## chart 1 - proportions ****************************************************
-    plot_1 = boomslang.Plot()
-    chart_1_title = f"{variable_label_a} and {variable_label_b} - Proportions"
-    plot_1.setTitle(chart_1_title)
-    plot_1.setTitleProperties(title_overrides)
-    plot_1.setDimensions(width, height)
-    plot_1.hasLegend(columns=variable_b_labels_n, location='lower left')
-    plot_1.setAxesLabelSize(11)
-    plot_1.setXTickLabelSize(get_x_axis_font_size(variable_a_labels))
-    plot_1.setLegendLabelSize(9)
-    variable_a_labels_with_ref = variable_a_labels[:]
-    variable_a_labels_with_ref.insert(0, "All\ncombined")
-    config_clustered_barchart(plot_1, style_spec, variable_label_a=variable_label_a,
-        variable_a_labels=variable_a_labels_with_ref, variable_b_labels=variable_b_labels, y_label='Proportions',
-        as_in_bs_list=proportions_of_as_in_bs_list)
-    b_io_1 = BytesIO()
-    plot_1.save(b_io_1)  ## save to a fake file
-    chart_base64_1 = base64.b64encode(b_io_1.getvalue()).decode('utf-8')
-    html_bits.append(f'<img src="data:image/png;base64,{chart_base64_1}"/>')
+    variable_a_labels_with_ref = ["All\ncombined", *variable_a_labels]
+    chart_conf_1 = get_clustered_barchart_conf(style_spec,
+        title=f"{variable_label_a} and {variable_label_b} - Proportions",
+        variable_label_a=variable_label_a, variable_a_labels=variable_a_labels_with_ref,
+        variable_b_labels=variable_b_labels, y_label='Proportions',
+        as_in_bs_list=proportions_of_as_in_bs.tolist(), width=width, height=height,
+        x_tick_lbl_font_size=x_tick_lbl_font_size)
     ## chart 2 - freqs **********************************************************
-    plot_2 = boomslang.Plot()
-    chart_2_title = f"{variable_label_a} and {variable_label_b} - Frequencies"
-    plot_2.setTitle(chart_2_title)
-    plot_2.setTitleProperties(title_overrides)
-    plot_2.setDimensions(width, height)
-    plot_2.hasLegend(columns=len(variable_b_labels), location='lower left')
-    plot_2.setAxesLabelSize(11)
-    plot_2.setXTickLabelSize(get_x_axis_font_size(variable_a_labels))
-    plot_2.setLegendLabelSize(9)
-    ## only need 6 because program limits to that. See core_stats.get_obs_exp().  ## TODO - clarify 6 what etc
-    config_clustered_barchart(plot_2, style_spec, variable_label_a=variable_label_a,
-        variable_a_labels=variable_a_labels, variable_b_labels=variable_b_labels, y_label='Frequencies',
-        as_in_bs_list=as_in_bs_list)
-    b_io_2 = BytesIO()
-    plot_2.save(b_io_2)  ## save to a fake file
-    chart_base64_2 = base64.b64encode(b_io_2.getvalue()).decode('utf-8')
-    html_bits.append(f'<img src="data:image/png;base64,{chart_base64_2}"/>')
+    chart_conf_2 = get_clustered_barchart_conf(style_spec,
+        title=f"{variable_label_a} and {variable_label_b} - Frequencies",
+        variable_label_a=variable_label_a, variable_a_labels=variable_a_labels,
+        variable_b_labels=variable_b_labels, y_label='Frequencies',
+        as_in_bs_list=as_in_bs.tolist(), width=width, height=height,
+        x_tick_lbl_font_size=x_tick_lbl_font_size)
+    html_bits = [get_clustered_barchart_html(chart_conf) for chart_conf in (chart_conf_1, chart_conf_2)]
     return '\n'.join(html_bits)
 
 def make_chi_square_html(results: ChiSquareResult, style_spec: StyleSpec, *, dp: int, show_workings=False) -> str:
     tpl = """\
-    <style>
-        {{generic_unstyled_css}}
-        {{styled_stats_tbl_css}}
-    </style>
-
     <div class='default'>
     <h2>{{ title }}</h2>
     <p>p value {{ p_text }}<a href='#ft1'><sup>1</sup></a></p>
@@ -384,21 +354,20 @@ def make_chi_square_html(results: ChiSquareResult, style_spec: StyleSpec, *, dp:
 
     </div>
     """
-    generic_unstyled_css = get_generic_unstyled_css()
-    styled_stats_tbl_css = get_styled_stats_tbl_css(style_spec)
-    variable_label_a = VAR_LABELS.var2var_lbl.get(results.variable_a_name, results.variable_a_name)  ## TODO
-    variable_label_b = VAR_LABELS.var2var_lbl.get(results.variable_b_name, results.variable_b_name)
+    var_labels = get_var_labels()
+    variable_label_a = var_labels.var2var_lbl.get(results.variable_a_name, results.variable_a_name)  ## TODO
+    variable_label_b = var_labels.var2var_lbl.get(results.variable_b_name, results.variable_b_name)
     title = (f"Results of Pearson's Chi Square Test of Association "
         f'Between "{variable_label_a}" and "{variable_label_b}"')
 
     p_text = get_p(results.p)
     chi_square = round(results.chi_square, dp)
 
-    variable_label_a = VAR_LABELS.var2var_lbl.get(results.variable_a_name, results.variable_a_name)
-    variable_label_b = VAR_LABELS.var2var_lbl.get(results.variable_b_name, results.variable_b_name)
-    val2lbl_for_var_a = VAR_LABELS.var2val2lbl.get(results.variable_a_name, {})
+    variable_label_a = var_labels.var2var_lbl.get(results.variable_a_name, results.variable_a_name)
+    variable_label_b = var_labels.var2var_lbl.get(results.variable_b_name, results.variable_b_name)
+    val2lbl_for_var_a = var_labels.var2val2lbl.get(results.variable_a_name, {})
     variable_a_labels = [val2lbl_for_var_a[val_a] for val_a in results.variable_a_values]
-    val2lbl_for_var_b = VAR_LABELS.var2val2lbl.get(results.variable_b_name, {})
+    val2lbl_for_var_b = var_labels.var2val2lbl.get(results.variable_b_name, {})
     variable_b_labels = [val2lbl_for_var_b[val_b] for val_b in results.variable_b_values]
 
     p_explain = get_p_explain(variable_label_a, variable_label_b)
@@ -428,12 +397,10 @@ def make_chi_square_html(results: ChiSquareResult, style_spec: StyleSpec, *, dp:
         'chi_square': chi_square,
         'degrees_of_freedom': results.degrees_of_freedom,
         'footnotes': [p_full_explanation, ],
-        'generic_unstyled_css': generic_unstyled_css,
         'min_count_rounded': min_count_rounded,
         'observed_vs_expected_tbl': observed_vs_expected_tbl,
         'p_text': p_text,
         'pct_cells_lt_5_rounded': pct_cells_lt_5_rounded,
-        'styled_stats_tbl_css': styled_stats_tbl_css,
         'title': title,
         'variable_label_a': variable_label_a,
         'variable_label_b': variable_label_b,
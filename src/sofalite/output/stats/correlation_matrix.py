@@ -0,0 +1,105 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import jinja2
+import numpy as np
+
+from sofalite.conf.main import get_var_labels
+from sofalite.data_extraction.stats.correlation_matrix import get_results
+from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
+from sofalite.output.styles.interfaces import StyleSpec
+from sofalite.output.styles.utils import get_style_spec
+from sofalite.output.utils import get_two_tailed_explanation_rel, get_variables_matrix_tbl
+from sofalite.stats_calc.interfaces import CorrelationMatrixCalcResult, CorrelationMatrixResult
+from sofalite.utils.stats import get_p_str
+
+def get_correlation_matrix_tbl(variable_labels: Sequence[str], calc_result: CorrelationMatrixCalcResult,
+        style_name_hyphens: str, *, dp: int) -> str:
+    """
+    r with p underneath for every pair. Diagonal left blank.
+    """
+    def get_cell_content(row_idx: int, col_idx: int) -> str:
+        r = calc_result.rs[row_idx, col_idx]
+        p = calc_result.ps[row_idx, col_idx]
+        if np.isnan(r):
+            return 'n/a'
+        p_str = 'n/a' if np.isnan(p) else get_p_str(float(p))
+        return f"{round(float(r), dp)}<br>p {p_str}"
+    return get_variables_matrix_tbl(variable_labels, style_name_hyphens, get_cell_content=get_cell_content)
+
+def make_correlation_matrix_html(result: CorrelationMatrixResult, style_spec: StyleSpec, *, dp: int) -> str:
+    tpl = """\
+    <div class='default'>
+    <h2>{{ title }}</h2>
+
+    <p>Records with values for every variable: {{ n }}<a href='#ft1'><sup>1</sup></a></p>
+    <p>Degrees of Freedom (df): {{ degrees_of_freedom }}</p>
+
+    <h3>Pearson's R<a href='#ft2'><sup>2</sup></a></h3>
+    {{ pearsons_tbl }}
+
+    <h3>Spearman's R<a href='#ft2'><sup>2</sup></a></h3>
+    {{ spearmans_tbl }}
+
+    {% for footnote in footnotes %}
+      <p><a id='ft{{ loop.index }}'></a><sup>{{ loop.index }}</sup>{{ footnote }}</p>
+    {% endfor %}
+
+    <p>{{ workings_msg }}</p>
+    </div>
+    """
+    var2var_lbl = get_var_labels().var2var_lbl
+    variable_labels = [var2var_lbl.get(variable_name, variable_name) for variable_name in result.variable_names]
+    quoted_variable_labels = ', '.join(f'"{variable_label}"' for variable_label in variable_labels)
+    title = f"Results of Pearson's and Spearman's Tests of Correlation for {quoted_variable_labels}"
+    complete_cases_explain = ("Only records with values for every variable are included "
+        "so the results for a pair of variables may differ slightly from a test run on that pair alone.")
+    p_explain = ("If p is small, e.g. less than 0.01, or 0.001, you can assume the result is statistically significant "
+        "i.e. there is a relationship between the two variables. "
+        "Note: a statistically significant difference may not necessarily be of any practical significance.")
+    p_full_explanation = f"{p_explain}</br></br>{get_two_tailed_explanation_rel()}"
+    context = {
+        'degrees_of_freedom': f"{result.pearsons.degrees_of_freedom:,}",
+        'footnotes': [complete_cases_explain, p_full_explanation],
+        'n': f"{result.n:,}",
+        'pearsons_tbl': get_correlation_matrix_tbl(
+            variable_labels, result.pearsons, style_spec.style_name_hyphens, dp=dp),
+        'spearmans_tbl': get_correlation_matrix_tbl(
+            variable_labels, result.spearmans, style_spec.style_name_hyphens, dp=dp),
+        'title': title,
+        'workings_msg': "Always look at the scatter plot for a pair of variables when interpreting their correlation.",
+    }
+    environment = jinja2.Environment()
+    template = environment.from_string(tpl)
+    html = template.render(context)
+    return html
+
+@dataclass(frozen=False)
+class CorrelationMatrixSpec(Source):
+    style_name: str
+    variable_names: Sequence[str]
+    dp: int = 3
+
+    ## do not try to DRY this repeated code ;-) - see doc string for Source
+    csv_fpath: Path | None = None
+    csv_separator: str = ','
+    overwrite_csv_derived_tbl_if_there: bool = False
+    cur: Any | None = None
+    dbe_name: str | None = None  ## database engine name
+    src_tbl_name: str | None = None
+    tbl_filt_clause: str | None = None
+
+    def to_html_spec(self) -> HTMLItemSpec:
+        ## style
+        style_spec = get_style_spec(style_name=self.style_name)
+        ## data
+        result = get_results(cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
+            variable_names=self.variable_names, tbl_filt_clause=self.tbl_filt_clause)
+        html = make_correlation_matrix_html(result, style_spec, dp=self.dp)
+        return HTMLItemSpec(
+            html_item_str=html,
+            style_name=self.style_name,
+            output_item_type=OutputItemType.STATS,
+        )
@@ -7,7 +7,7 @@ from typing import Any
 
 import jinja2
 
-from sofalite.conf.main import VAR_LABELS
+from sofalite.conf.main import get_var_labels
 from sofalite.data_extraction.stats.spearmansr import get_worked_result_data
 from sofalite.data_extraction.utils import get_paired_data
 from sofalite.output.stats.common import get_optimal_min_max
@@ -252,8 +252,9 @@ class SpearmansRSpec(Source):
         ## style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        variable_a_label = VAR_LABELS.var2var_lbl.get(self.variable_a_name, self.variable_a_name)
-        variable_b_label = VAR_LABELS.var2var_lbl.get(self.variable_b_name, self.variable_b_name)
+        var_labels = get_var_labels()
+        variable_a_label = var_labels.var2var_lbl.get(self.variable_a_name, self.variable_a_name)
+        variable_b_label = var_labels.var2var_lbl.get(self.variable_b_name, self.variable_b_name)
         ## data
         paired_data = get_paired_data(cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
             variable_a_name=self.variable_a_name, variable_b_name=self.variable_b_name,
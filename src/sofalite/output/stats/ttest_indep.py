@@ -1,10 +1,11 @@
+from collections.abc import Callable, Sequence
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 import jinja2
 
-from sofalite.conf.main import VAR_LABELS
+from sofalite.conf.main import get_var_labels
 from sofalite.data_extraction.interfaces import ValSpec
 from sofalite.data_extraction.stats.msgs import (
     ci_explain, kurtosis_explain,
@@ -13,23 +14,23 @@ from sofalite.data_extraction.stats.msgs import (
     skew_explain, std_dev_explain,
 )
 from sofalite.data_extraction.stats.ttest_indep import get_results
+from sofalite.data_extraction.utils import get_sample
 from sofalite.output.charts import mpl_pngs
 from sofalite.output.interfaces import HTMLItemSpec, OutputItemType, Source
 from sofalite.output.stats.common import get_group_histogram_html
 from sofalite.output.styles.interfaces import StyleSpec
-from sofalite.output.styles.utils import get_generic_unstyled_css, get_style_spec, get_styled_stats_tbl_css
+from sofalite.output.styles.utils import get_style_spec
 from sofalite.stats_calc.interfaces import NumericSampleSpecFormatted, TTestIndepResultExt
 from sofalite.utils.maths import format_num
 from sofalite.utils.stats import get_p_str
 
 def make_ttest_indep_html(result: TTestIndepResultExt, style_spec: StyleSpec, *,
-        dp: int) -> str:
+        dp: int, get_group_vals: Callable[[str], Sequence[float]] | None = None) -> str:
+    """
+    get_group_vals: group lbl => values. Only needed for the histograms,
+     and only if the results were calculated without fetching the values (see SampleMoments).
+    """
     tpl = """\
-    <style>
-        {{ generic_unstyled_css }}
-        {{ styled_stats_tbl_css }}
-    </style>
-
     <div class='default'>
     <h2>{{ title }}</h2>
 
@@ -88,8 +89,6 @@ def make_ttest_indep_html(result: TTestIndepResultExt, style_spec: StyleSpec, *,
 
     </div>
     """
-    generic_unstyled_css = get_generic_unstyled_css()
-    styled_stats_tbl_css = get_styled_stats_tbl_css(style_spec)
     title = (f"Results of independent samples t-test of average {result.measure_fld_lbl} "
         f'''for "{result.group_lbl}" groups "{result.group_a_spec.lbl}" and "{result.group_b_spec.lbl}"''')
     num_tpl = f"{{:,.{dp}f}}"  ## use comma as thousands separator, and display specified decimal places
@@ -121,8 +120,9 @@ def make_ttest_indep_html(result: TTestIndepResultExt, style_spec: StyleSpec, *,
         formatted_group_specs.append(formatted_group_spec)
         ## make images
         try:
+            group_vals = orig_group_spec.vals if orig_group_spec.vals is not None else get_group_vals(orig_group_spec.lbl)
             histogram_html = get_group_histogram_html(
-                result.measure_fld_lbl, style_spec.chart, orig_group_spec.lbl, orig_group_spec.vals)
+                result.measure_fld_lbl, style_spec.chart, orig_group_spec.lbl, group_vals)
         except Exception as e:
             html_or_msg = (
                 f"<b>{orig_group_spec.lbl}</b> - unable to display histogram. Reason: {e}")
@@ -130,9 +130,7 @@ def make_ttest_indep_html(result: TTestIndepResultExt, style_spec: StyleSpec, *,
             html_or_msg = histogram_html
         histograms2show.append(html_or_msg)
     context = {
-        'generic_unstyled_css': generic_unstyled_css,
         'style_name_hyphens': style_spec.style_name_hyphens,
-        'styled_stats_tbl_css': styled_stats_tbl_css,
         'title': title,
 
         'ci_explain': ci_explain,
@@ -178,9 +176,10 @@ class TTestIndepSpec(Source):
         ## style
         style_spec = get_style_spec(style_name=self.style_name)
         ## lbls
-        grouping_fld_lbl = VAR_LABELS.var2var_lbl.get(self.grouping_fld_name, self.grouping_fld_name)
-        measure_fld_lbl = VAR_LABELS.var2var_lbl.get(self.measure_fld_name, {})
-        val2lbl = VAR_LABELS.var2val2lbl.get(self.grouping_fld_name)
+        var_labels = get_var_labels()
+        grouping_fld_lbl = var_labels.var2var_lbl.get(self.grouping_fld_name, self.grouping_fld_name)
+        measure_fld_lbl = var_labels.var2var_lbl.get(self.measure_fld_name, {})
+        val2lbl = var_labels.var2val2lbl.get(self.grouping_fld_name)
         group_a_val_spec = ValSpec(val=self.group_a_val, lbl=val2lbl.get(self.group_a_val, str(self.group_a_val)))
         group_b_val_spec = ValSpec(val=self.group_b_val, lbl=val2lbl.get(self.group_b_val, str(self.group_b_val)))
         ## data
@@ -190,7 +189,14 @@ class TTestIndepSpec(Source):
             group_a_val_spec=group_a_val_spec, group_b_val_spec=group_b_val_spec,
             grouping_val_is_numeric=True,
             measure_fld_name=self.measure_fld_name, measure_fld_lbl=measure_fld_lbl)
-        html = make_ttest_indep_html(results, style_spec, dp=self.dp)
+        lbl2val_spec = {val_spec.lbl: val_spec for val_spec in [group_a_val_spec, group_b_val_spec]}
+        def get_group_vals(group_lbl: str) -> Sequence[float]:
+            sample = get_sample(cur=self.cur, dbe_spec=self.dbe_spec, src_tbl_name=self.src_tbl_name,
+                grouping_filt_fld_name=self.grouping_fld_name, grouping_filt_val_spec=lbl2val_spec[group_lbl],
+                grouping_filt_val_is_numeric=True, measure_fld_name=self.measure_fld_name,
+                tbl_filt_clause=self.tbl_filt_clause)
+            return sample.vals
+        html = make_ttest_indep_html(results, style_spec, dp=self.dp, get_group_vals=get_group_vals)
         return HTMLItemSpec(
             html_item_str=html,
             style_name=self.style_name,
@@ -17,12 +17,15 @@ and using style-specific values.
 import base64
 from collections.abc import Sequence
 from enum import Enum
+from functools import cache, lru_cache
 import importlib
+from pathlib import Path
+import threading
 
 import jinja2
 from ruamel.yaml import YAML
 
-from sofalite.conf.main import DOJO_COLOURS, CUSTOM_STYLES_FOLDER
+from sofalite.conf.main import DOJO_COLOURS, get_local_paths
 from sofalite.output.styles.interfaces import (
     ChartStyleSpec, ColourWithHighlight, DojoStyleSpec, StyleSpec, TableStyleSpec)
 from sofalite.utils.misc import todict
@@ -87,19 +90,40 @@ def yaml_to_style_spec(*, style_name: str, yaml_dict: dict) -> StyleSpec:
     )
     return style_spec
 
-def get_style_spec(style_name: str, *, debug=False) -> StyleSpec:
+BUILT_IN_STYLE = 'built-in'  ## version for built-in styles - they can't change while the process is running
+
+## Process-wide caches. Style work should happen once per report, not once per item.
+## Custom YAML styles are keyed on the file's mtime so edits are picked up without a restart.
+_style_cache_lock = threading.Lock()
+_style_name2version_and_spec: dict[str, tuple[str | int, StyleSpec]] = {}
+## (kind of CSS, style name) => (version details, CSS) - only the latest version of each style is kept
+## so editing a custom style replaces its entries rather than orphaning them
+_css_slot2version_and_css: dict[tuple[str, str], tuple[tuple, str]] = {}
+
+def clear_style_cache():
+    with _style_cache_lock:
+        _style_name2version_and_spec.clear()
+        _css_slot2version_and_css.clear()
+    _get_bg_img_base64.cache_clear()
+
+def _get_yaml_fpath(style_name: str) -> Path:
+    return get_local_paths().custom_styles_folder / f"{style_name}.yaml"
+
+def _get_yaml_mtime(yaml_fpath: Path) -> int:
+    return yaml_fpath.stat().st_mtime_ns
+
+def _get_uncached_style_spec(style_name: str, *, debug=False) -> tuple[str | int, StyleSpec]:
     """
-    Get dataclass with key colour details and so on e.g.
-    style_spec.table_spec.heading_cell_border (DARKER_MID_GREY)
-    style_spec.table_spec.first_row_border (None)
+    Returns version (BUILT_IN_STYLE or mtime of YAML file) and style spec
     """
     try:
         ## try using a built-in style
         style_module = importlib.import_module(f"sofalite.output.styles.{style_name}")
     except ModuleNotFoundError:
         ## look for custom YAML file
-        yaml_fpath = CUSTOM_STYLES_FOLDER / f"{style_name}.yaml"
+        yaml_fpath = _get_yaml_fpath(style_name)
         try:
+            yaml_mtime = _get_yaml_mtime(yaml_fpath)  ## before reading so a mid-read edit is picked up next time
             yaml_dict = yaml.load(yaml_fpath)
         except FileNotFoundError as e:
             e.add_note(f"Unable to open {yaml_fpath} to extract style specification for '{style_name}'")
@@ -114,10 +138,54 @@ def get_style_spec(style_name: str, *, debug=False) -> StyleSpec:
             except KeyError as e:
                 e.add_note(f"Unable to create style spec from '{yaml_fpath}'")
                 raise
+        version = yaml_mtime
     else:
         style_spec = style_module.get_style_spec()
+        version = BUILT_IN_STYLE
+    return version, style_spec
+
+def _get_style_version_and_spec(style_name: str, *, debug=False) -> tuple[str | int, StyleSpec]:
+    cached = _style_name2version_and_spec.get(style_name)
+    if cached:
+        cached_version, cached_style_spec = cached
+        if cached_version == BUILT_IN_STYLE:
+            return cached
+        try:
+            current_version = _get_yaml_mtime(_get_yaml_fpath(style_name))
+        except FileNotFoundError:
+            current_version = None  ## let the uncached path report the problem
+        if current_version == cached_version:
+            return cached
+    version_and_spec = _get_uncached_style_spec(style_name, debug=debug)
+    with _style_cache_lock:
+        _style_name2version_and_spec[style_name] = version_and_spec
+    return version_and_spec
+
+def get_style_spec(style_name: str, *, debug=False) -> StyleSpec:
+    """
+    Get dataclass with key colour details and so on e.g.
+    style_spec.table_spec.heading_cell_border (DARKER_MID_GREY)
+    style_spec.table_spec.first_row_border (None)
+
+    Cached for the life of the process - custom YAML styles are re-read if the file has changed since.
+    The same StyleSpec instance is shared by all callers so don't modify it.
+    """
+    _version, style_spec = _get_style_version_and_spec(style_name, debug=debug)
     return style_spec
 
+def _get_cached_css(css_key: tuple, make_css) -> str:
+    """
+    css_key: kind of CSS, style name, then whatever identifies the version of the style
+    """
+    css_slot, css_version = css_key[:2], css_key[2:]
+    cached = _css_slot2version_and_css.get(css_slot)
+    if cached and cached[0] == css_version:
+        return cached[1]
+    css = make_css()
+    with _style_cache_lock:
+        _css_slot2version_and_css[css_slot] = (css_version, css)
+    return css
+
 class CSS(Enum):
     """
     CSS can be stored as giant, monolithic blocks of text ready for insertion at the top of HTML files.
@@ -159,6 +227,7 @@ class CSS(Enum):
         'text-align: right; margin: 0;',
     ]
 
+@cache
 def get_generic_unstyled_css() -> str:
     """
     Get CSS with no style-specific aspects: includes stats tables, some parts of main tables
@@ -254,7 +323,13 @@ def get_styled_dojo_chart_css(dojo_style_spec: DojoStyleSpec) -> str:
     Each class contains the connector_style so charts with different styles can coexist in a single report.
     If several styles share connector style there is no conflict - they'll also share the CSS.
     Supplied by the attributes of the DojoStyleSpec.
+
+    Cached per connector style (the CSS is named after it) on the DOJO style details.
     """
+    css_key = ('dojo_chart', dojo_style_spec.connector_style, tuple(todict(dojo_style_spec, shallow=True).items()))
+    return _get_cached_css(css_key, lambda: _get_styled_dojo_chart_css(dojo_style_spec))
+
+def _get_styled_dojo_chart_css(dojo_style_spec: DojoStyleSpec) -> str:
     tpl = """\
         /* Tool tip connector arrows */
         .dijitTooltipBelow-{{ connector_style }} {
@@ -309,10 +384,24 @@ def get_long_colour_list(colour_mappings: Sequence[ColourWithHighlight]) -> list
     long_colour_list = defined_colours + DOJO_COLOURS
     return long_colour_list
 
+@lru_cache(maxsize=16)
+def _get_bg_img_base64(bg_img_fpath: str, _mtime: int) -> str:
+    """
+    _mtime is only there so a changed image is not served from the cache
+    (bounded so old versions of an edited image drop out)
+    """
+    binary_fc = open(bg_img_fpath, 'rb').read()  ## fc a.k.a. file_content
+    bg_img_base64 = base64.b64encode(binary_fc).decode('utf-8')
+    return bg_img_base64
+
+def _get_bg_img_mtime(style_spec: StyleSpec) -> int | None:
+    if not style_spec.table.spaceholder_bg_img:
+        return None
+    return Path(style_spec.table.spaceholder_bg_img).stat().st_mtime_ns
+
 def _get_bg_line(style_spec: StyleSpec) -> str:
     if style_spec.table.spaceholder_bg_img:
-        binary_fc = open(style_spec.table.spaceholder_bg_img, 'rb').read()  ## fc a.k.a. file_content
-        bg_img_base64 = base64.b64encode(binary_fc).decode('utf-8')
+        bg_img_base64 = _get_bg_img_base64(str(style_spec.table.spaceholder_bg_img), _get_bg_img_mtime(style_spec))
         bg_line = f"background-image: url(data:image/gif;base64,{bg_img_base64}) !important;"
     elif style_spec.table.spaceholder_bg_colour:
         bg_line = f"background-color: {style_spec.table.spaceholder_bg_colour};"
@@ -324,7 +413,14 @@ def get_styled_stats_tbl_css(style_spec: StyleSpec) -> str:
     """
     Note - main table CSS is handled completely separately
     (controlled by Pandas and the spaceholder CSS with embedded image)
+
+    Cached on the table style details (and the background image, if any).
     """
+    css_key = ('stats_tbl', style_spec.name, tuple(todict(style_spec.table, shallow=True).items()),
+        _get_bg_img_mtime(style_spec))
+    return _get_cached_css(css_key, lambda: _get_styled_stats_tbl_css(style_spec))
+
+def _get_styled_stats_tbl_css(style_spec: StyleSpec) -> str:
     tpl = """\
         .firstcolvar-{{ style_name_hyphens }}, .firstrowvar-{{ style_name_hyphens }}, .spaceholder-{{ style_name_hyphens }} {
             font-family: Ubuntu, Helvetica, Arial, sans-serif;
@@ -370,7 +466,11 @@ def get_styled_placeholder_css_for_main_tbls(style_name: str) -> str:
     """
     Only used in main tables (cross-tab and freq) not in Stats output tables e.g. ANOVA results tables
     """
-    style_spec = get_style_spec(style_name)
+    version, style_spec = _get_style_version_and_spec(style_name)
+    css_key = ('placeholder', style_name, version, _get_bg_img_mtime(style_spec))
+    return _get_cached_css(css_key, lambda: _get_styled_placeholder_css_for_main_tbls(style_spec))
+
+def _get_styled_placeholder_css_for_main_tbls(style_spec: StyleSpec) -> str:
     bg_line = _get_bg_line(style_spec)
     placeholder_css = """
     .spaceholder-%(style_name_hyphens)s {
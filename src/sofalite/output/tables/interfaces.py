@@ -1,11 +1,12 @@
-## No project dependencies :-)
+## No project dependencies other than the TOTAL label shared with data_extraction count cubes
 from collections.abc import Collection
 from dataclasses import dataclass
 from enum import StrEnum
 from typing import Self
 
+from sofalite.data_extraction.interfaces import TOTAL
+
 BLANK = '__blank__'
-TOTAL = 'TOTAL'
 
 class Metric(StrEnum):
     FREQ = 'Freq'
@@ -0,0 +1,101 @@
+"""
+Table cells from count cubes - every count a cross-tab or frequency table needs, from one grouped query
+(see data_extraction.count_cube for the cube itself).
+
+The old way ran a GROUP BY for the main cells and another for every combination of totalled variables
+- per row spec, per column spec. Then the pieces were pivoted, merged, joined, and transposed.
+
+The cube way:
+
+One cube over every variable used anywhere in the table.
+For any block of the table (e.g. country > gender by browser > agegroup) the cube gives a small, dense array
+of freqs with one axis per block variable (TOTAL slots on the end of totalled axes).
+
+Row % and Col % are axis reductions (as are the TOTALs):
+
+Row % - each freq as a percentage of the sum along the final column variable's axis
+  (i.e. per row, within each combination of the other column variables)
+Col % - each freq as a percentage of the sum along the final row variable's axis
+  (i.e. per column, within each combination of the other row variables)
+
+If the axis has a TOTAL slot, the sum is already sitting in it.
+
+Rows (or columns) only appear in the table if there is at least one count for them - same as with a pivot.
+"""
+from collections.abc import Collection, Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+from sofalite.conf.var_labels import VarLabels
+from sofalite.data_extraction.count_cube import CountCube
+from sofalite.output.tables.interfaces import BLANK, Metric
+from sofalite.output.tables.utils.formatting import format_main_tbl_metric_vals, round_like_python
+
+def _sum_along_axis(freqs: np.ndarray, *, axis: int, is_totalled: bool) -> np.ndarray:
+    """
+    If the axis has a TOTAL slot the sum is already in it
+    """
+    if is_totalled:
+        return np.take(freqs, [-1], axis=axis)
+    return freqs.sum(axis=axis, keepdims=True)
+
+def get_pcts(freqs: np.ndarray, *, axis: int, is_totalled: bool, dp: int) -> np.ndarray:
+    """
+    Each freq as a percentage of the sum along the axis (broadcast back out along the axis).
+    Nothing to divide by (all zeros) => NaN (shown as 0 when formatted).
+    """
+    denominators = _sum_along_axis(freqs, axis=axis, is_totalled=is_totalled)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pcts = (100 * freqs) / denominators
+    return round_like_python(pcts, dp=dp)
+
+@dataclass(frozen=True)
+class DimCells:
+    """
+    The cells of one dimension spec which actually have counts (so will appear in the table).
+
+    lbls: multi-index tuple for each cell e.g. ('Country', 'NZ', 'Gender', 'TOTAL', '__blank__', '__blank__')
+    idxs: position of each cell in the flattened block of freqs for the spec's variables
+    """
+    lbls: list[tuple]
+    idxs: np.ndarray
+
+def get_dim_cells(cube: CountCube, var_labels: VarLabels, *,
+        dim_vars: Sequence[str], totalled_variables: Collection[str], n_fillers: int) -> DimCells:
+    dim_freqs = cube.get_freqs(dim_vars, totalled_variables=totalled_variables)
+    idxs = np.flatnonzero(dim_freqs.ravel() > 0)
+    var_lbls = [var_labels.var2var_label_spec[var].lbl for var in dim_vars]
+    val_lbls_by_var = [cube.get_val_lbls(var, var_labels, is_totalled=var in totalled_variables) for var in dim_vars]
+    val_idxs_by_var = np.unravel_index(idxs, dim_freqs.shape)
+    fillers = (BLANK, BLANK) * n_fillers
+    lbls = []
+    for val_idxs in zip(*val_idxs_by_var):
+        lbl = []
+        for var_lbl, val_lbls, val_idx in zip(var_lbls, val_lbls_by_var, val_idxs):
+            lbl.extend([var_lbl, val_lbls[val_idx]])
+        lbls.append(tuple(lbl) + fillers)
+    return DimCells(lbls=lbls, idxs=idxs)
+
+def get_block_metrics_strs(cube: CountCube, *, row_vars: Sequence[str], col_vars: Sequence[str],
+        totalled_variables: Collection[str], metrics: Sequence[Metric], row_idxs: np.ndarray, col_idxs: np.ndarray,
+        dp: int) -> list[np.ndarray]:
+    """
+    Display strings for one block (one row spec by one column spec) - an array per metric, rows by cols.
+    """
+    freqs = cube.get_freqs(list(row_vars) + list(col_vars), totalled_variables=totalled_variables)
+    n_row_axes = len(row_vars)
+    n_row_cells = int(np.prod(freqs.shape[:n_row_axes]))
+    strs_by_metric = []
+    for metric in metrics:
+        if metric == Metric.FREQ:
+            vals = freqs
+        elif metric == Metric.ROW_PCT:
+            vals = get_pcts(freqs, axis=freqs.ndim - 1, is_totalled=col_vars[-1] in totalled_variables, dp=dp)
+        elif metric == Metric.COL_PCT:
+            vals = get_pcts(freqs, axis=n_row_axes - 1, is_totalled=row_vars[-1] in totalled_variables, dp=dp)
+        else:
+            raise ValueError(f"Unexpected metric ({metric})")
+        vals = vals.reshape(n_row_cells, -1)[np.ix_(row_idxs, col_idxs)]
+        strs_by_metric.append(format_main_tbl_metric_vals(vals, metric=metric, dp=dp))
+    return strs_by_metric
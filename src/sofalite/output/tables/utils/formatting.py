@@ -0,0 +1,84 @@
+"""
+Turning numbers into the strings displayed in table cells - a whole block of cells at a time.
+
+Everything here works on numpy arrays (any shape) using np.char / format-string vectorisation
+so there is no per-cell Python function call no matter how big the table.
+The results are exactly the same strings the original per-cell functions made
+(see correct_str_dps in misc and the rounding / formatting steps in misc.get_tbl_df).
+
+Which formatting applies depends on the metric:
+
+Freq => integers e.g. 12
+Row % / Col % => to dp decimal places e.g. 3.30 (main tables via format_main_tbl_metric_vals)
+Anything in a get_tbl_df table => to dp decimal places, and percentages get a % suffix e.g. 3.30%
+"""
+import numpy as np
+
+from sofalite.output.tables.interfaces import PCT_METRICS, Metric
+
+def round_like_python(vals: np.ndarray, *, dp: int) -> np.ndarray:
+    """
+    Same results as applying Python's round(val, dp) to every item but without the per-item Python work.
+
+    np.round scales first (val * 10 ** dp) and the scaling can push a value sitting just below a tie over it
+    e.g. 2.675 (really 2.67499999...) => 2.68 not 2.67. Percentages like 100 * 107 / 40 hit those cases often.
+    So np.round does the bulk and Python's round only handles the few values close to a tie.
+    """
+    vals = np.asarray(vals, dtype=np.float64)
+    rounded = np.round(vals, dp)
+    scaled = vals * 10.0 ** dp
+    dist_from_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5)
+    near_tie_mask = dist_from_tie <= 1e-9 * np.maximum(1, np.abs(scaled))
+    if near_tie_mask.any():
+        rounded[near_tie_mask] = [round(val, dp) for val in vals[near_tie_mask].tolist()]
+    return rounded
+
+def correct_strs_dps(strs: np.ndarray, *, dp: int) -> np.ndarray:
+    """
+    Whole-array version of misc.correct_str_dps - pad decimals with zeros to dp; leave anything without a dot alone.
+    3dp
+    '0.0' => '0.000'
+    '12' => '12'
+    """
+    strs = np.asarray(strs, dtype=str)
+    parts = np.char.partition(strs, '.')  ## extra trailing axis: before, dot (if any), after
+    dots, after_dot = parts[..., 1], parts[..., 2]
+    decimals = np.char.partition(after_dot, '.')[..., 0]  ## up to any second dot - as with val.split('.')[1]
+    n_zeros2add = np.where(dots == '.', np.maximum(dp - np.char.str_len(decimals), 0), 0)
+    return np.char.add(strs, np.char.multiply('0', n_zeros2add))
+
+def format_ints(vals: np.ndarray) -> np.ndarray:
+    """
+    E.g. 12 => '12'. Gaps (NaN) => '0'
+    """
+    vals = np.nan_to_num(np.asarray(vals, dtype=np.float64), nan=0)
+    return vals.astype(np.int64).astype(str)
+
+def format_floats_shortest(vals: np.ndarray, *, dp: int) -> np.ndarray:
+    """
+    str() of each float (shortest repr) padded out to dp decimal places e.g. 3.3 => '3.30'. Gaps (NaN) => '0'.
+    Values should already be rounded to dp.
+    """
+    vals = np.asarray(vals, dtype=np.float64)
+    strs = correct_strs_dps(vals.astype(str), dp=dp)
+    return np.where(np.isnan(vals), '0', strs)
+
+def format_fixed_dps(vals: np.ndarray, *, dp: int) -> np.ndarray:
+    """
+    E.g. 3.333333 => '3.33' (like round(val, dp) followed by f"{val:.{dp}f}")
+    """
+    return np.char.mod(f"%.{dp}f", round_like_python(vals, dp=dp))
+
+def format_main_tbl_metric_vals(vals: np.ndarray, *, metric: Metric, dp: int) -> np.ndarray:
+    if metric == Metric.FREQ:
+        return format_ints(vals)
+    elif metric in PCT_METRICS:
+        return format_floats_shortest(vals, dp=dp)
+    else:
+        raise ValueError(f"Unexpected metric ({metric})")
+
+def format_tbl_metric_vals(vals: np.ndarray, *, metric: Metric, dp: int) -> np.ndarray:
+    strs = format_fixed_dps(vals, dp=dp)
+    if metric in PCT_METRICS:
+        strs = np.char.add(strs, '%')
+    return strs
@@ -115,12 +115,14 @@ so
 
 4) Apply that sort order to the original index row.
 """
+from dataclasses import dataclass, field
 from functools import partial
 from itertools import count
 
 import pandas as pd
 
 from sofalite.conf.var_labels import VarLabels
+from sofalite.data_extraction.count_cube import CountCube
 from sofalite.output.tables.interfaces import BLANK, TOTAL, Metric, Sort
 
 pd.set_option('display.max_rows', 200)
@@ -166,7 +168,40 @@ def index_row2branch_of_vars_key(orig_tuple: tuple, *, debug=False) -> tuple:
 def get_metric2order(metric: Metric) -> int:
     return {Metric.FREQ: 1, Metric.ROW_PCT: 2, Metric.COL_PCT: 3}[metric]
 
-def by_freq(variable: str, lbl: str, df: pd.DataFrame, filts: tuple[tuple[str, str]] | None = None, *,
+@dataclass
+class CubeFreqs:
+    """
+    Frequencies for value labels (within any parent value labels) read off the table's count cube
+    - the counts are already there so there is no need to scan the source data again.
+    A parent value of TOTAL doesn't restrict anything.
+    """
+    cube: CountCube
+    var_labels: VarLabels
+    _variables2freqs: dict = field(default_factory=dict)
+    _var2lbl2idx: dict = field(default_factory=dict)
+
+    def get_freq(self, variable_value_lbl_pairs: tuple[tuple[str, str], ...]) -> int:
+        """
+        Args:
+            variable_value_lbl_pairs: e.g. (('browser', 'Firefox'), ('agegroup', '< 20'))
+        """
+        variable_value_lbl_pairs = [(variable, val_lbl) for variable, val_lbl in variable_value_lbl_pairs
+            if val_lbl != TOTAL]
+        variables = tuple(variable for variable, _val_lbl in variable_value_lbl_pairs)
+        if variables not in self._variables2freqs:
+            self._variables2freqs[variables] = self.cube.get_freqs(variables)
+        idxs = []
+        for variable, val_lbl in variable_value_lbl_pairs:
+            if variable not in self._var2lbl2idx:
+                val_lbls = self.cube.get_val_lbls(variable, self.var_labels, is_totalled=False)
+                self._var2lbl2idx[variable] = {val_lbl: idx for idx, val_lbl in enumerate(val_lbls)}
+            idx = self._var2lbl2idx[variable].get(val_lbl)
+            if idx is None:
+                return 0
+            idxs.append(idx)
+        return int(self._variables2freqs[variables][tuple(idxs)])
+
+def by_freq(variable: str, lbl: str, cube_freqs: CubeFreqs, filts: tuple[tuple[str, str], ...] = (), *,
         increasing=True) -> tuple[int, float]:
     """
     Args:
@@ -175,10 +210,7 @@ def by_freq(variable: str, lbl: str, df: pd.DataFrame, filts: tuple[tuple[str, s
     if lbl == TOTAL:
         sort_val = (1, 'anything ;-)')
     else:
-        df_filt = df.copy().loc[df[variable] == lbl]
-        for filt_variable, filt_val_lbl in filts:
-            df_filt = df_filt.loc[df_filt[filt_variable] == filt_val_lbl]
-        freq = len(df_filt)
+        freq = cube_freqs.get_freq(filts + ((variable, lbl), ))
         if increasing:
             sort_val = freq
         else:
@@ -219,7 +251,7 @@ def get_branch_of_variables_key(index_with_lbls: tuple, var_lbl2var: dict[str, i
     return branch_of_variables_key
 
 def get_tuple_for_sorting(orig_index_tuple: tuple, *, order_rules_for_multi_index_branches: dict,
-        var_labels: VarLabels, raw_df: pd.DataFrame, has_metrics: bool, debug=False) -> tuple:
+        var_labels: VarLabels, cube_freqs: CubeFreqs, has_metrics: bool, debug=False) -> tuple:
     """
     Use this method for the key arg for sorting
     such as sorting(unsorted_multi_index_list, key=SortUtils.get_tuple_for_sorting)
@@ -277,9 +309,8 @@ def get_tuple_for_sorting(orig_index_tuple: tuple, *, order_rules_for_multi_inde
                     value_order = (1, val_lbl) if val_lbl == TOTAL else (0, val_lbl)  ## want TOTAL last
                 elif value_order_rule == Sort.VAL:
                     if val_lbl != TOTAL:
-                        val2lbl = var_labels.var2val2lbl.get(variable)
-                        if val2lbl:
-                            lbl2val = {v: k for k, v in val2lbl.items()}
+                        lbl2val = var_labels.var2lbl2val.get(variable)  ## precomputed once per VarLabels
+                        if lbl2val:
                             val = lbl2val.get(val_lbl, val_lbl)  ## on assumption (validated) that a val lbl cannot apply to more than one val for any given variable
                         else:
                             val = val_lbl  ## If unconfigured, left alone. Note - if val was an integer it is on the user to define a val lbl explicitly in the YAML or accept potential sort issues e.g. 1, 11, 12, 2, 3 etc
@@ -289,7 +320,7 @@ def get_tuple_for_sorting(orig_index_tuple: tuple, *, order_rules_for_multi_inde
                 elif value_order_rule in (Sort.INCREASING, Sort.DECREASING):
                     increasing = (value_order_rule == Sort.INCREASING)
                     filts = tuple(variable_value_lbl_pairs)
-                    value_order = by_freq(variable, val_lbl, df=raw_df, filts=filts, increasing=increasing)  ## can't use df as arg for cached function  ## want TOTAL last
+                    value_order = by_freq(variable, val_lbl, cube_freqs=cube_freqs, filts=filts, increasing=increasing)  ## want TOTAL last
                 else:
                     raise ValueError(f"Unexpected value order spec ({value_order_rule})")
                 variable_value_lbl_pairs.append((variable, val_lbl))
@@ -304,7 +335,7 @@ def get_tuple_for_sorting(orig_index_tuple: tuple, *, order_rules_for_multi_inde
     return tuple_for_sorting
 
 def get_sorted_multi_index_list(unsorted_multi_index_list: list[tuple], *, order_rules_for_multi_index_branches: dict,
-        var_labels: VarLabels, raw_df: pd.DataFrame, has_metrics: bool, debug=False) -> list[tuple]:
+        var_labels: VarLabels, cube: CountCube, has_metrics: bool, debug=False) -> list[tuple]:
     """
     1) Convert variable labels to variables. E.g.
     'Web Browser' => 'browser'
@@ -334,15 +365,11 @@ def get_sorted_multi_index_list(unsorted_multi_index_list: list[tuple], *, order
             ('browser', 'age', ): (1, Sort.LBL, 0, Sort.VAL),
             ('browser', 'car', ): (1, Sort.LBL, 1, Sort.LBL),
         }
-    :param raw_df: e.g.
-                id  age            browser  car
-        0        1    5            Firefox    7
-        ...    ...  ...                ...  ...
-        1499  1500    4  Internet Explorer    8
+    :param cube: the count cube the table came from - only needed for sorting by frequency
     """
     multi_index_sort_fn = partial(get_tuple_for_sorting,
         order_rules_for_multi_index_branches=order_rules_for_multi_index_branches,
-        var_labels=var_labels, raw_df=raw_df, has_metrics=has_metrics, debug=debug)
+        var_labels=var_labels, cube_freqs=CubeFreqs(cube, var_labels), has_metrics=has_metrics, debug=debug)
     sorted_multi_index_list = sorted(unsorted_multi_index_list, key=multi_index_sort_fn)
     if debug:
         for row in sorted_multi_index_list:
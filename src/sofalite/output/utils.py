@@ -1,105 +1,323 @@
-from collections.abc import Sequence
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+import copy
+from html import escape as html_escape
+from itertools import repeat
 import math
+from pathlib import Path
+import sqlite3 as sqlite
+import threading
+from typing import Any, TextIO
 
-import jinja2
-
-from sofalite.conf.main import SOFALITE_WEB_RESOURCES_ROOT
-from sofalite.output.charts.conf import DOJO_CHART_JS
+from sofalite import SQLITE_DB, logger
+from sofalite.conf.main import get_local_paths
+from sofalite.data_extraction.count_cube import CountCube, planned_count_cubes
+from sofalite.data_extraction.db import ExtendedCursor
 from sofalite.output.interfaces import (
-    BODY_AND_HTML_END_TPL, BODY_START_TPL, CHARTING_CSS_TPL, CHARTING_LINKS_TPL, HEAD_END_TPL,
-    HTML_AND_SOME_HEAD_TPL, SPACEHOLDER_CSS_TPL, STATS_TBL_TPL,
-    HasToHTMLItemSpec, OutputItemType, Report)
-from sofalite.output.styles.utils import (get_generic_unstyled_css, get_style_spec, get_styled_dojo_chart_css,
-    get_styled_placeholder_css_for_main_tbls, get_styled_stats_tbl_css)
+    BODY_AND_HTML_END_TPL, BODY_START_TPL, HEAD_END_TPL,
+    AssetCollector, ExternalAssetsConf, HasToHTMLItemSpec, HTMLItemSpec, PoolType, Report)
+
+ConFactory = Callable[[], Any]  ## returns a fresh DB-API connection e.g. partial(sqlite3.connect, fpath)
+ScanKey2Cube = dict[tuple[str, str], CountCube]
+
+def _get_db_key(cur) -> int:
+    """
+    Items on the same database share the same underlying cursor (Source wraps it in an ExtendedCursor - maybe twice)
+    """
+    while isinstance(cur, ExtendedCursor):
+        cur = cur.cur
+    return id(cur)
+
+def get_planned_count_cubes(html_items: Sequence[HasToHTMLItemSpec], *, debug=False) -> list[ScanKey2Cube | None]:
+    """
+    Query planning across a whole report. Before anything is built:
+
+    1) collect the logical counts requests of every item (items with a get_counts_requests method e.g. cross-tabs)
+    2) merge the requests on the same database, table, and filter into one request over the union of their variables
+    3) run each merged request once (one grouped scan)
+    4) route the resulting cubes back - one mapping (scan key => cube) per item (None if nothing planned for it)
+
+    Each item then takes what it needs from its cube(s) (see data_extraction.count_cube.get_count_cube)
+    instead of querying.
+    The scans run here, in the calling thread, using the items' own cursors.
+    """
+    scan2variables = {}
+    scan2cur = {}
+    items_scans = []
+    for html_item in html_items:
+        get_counts_requests = getattr(html_item, 'get_counts_requests', None)
+        cur = getattr(html_item, 'cur', None)
+        item_scans = []
+        if get_counts_requests and cur is not None:
+            for counts_request in get_counts_requests():
+                scan = (_get_db_key(cur), counts_request.scan_key)
+                scan2variables.setdefault(scan, {}).update(dict.fromkeys(counts_request.variables))
+                scan2cur.setdefault(scan, cur)
+                item_scans.append(scan)
+        items_scans.append(item_scans)
+    scan2cube = {}
+    for scan, variables in scan2variables.items():
+        _db_key, (src_tbl_name, tbl_filt_clause) = scan
+        scan2cube[scan] = CountCube.from_src(scan2cur[scan], src_tbl_name=src_tbl_name, tbl_filt_clause=tbl_filt_clause,
+            variables=list(variables), debug=debug)
+    logger.debug(f"{len(scan2cube)} planned count scan(s) for {len(html_items)} item(s)")
+    return [{scan[1]: scan2cube[scan] for scan in item_scans} or None for item_scans in items_scans]
+
+def _to_html_spec(html_item: HasToHTMLItemSpec, count_cubes: ScanKey2Cube | None = None) -> HTMLItemSpec:
+    with planned_count_cubes(count_cubes):
+        return html_item.to_html_spec()
+
+def get_internal_db_con():
+    """
+    Module-level (not a lambda) so it can be pickled and sent to worker processes.
+    Not tied to the creating thread so worker connections can be closed once the pool is finished.
+    """
+    return sqlite.connect(get_local_paths().internal_database_fpath, check_same_thread=False)
+
+class _WorkerCursors:
+    """
+    One connection (and cursor) per worker per connection factory.
+    Thread pools share one instance (thread-local storage keeps workers apart).
+    Each process in a process pool has its own module-level instance.
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cons = []
+
+    def get_cur(self, con_factory: ConFactory) -> ExtendedCursor:
+        factory2cur = getattr(self._local, 'factory2cur', None)
+        if factory2cur is None:
+            factory2cur = self._local.factory2cur = {}
+        cur = factory2cur.get(con_factory)
+        if cur is None:
+            con = con_factory()
+            with self._lock:
+                self._cons.append(con)
+            cur = factory2cur[con_factory] = ExtendedCursor(con.cursor())
+        return cur
+
+    def close_all(self):
+        with self._lock:
+            cons, self._cons = self._cons, []
+        for con in cons:
+            try:
+                con.close()
+            except Exception as e:
+                logger.debug(f"Unable to close worker connection. Error: {e}")
 
-def get_report(html_items: Sequence[HasToHTMLItemSpec], title: str) -> Report:
+_process_worker_cursors: _WorkerCursors | None = None
+
+def _init_process_worker():
+    global _process_worker_cursors
+    _process_worker_cursors = _WorkerCursors()
+
+def _to_html_spec_with_own_cur(html_item: HasToHTMLItemSpec, con_factory: ConFactory | None,
+        worker_cursors: _WorkerCursors | None = None, count_cubes: ScanKey2Cube | None = None) -> HTMLItemSpec:
+    """
+    html_item is already a detached copy (see _get_detached_item) so setting its cursor is safe.
+    """
+    if con_factory:
+        worker_cursors = worker_cursors or _process_worker_cursors
+        html_item.cur = worker_cursors.get_cur(con_factory)
+    return _to_html_spec(html_item, count_cubes)
+
+def _get_detached_item(html_item: HasToHTMLItemSpec, *,
+        con_factory: ConFactory | None) -> tuple[HasToHTMLItemSpec | None, ConFactory | None]:
+    """
+    Returns a shallow copy of the item without its cursor, ready for a worker to give it its own,
+    plus the factory the worker should use to make that cursor.
+    Copying rather than using dataclasses.replace() because we must not re-run Source.__post_init__
+    (which would re-ingest CSVs etc).
+
+    Items on the internal SQLite database always get a fresh connection to it.
+    Items on an externally supplied cursor can only be given their own connection if con_factory was supplied.
+    If it wasn't, (None, None) is returned and the item must be built in the calling thread.
+    """
+    cur = getattr(html_item, 'cur', None)
+    if cur is None:
+        return html_item, None
+    is_internal_db = SQLITE_DB.get('sqlite_default_cur') is not None and cur is SQLITE_DB['sqlite_default_cur']
+    if is_internal_db:
+        item_con_factory = get_internal_db_con
+    elif con_factory:
+        item_con_factory = con_factory
+    else:
+        return None, None
+    detached_item = copy.copy(html_item)
+    detached_item.cur = None
+    return detached_item, item_con_factory
+
+def iter_html_item_specs(html_items: Iterable[HasToHTMLItemSpec], *,
+        n_workers: int | None = None, pool_type: PoolType = PoolType.THREAD,
+        con_factory: ConFactory | None = None, max_pending: int | None = None,
+        plan_queries: bool = False) -> Iterator[HTMLItemSpec]:
+    """
+    Run to_html_spec() on every item - in order, or concurrently if n_workers > 1 -
+    yielding each result as soon as it (and everything before it) is ready.
+    Results are always yielded in the same order as the items supplied.
+
+    Every worker gets its own database connection (DB-API connections generally can't be shared across threads
+    and can't be sent to other processes at all). Items using the internal SQLite database get one automatically.
+    Items using an externally supplied cursor need con_factory - a no-arg callable returning a new connection
+    to the same database (must be picklable e.g. a module-level function or functools.partial if using processes).
+    Without it those items are built in the calling thread, when their turn comes, using their own cursor.
+
+    Threads suit reports dominated by database waits and work in C code releasing the GIL (e.g. pandas, SQLite).
+    Processes suit CPU-heavy pure-Python work but every item (minus its cursor) and result must be picklable.
+
+    Only max_pending items (default 2 x n_workers) are in flight at any one time
+    so finished-but-not-yet-consumed results can't pile up in memory.
+
+    If plan_queries, every item's data requests are gathered first and compatible ones are fetched together
+    (see get_planned_count_cubes). This means all the items must exist up front (html_items is turned into a list).
+    """
+    if plan_queries:
+        html_items = list(html_items)
+        items_count_cubes = get_planned_count_cubes(html_items)
+    else:
+        items_count_cubes = repeat(None)
+    if not n_workers or n_workers <= 1:
+        for html_item, count_cubes in zip(html_items, items_count_cubes):
+            yield _to_html_spec(html_item, count_cubes)
+        return
+    max_pending = max_pending or 2 * n_workers
+    worker_cursors = _WorkerCursors() if pool_type == PoolType.THREAD else None
+    if pool_type == PoolType.THREAD:
+        executor: Executor = ThreadPoolExecutor(max_workers=n_workers)
+    elif pool_type == PoolType.PROCESS:
+        executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_process_worker)
+    else:
+        raise ValueError(f"Unexpected pool type '{pool_type}'")
+    items_iter = zip(html_items, items_count_cubes)
+    pending: deque[Future | tuple[HasToHTMLItemSpec, ScanKey2Cube | None]] = deque()  ## either in a worker or waiting to be built in caller
+
+    def add_next_to_pending() -> bool:
+        html_item, count_cubes = next(items_iter, (None, None))
+        if html_item is None:
+            return False
+        detached_item, item_con_factory = _get_detached_item(html_item, con_factory=con_factory)
+        if detached_item is None:
+            pending.append((html_item, count_cubes))
+        else:
+            pending.append(executor.submit(
+                _to_html_spec_with_own_cur, detached_item, item_con_factory, worker_cursors, count_cubes))
+        return True
+
+    try:
+        with executor:
+            while len(pending) < max_pending and add_next_to_pending():
+                pass
+            while pending:
+                next_up = pending.popleft()
+                add_next_to_pending()
+                if isinstance(next_up, Future):
+                    yield next_up.result()
+                else:
+                    yield _to_html_spec(*next_up)  ## the workers keep going on the items behind it meanwhile
+    finally:
+        if worker_cursors:
+            worker_cursors.close_all()
+
+def get_html_item_specs(html_items: Iterable[HasToHTMLItemSpec], *,
+        n_workers: int | None = None, pool_type: PoolType = PoolType.THREAD,
+        con_factory: ConFactory | None = None, plan_queries: bool = False) -> list[HTMLItemSpec]:
+    """
+    See iter_html_item_specs()
+    """
+    return list(iter_html_item_specs(html_items, n_workers=n_workers, pool_type=pool_type, con_factory=con_factory,
+        plan_queries=plan_queries))
+
+def get_report(html_items: Sequence[HasToHTMLItemSpec], title: str, *,
+        n_workers: int | None = None, pool_type: PoolType = PoolType.THREAD,
+        con_factory: ConFactory | None = None, external_assets: ExternalAssetsConf | None = None,
+        lazy_charts: bool = False, plan_queries: bool = True) -> Report:
     """
     Collectively work out all which unstyled and styled CSS / JS items are needed in HTML.
+    Each is put in the head once only however many items need it.
     Then, in body, put the html strs in order.
-    Aligning param names exactly with templates from output.interfaces
-    """
-    tpl_bits = [
-        HTML_AND_SOME_HEAD_TPL,  ## unstyled
-    ]
-    context = {
-        'generic_unstyled_css': get_generic_unstyled_css(),
-        'sofalite_web_resources_root': SOFALITE_WEB_RESOURCES_ROOT,
-        'title': title,
-    }
-    html_item_specs = [html_item.to_html_spec() for html_item in html_items]
-    ## CHARTS
-    includes_charts = False
-    for html_item_spec in html_item_specs:
-        if html_item_spec.output_item_type==OutputItemType.CHART:
-            includes_charts = True
-            break
-    if includes_charts:
-        ## unstyled
-        tpl_bits.append(CHARTING_LINKS_TPL)
-        tpl_bits.append(DOJO_CHART_JS)
-        ## styled
-        chart_styles_done = set()
-        for html_item_spec in html_item_specs:
-            if html_item_spec.output_item_type==OutputItemType.CHART and html_item_spec.style_name not in chart_styles_done:
-                styled_css_context_param = f'{html_item_spec.style_name}_styled_dojo_chart_css'
-                styled_js_context_param = f'{html_item_spec.style_name}_styled_dojo_chart_js'
-                styled_charting_css_tpl = (CHARTING_CSS_TPL
-                    .replace('styled_dojo_chart_css', styled_css_context_param)
-                )
-                tpl_bits.append(styled_charting_css_tpl)
-                style_spec = get_style_spec(html_item_spec.style_name)
-                context[styled_css_context_param] = get_styled_dojo_chart_css(style_spec.dojo)
-                chart_styles_done.add(html_item_spec.style_name)
-    ## MAIN TABLES
-    includes_main_tbls = False
-    for html_item_spec in html_item_specs:
-        if html_item_spec.output_item_type==OutputItemType.MAIN_TABLE:
-            includes_main_tbls = True
-            break
-    if includes_main_tbls:
-        ## styled
-        tbl_styles_done = set()
-        for html_item_spec in html_item_specs:
-            if (html_item_spec.output_item_type==OutputItemType.MAIN_TABLE
-                    and html_item_spec.style_name not in tbl_styles_done):
-                styled_spaceholder_context_param = f'{html_item_spec.style_name}_styled_placeholder_css_for_main_tbls'
-                styled_spaceholder_css_tpl = SPACEHOLDER_CSS_TPL.replace(
-                    'styled_placeholder_css_for_main_tbls', styled_spaceholder_context_param)
-                tpl_bits.append(styled_spaceholder_css_tpl)
-                context[styled_spaceholder_context_param] = get_styled_placeholder_css_for_main_tbls(
-                    html_item_spec.style_name)
-                tbl_styles_done.add(html_item_spec.style_name)
-    ## STATS
-    includes_stats = False
-    for html_item_spec in html_item_specs:
-        if html_item_spec.output_item_type==OutputItemType.STATS:
-            includes_stats = True
-            break
-    if includes_stats:
-        ## styled
-        stats_styles_done = set()
-        for html_item_spec in html_item_specs:
-            if (html_item_spec.output_item_type==OutputItemType.STATS
-                    and html_item_spec.style_name not in stats_styles_done):
-                styled_stats_tbl_context_param = f'{html_item_spec.style_name}_styled_stats_tbl_css'
-                styled_stats_tbl_tpl = STATS_TBL_TPL.replace('styled_stats_tbl_css', styled_stats_tbl_context_param)
-                tpl_bits.append(styled_stats_tbl_tpl)
-                style_spec = get_style_spec(html_item_spec.style_name)
-                context[styled_stats_tbl_context_param] = get_styled_stats_tbl_css(style_spec)
-                stats_styles_done.add(html_item_spec.style_name)
-    ## unstyled & already styled
-    tpl_bits.append(HEAD_END_TPL)
-    tpl_bits.append(BODY_START_TPL)
-    item_content = '<br><br>'.join(html_item_spec.html_item_str for html_item_spec in html_item_specs)  ## <======= the actual item content e.g. chart
-    tpl_bits.append(item_content)
-    tpl_bits.append(BODY_AND_HTML_END_TPL)
-    ## assemble
-    tpl = '\n'.join(tpl_bits)
-    environment = jinja2.Environment()
-    template = environment.from_string(tpl)
-    html = template.render(context)
+
+    Items can be built concurrently - see iter_html_item_specs() for n_workers, pool_type, and con_factory.
+    See write_report() for a streaming alternative which never holds the whole document in memory.
+
+    Shared CSS and JS are inlined unless external_assets is supplied - see ExternalAssetsConf.
+    If lazy_charts, charts are only built in the browser as they come near the viewport
+    - useful for reports with lots of charts.
+
+    All the items are known up front so, by default, their data requests are planned together
+    e.g. many tables over the same table and filter share one scan - see get_planned_count_cubes().
+    """
+    html_item_specs = get_html_item_specs(html_items,
+        n_workers=n_workers, pool_type=pool_type, con_factory=con_factory, plan_queries=plan_queries)
+    asset_collector = AssetCollector(external_assets, lazy_charts=lazy_charts)
+    head_start_html = asset_collector.get_head_start_html(title)
+    assets_html = asset_collector.get_new_assets_html(
+        asset_key for html_item_spec in html_item_specs for asset_key in html_item_spec.asset_keys)
+    item_content = '<br><br>'.join(asset_collector.get_item_html(html_item_spec.html_item_str)
+        for html_item_spec in html_item_specs)  ## <======= the actual item content e.g. chart
+    html = '\n'.join([
+        head_start_html,
+        assets_html,
+        HEAD_END_TPL,
+        BODY_START_TPL,
+        item_content,
+        BODY_AND_HTML_END_TPL,
+    ])
     return Report(html)
 
+def _write_report_to_stream(f: TextIO, html_items: Iterable[HasToHTMLItemSpec], title: str, *,
+        n_workers: int | None, pool_type: PoolType, con_factory: ConFactory | None,
+        external_assets: ExternalAssetsConf | None, lazy_charts: bool, plan_queries: bool):
+    flush = getattr(f, 'flush', None)
+    asset_collector = AssetCollector(external_assets, lazy_charts=lazy_charts)
+    f.write('\n'.join([asset_collector.get_head_start_html(title), HEAD_END_TPL, BODY_START_TPL]))
+    f.write('\n')
+    html_item_specs = iter_html_item_specs(html_items,
+        n_workers=n_workers, pool_type=pool_type, con_factory=con_factory, plan_queries=plan_queries)
+    for n, html_item_spec in enumerate(html_item_specs):
+        if n:
+            f.write('<br><br>')
+        new_assets_html = asset_collector.get_new_assets_html(html_item_spec.asset_keys)  ## not already written
+        if new_assets_html:
+            f.write(new_assets_html)
+            f.write('\n')
+        f.write(asset_collector.get_item_html(html_item_spec.html_item_str))  ## <======= the actual item content e.g. chart
+        if flush:
+            flush()  ## e.g. so a socket client can start rendering
+    f.write('\n')
+    f.write(BODY_AND_HTML_END_TPL)
+
+def write_report(html_items: Iterable[HasToHTMLItemSpec], title: str, dest: Path | str | TextIO, *,
+        n_workers: int | None = None, pool_type: PoolType = PoolType.THREAD,
+        con_factory: ConFactory | None = None, external_assets: ExternalAssetsConf | None = None,
+        lazy_charts: bool = False, plan_queries: bool = False):
+    """
+    Streaming alternative to get_report(...).to_file(...) for large reports.
+
+    The head (title and generic CSS) is written first. Then each item is written as soon as it is built,
+    preceded by any CSS and JS assets it needs which haven't already been written.
+    So no asset is written twice and the whole document is never held in memory -
+    peak memory is set by the largest single item (or the few in flight if n_workers > 1).
+    html_items can be a lazy iterable (e.g. a generator) so the item specs themselves needn't all exist at once.
+
+    dest: file path, or anything text can be written to e.g. an open file or socket.makefile('w')
+
+    Items can be built concurrently - see iter_html_item_specs() for n_workers, pool_type, and con_factory.
+    Shared CSS and JS are inlined unless external_assets is supplied - see ExternalAssetsConf.
+    See get_report() re: lazy_charts.
+    plan_queries (see iter_html_item_specs()) is off by default here because it needs every item up front.
+    """
+    if isinstance(dest, (str, Path)):
+        with open(dest, 'w') as f:
+            _write_report_to_stream(f, html_items, title,
+                n_workers=n_workers, pool_type=pool_type, con_factory=con_factory,
+                external_assets=external_assets, lazy_charts=lazy_charts, plan_queries=plan_queries)
+    else:
+        _write_report_to_stream(dest, html_items, title,
+            n_workers=n_workers, pool_type=pool_type, con_factory=con_factory,
+            external_assets=external_assets, lazy_charts=lazy_charts, plan_queries=plan_queries)
+
 def to_precision(num, precision):
     """
     Returns a string representation of x formatted with a precision of p.
@@ -174,3 +392,29 @@ def get_two_tailed_explanation_rel() -> str:
     two_tailed_explanation_rel = ("This is a two-tailed result i.e. based on the likelihood of a difference "
         "where the direction doesn't matter.")
     return two_tailed_explanation_rel
+
+def get_variables_matrix_tbl(variable_labels: Sequence[str], style_name_hyphens: str, *,
+        get_cell_content: Callable[[int, int], str]) -> str:
+    """
+    Every variable down and across (e.g. correlation and association matrices). Diagonal left blank.
+    get_cell_content(row_idx, col_idx) supplies the HTML for every other cell.
+    """
+    ## output.styles.utils.get_styled_stats_tbl_css controls the styles that will apply to these classes
+    css_spaceholder = f"spaceholder-{style_name_hyphens}"
+    css_first_col_var = f"firstcolvar-{style_name_hyphens}"
+    css_lbl = f"lbl-{style_name_hyphens}"
+    css_datacell = f"datacell-{style_name_hyphens}"
+    variable_labels_html = [html_escape(variable_label) for variable_label in variable_labels]
+    html = []
+    html.append(f"\n\n<table cellspacing='0'>\n<thead>\n<tr><th class='{css_spaceholder}'></th>")
+    for variable_label_html in variable_labels_html:
+        html.append(f"<th class='{css_first_col_var}'>{variable_label_html}</th>")
+    html.append("</tr>\n</thead>\n<tbody>")
+    for row_idx, variable_label_html in enumerate(variable_labels_html):
+        html.append(f"\n<tr><td class='{css_lbl}'>{variable_label_html}</td>")
+        for col_idx in range(len(variable_labels_html)):
+            cell_content = '' if row_idx == col_idx else get_cell_content(row_idx, col_idx)
+            html.append(f"<td class='{css_datacell} right'>{cell_content}</td>")
+        html.append("</tr>")
+    html.append("\n</tbody>\n</table>\n")
+    return ''.join(html)
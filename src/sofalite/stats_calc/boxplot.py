@@ -1,32 +1,133 @@
+"""
+Box plot statistics (quartiles, median, whiskers, outliers) in time proportional to n - nothing is fully sorted.
 
-def get_bottom_whisker(raw_bottom_whisker, box_bottom, vals):
+Unsorted values get a single np.partition (linear-time selection) which puts every value we need
+(min, quartiles, median, max) where it would be if the values had been sorted.
+The whiskers and outliers then take one pass each.
+
+If the values are already sorted (is_sorted=True) e.g. because the extractor guarantees it,
+the order statistics are read straight off by position and the whiskers and outliers found by bisection
+- no copying of the values at all.
+
+numpy is only imported when needed (unsorted values) so importing chart modules stays light.
+"""
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+def _to_py(val):
+    """
+    Plain Python numbers out (as if we had been working with a list all along) not numpy scalars
+    """
+    return val.item() if hasattr(val, 'item') else val
+
+@dataclass(frozen=True)
+class OrderStats:
+    sample_min: float
+    lower_quartile: float
+    median: float
+    upper_quartile: float
+    sample_max: float
+
+def get_lower_quartile_positions(n: int) -> tuple[int, ...]:
+    """
+    From Wild & Seber Introduction to Probability and Statistics 1996 pp.74-77
+    Depth of quartiles is (int(n/2)+1)/2
+    (from left for LQ and from right for UQ).
+
+    Zero-based positions of the value(s) to average for the LQ.
+    1,3,4,5,60 depth = 5/2 i.e. [2.5] i.e. 2 -> 2+1 i.e. 3 -> 3/2 i.e. 1.5
+    so positions 0 and 1 i.e. lq = (1+3)/2 i.e. 2 (and uq = (5+60)/2 i.e. 32.5)
+    """
+    depth = (int(n / 2.0) + 1.0) / 2.0
+    l_depth = int(depth)  ## int truncates towards 0 but depth is always a positive number
+    if l_depth == depth:
+        return (l_depth - 1, )
+    return max(l_depth - 1, 0), l_depth  ## a single value has a depth of 0.5 - so average it with itself
+
+def get_order_stats(vals: Sequence[float], *, is_sorted=False) -> OrderStats:
+    """
+    Quartiles as per get_lower_quartile_positions and median as per statistics.median.
+
+    Args:
+        vals: list or numpy array
+        is_sorted: if True vals must be in ascending order
+    """
+    n = len(vals)
+    if not n:
+        raise Exception('No values supplied to get_order_stats.')
+    lq_positions = get_lower_quartile_positions(n)
+    uq_positions = tuple(n - 1 - lq_position for lq_position in lq_positions)  ## mirror image from the right
+    median_positions = (n // 2, ) if n % 2 else (n // 2 - 1, n // 2)
+    if is_sorted:
+        selected_vals = vals
+    else:
+        import numpy as np
+        positions = sorted({0, n - 1, *lq_positions, *median_positions, *uq_positions})
+        selected_vals = np.partition(vals, positions)  ## the only copy
+
+    def get_val(positions: tuple[int, ...]) -> float:
+        if len(positions) == 1:
+            return _to_py(selected_vals[positions[0]])
+        lower_position, upper_position = positions
+        return (_to_py(selected_vals[lower_position]) + _to_py(selected_vals[upper_position])) / 2.0
+
+    return OrderStats(
+        sample_min=_to_py(selected_vals[0]),
+        lower_quartile=get_val(lq_positions),
+        median=get_val(median_positions),
+        upper_quartile=get_val(uq_positions),
+        sample_max=_to_py(selected_vals[n - 1]),
+    )
+
+def get_bottom_whisker(raw_bottom_whisker, box_bottom, vals, *, is_sorted=False):
     """
     Make no lower than the minimum value within (inclusive) 1.5*iqr below lq.
     Must never go above box_bottom.
     """
     bottom_whisker = raw_bottom_whisker  ## init
-    for val in sorted(vals):  ## going upwards
-        if val < raw_bottom_whisker:
-            pass  ## keep going up
-        elif val >= raw_bottom_whisker:
-            bottom_whisker = val
-            break
+    if is_sorted:
+        idx = bisect_left(vals, raw_bottom_whisker)  ## first val >= raw_bottom_whisker
+        if idx < len(vals):
+            bottom_whisker = _to_py(vals[idx])
+    else:
+        import numpy as np
+        vals = np.asarray(vals)
+        inside_vals = vals[vals >= raw_bottom_whisker]
+        if len(inside_vals):
+            bottom_whisker = inside_vals.min().item()
     if bottom_whisker > box_bottom:
         bottom_whisker = box_bottom
     return bottom_whisker
 
-def get_top_whisker(raw_top_whisker, box_top, vals):
+def get_top_whisker(raw_top_whisker, box_top, vals, *, is_sorted=False):
     """
     Make sure no higher than the maximum value within (inclusive)
     1.5*iqr above uq. Must never fall below ubox.
     """
     top_whisker = raw_top_whisker  ## init
-    for val in reversed(vals):  ## going downwards
-        if val > raw_top_whisker:
-            pass  ## keep going down
-        elif val <= raw_top_whisker:
-            top_whisker = val
-            break
+    if is_sorted:
+        idx = bisect_right(vals, raw_top_whisker) - 1  ## last val <= raw_top_whisker
+        if idx >= 0:
+            top_whisker = _to_py(vals[idx])
+    else:
+        import numpy as np
+        vals = np.asarray(vals)
+        inside_vals = vals[vals <= raw_top_whisker]
+        if len(inside_vals):
+            top_whisker = inside_vals.max().item()
     if top_whisker < box_top:
         top_whisker = box_top
     return top_whisker
+
+def get_outliers(vals, bottom_whisker, top_whisker, *, is_sorted=False) -> list[float]:
+    """
+    Values beyond the whiskers - in ascending order. Only the outliers themselves are ever sorted.
+    """
+    if is_sorted:
+        n_below = bisect_left(vals, bottom_whisker)
+        above_idx = bisect_right(vals, top_whisker)
+        return [_to_py(val) for val in vals[:n_below]] + [_to_py(val) for val in vals[above_idx:]]
+    import numpy as np
+    vals = np.asarray(vals)
+    return np.sort(vals[(vals < bottom_whisker) | (vals > top_whisker)]).tolist()
@@ -9,19 +9,21 @@ Code below here is modified versions of code in stats.py and pstats.py
 from collections.abc import Sequence
 import copy
 import decimal
+from fractions import Fraction
 import math
 
 import numpy as np
 
 from sofalite import logger
-from sofalite.conf.main import MAX_RANK_DATA_VALS
+from sofalite.conf.main import MAX_EXACT_DPS, MAX_RANK_DATA_VALS
+from sofalite.stats_calc import special
 from sofalite.stats_calc.interfaces import (
-    AnovaResult, CorrelationCalcResult,
+    AnovaResult, ChiSquareTblsResult, CorrelationCalcResult, CorrelationMatrixCalcResult,
     MannWhitneyResult, MannWhitneyResultExt,
     NormalTestResult,
     NumericSampleSpec, NumericSampleSpecExt,
     OrdinalResult, RegressionResult,
-    Result, Sample, SpearmansResult, SpearmansInitTbl, TTestResult, WilcoxonResult)
+    Result, Sample, SampleMoments, SpearmansResult, SpearmansInitTbl, TTestResult, WilcoxonResult)
 from sofalite.utils.maths import n2d
 from sofalite.utils.stats import get_obriens_msg
 
@@ -114,6 +116,41 @@ def histogram(inlist, numbins=10, defaultreallimits=None, printextras=0, *, inc_
     logger.debug(f"bins={bins}, lowerreallimit={lowerreallimit}, binsize={binsize}, extrapoints={extra_points}")
     return bins, lowerreallimit, binsize, extra_points
 
+def chisquare_tbls(observed_tbls: np.ndarray) -> ChiSquareTblsResult:
+    """
+    Chi Square tests of association for a whole batch of contingency tables at once.
+
+    Args:
+        observed_tbls: n_tbls x max rows x max cols array of observed frequencies.
+          Tables of different shapes are padded with zeros - a row or column with no observations
+          is not part of the table (same as when the values come from a GROUP BY).
+
+    Expected values are row sum x col sum / total (the same as the fractions of total approach
+    in data_extraction.stats.chi_square). Also returns Cramér's V i.e. sqrt(chi square / (n x (min(rows, cols) - 1)))
+    so tables of different sizes can be compared.
+    """
+    observed_tbls = np.asarray(observed_tbls, dtype=np.float64)
+    row_sums = observed_tbls.sum(axis=2)
+    col_sums = observed_tbls.sum(axis=1)
+    ns = row_sums.sum(axis=1)
+    n_rows = (row_sums > 0).sum(axis=1)
+    n_cols = (col_sums > 0).sum(axis=1)
+    is_cell = (row_sums > 0)[:, :, None] & (col_sums > 0)[:, None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):  ## padding has an expected value of 0
+        expected_tbls = row_sums[:, :, None] * col_sums[:, None, :] / ns[:, None, None]
+        chi_squares = np.where(is_cell, (observed_tbls - expected_tbls) ** 2 / expected_tbls, 0.0).sum(axis=(1, 2))
+        cramers_vs = np.sqrt(chi_squares / (ns * (np.minimum(n_rows, n_cols) - 1)))
+    degrees_of_freedom = (n_rows - 1) * (n_cols - 1)
+    return ChiSquareTblsResult(
+        chi_squares=chi_squares,
+        ps=special.chisqprob(chi_squares, degrees_of_freedom),
+        degrees_of_freedom=degrees_of_freedom,
+        cramers_vs=cramers_vs,
+        ns=ns.astype(np.int64),
+        minimum_cell_counts=np.where(is_cell, expected_tbls, np.inf).min(axis=(1, 2)),
+        pcts_cells_lt_5=100 * (is_cell & (expected_tbls < 5)).sum(axis=(1, 2)) / (n_rows * n_cols),
+    )
+
 def chisquare(f_obs, f_exp=None, df=None):
     """
     From stats.py.  Modified to receive df (degree of freedom, not dataframe)
@@ -234,9 +271,17 @@ def get_ci95(sample_vals=None, mymean=None, mysd=None, n=None, *, high=False):
 
 def get_numeric_sample_spec_ext(sample: Sample, *, high=False) -> NumericSampleSpecExt:
     sample_vals = sample.vals
-    mymean = mean(sample_vals, high=high)
-    std_dev = stdev(sample_vals, high=high)
-    ci95 = get_ci95(sample_vals, mymean, std_dev, n=None, high=high)
+    if high:
+        n = len(sample_vals)
+        if n < 2:
+            raise Exception(f"Need more than 1 value to calculate variance. Values supplied: {sample_vals}")
+        mymean = precise_mean(sample_vals)
+        std_dev = math.sqrt(precise_sum_squared_deviations(sample_vals) / (n - 1))
+        ci95 = get_ci95(mymean=mymean, mysd=std_dev, n=n)
+    else:
+        mymean = mean(sample_vals)
+        std_dev = stdev(sample_vals)
+        ci95 = get_ci95(sample_vals, mymean, std_dev, n=None)
     normal_test_result = normal_test(sample_vals)
     kurtosis_val = (normal_test_result.c_kurtosis if normal_test_result.c_kurtosis is not None
         else "Unable to calculate kurtosis")
@@ -249,16 +294,39 @@ def get_numeric_sample_spec_ext(sample: Sample, *, high=False) -> NumericSampleS
         kurtosis=kurtosis_val, skew=skew_val, p=p, vals=sample_vals)
     return numeric_sample_spec_extended
 
+def get_numeric_sample_spec_ext_from_moments(sample_moments: SampleMoments) -> NumericSampleSpecExt:
+    """
+    As for get_numeric_sample_spec_ext but from moments (e.g. aggregated in the database) rather than values.
+    Float precision only.
+    """
+    n = sample_moments.n
+    if n < 2:
+        raise Exception(f"Need more than 1 value to calculate variance. Values supplied: {n}")
+    mymean = sample_moments.mean
+    std_dev = math.sqrt(sample_moments.m2 / float(n - 1))
+    ci95 = get_ci95(mymean=mymean, mysd=std_dev, n=n)
+    normal_test_result = normal_test_from_moments(sample_moments)
+    kurtosis_val = (normal_test_result.c_kurtosis if normal_test_result.c_kurtosis is not None
+        else "Unable to calculate kurtosis")
+    skew_val = (normal_test_result.c_skew if normal_test_result.c_skew is not None
+        else "Unable to calculate skew")
+    p = normal_test_result.p if normal_test_result.p is not None else "Unable to calculate overall p for normality test"
+    numeric_sample_spec_extended = NumericSampleSpecExt(
+        lbl=sample_moments.lbl, n=n, mean=mymean, std_dev=std_dev,
+        sample_min=sample_moments.sample_min, sample_max=sample_moments.sample_max, ci95=ci95,
+        kurtosis=kurtosis_val, skew=skew_val, p=p)
+    return numeric_sample_spec_extended
+
 def anova(group_lbl: str, measure_fld_lbl: str, samples: Sequence[Sample], *, high=True) -> AnovaResult:
     """
     From NIST algorithm used for their ANOVA tests.
 
     Note - keep anova_lite following same logic as here but without the extras.
 
-    :param bool high: high precision but much, much slower. Multiplies each by
-     10 (and divides by 10 and 100 as appropriate) plus uses decimal rather than
-     floating point. Needed to handle difficult datasets e.g. ANOVA test 9 from
-     NIST site.
+    :param bool high: high precision. Needed to handle difficult datasets e.g. ANOVA test 9 from NIST site.
+     Originally Decimal arithmetic (inflating by 10 first) - very slow. Now exact integer arithmetic
+     where the values allow (see get_exact_ints()), otherwise correctly-rounded (math.fsum) sums of floats
+     - the same results as Decimal at a fraction of the cost.
     """
     orig_samples_vals = [sample.vals for sample in samples]
     n_samples = len(orig_samples_vals)
@@ -267,28 +335,24 @@ def anova(group_lbl: str, measure_fld_lbl: str, samples: Sequence[Sample], *, hi
     for sample in samples:
         sample_spec_extended = get_numeric_sample_spec_ext(sample, high=high)
         group_specs.append(sample_spec_extended)
-    if high:  ## inflate for ss (sum squares) calculations only
-        ## if to 1 decimal point will push from float to integer (reduce errors)
-        ## deflates final results appropriately in get_sswn() and get_ssbn()
-        inflated_samples = []
-        for sample_vals in orig_samples_vals:
-            inflated_samples.append([x * 10 for x in sample_vals])  ## NB inflated
-        samples4ss_calc = inflated_samples
-        sample_means4ss_calc = [n2d(mean(x, high=high)) for x in samples4ss_calc]  ## NB inflated
+    if high:  ## exact (or compensated) summation over the floats - see get_sswn_precise() and get_ssbn_precise()
+        sswn = get_sswn_precise(orig_samples_vals)
     else:
-        samples4ss_calc = orig_samples_vals
-        sample_means4ss_calc = [mean(x, high=high) for x in samples4ss_calc]
-    sswn = get_sswn(samples4ss_calc, sample_means4ss_calc, high=high)
+        sample_means4ss_calc = [mean(x) for x in orig_samples_vals]
+        sswn = get_sswn(orig_samples_vals, sample_means4ss_calc)
     dfwn = sum(sample_ns) - n_samples
     mean_squ_wn = sswn / dfwn
     if mean_squ_wn == 0:
         raise ValueError(f"Inadequate variability in samples of {measure_fld_lbl} "
             f"for groups defined by {group_lbl} - mean_squ_wn is 0")
-    ssbn = get_ssbn(samples4ss_calc, sample_means4ss_calc, n_samples, sample_ns, high=high)
+    if high:
+        ssbn = get_ssbn_precise(orig_samples_vals)
+    else:
+        ssbn = get_ssbn(orig_samples_vals, sample_means4ss_calc, n_samples, sample_ns)
     dfbn = n_samples - 1
     mean_squ_bn = ssbn / dfbn
     F = mean_squ_bn / mean_squ_wn
-    p = fprob(dfbn, dfwn, F, high=high)
+    p = fprob(dfbn, dfwn, F)
     obriens_msg = get_obriens_msg(orig_samples_vals, sim_variance, high=high)
     return AnovaResult(p=p, F=F, group_specs=group_specs,
         sum_squares_within_groups=sswn, degrees_freedom_within_groups=dfwn, mean_squares_within_groups=mean_squ_wn,
@@ -305,29 +369,145 @@ def anova_p_only(samples: Sequence[Sequence[float]], *, high=True) -> float:
     orig_samples = samples
     n_samples = len(orig_samples)
     sample_ns = list(map(len, orig_samples))
-    if high:  ## inflate for ss (sum squares) calculations only
-        ## if to 1 decimal point will push from float to integer (reduce errors)
-        ## deflates final results appropriately in get_sswn() and get_ssbn()
-        inflated_samples = []
-        for sample in orig_samples:
-            inflated_samples.append([x * 10 for x in sample])  ## NB inflated
-        samples4ss_calc = inflated_samples
-        sample_means4ss_calc = [n2d(mean(x, high=high)) for x in samples4ss_calc]  ## NB inflated
+    if high:  ## exact (or compensated) summation over the floats - see get_sswn_precise() and get_ssbn_precise()
+        sswn = get_sswn_precise(orig_samples)
     else:
-        samples4ss_calc = orig_samples
-        sample_means4ss_calc = [mean(x, high=high) for x in samples4ss_calc]
-    sswn = get_sswn(samples4ss_calc, sample_means4ss_calc, high=high)
+        sample_means4ss_calc = [mean(x) for x in orig_samples]
+        sswn = get_sswn(orig_samples, sample_means4ss_calc)
     dfwn = sum(sample_ns) - n_samples
     mean_squ_wn = sswn / dfwn
     if mean_squ_wn == 0:
         raise ValueError("Inadequate variability in samples - mean_squ_wn is 0")
-    ssbn = get_ssbn(samples4ss_calc, sample_means4ss_calc, n_samples, sample_ns, high=high)
+    if high:
+        ssbn = get_ssbn_precise(orig_samples)
+    else:
+        ssbn = get_ssbn(orig_samples, sample_means4ss_calc, n_samples, sample_ns)
     dfbn = n_samples - 1
     mean_squ_bn = ssbn / dfbn
     F = mean_squ_bn / mean_squ_wn
-    p = fprob(dfbn, dfwn, F, high=high)
+    p = fprob(dfbn, dfwn, F)
     return p
 
+def anova_from_moments(group_lbl: str, measure_fld_lbl: str, samples_moments: Sequence[SampleMoments]) -> AnovaResult:
+    """
+    Same as anova() (float precision) but from each sample's moments.
+    Sum of squares within is just the sum of each sample's m2;
+    sum of squares between only needs each sample's n and mean.
+    """
+    group_specs = [get_numeric_sample_spec_ext_from_moments(sample_moments) for sample_moments in samples_moments]
+    sample_ns = [sample_moments.n for sample_moments in samples_moments]
+    sample_means = [sample_moments.mean for sample_moments in samples_moments]
+    n_samples = len(samples_moments)
+    sswn = sum(sample_moments.m2 for sample_moments in samples_moments)
+    dfwn = sum(sample_ns) - n_samples
+    mean_squ_wn = sswn / dfwn
+    if mean_squ_wn == 0:
+        raise ValueError(f"Inadequate variability in samples of {measure_fld_lbl} "
+            f"for groups defined by {group_lbl} - mean_squ_wn is 0")
+    ssbn = get_ssbn_from_moments(sample_ns, sample_means)
+    dfbn = n_samples - 1
+    mean_squ_bn = ssbn / dfbn
+    F = mean_squ_bn / mean_squ_wn
+    p = fprob(dfbn, dfwn, F)
+    obriens_msg = get_obriens_msg(samples_moments, sim_variance_from_moments)
+    return AnovaResult(p=p, F=F, group_specs=group_specs,
+        sum_squares_within_groups=sswn, degrees_freedom_within_groups=dfwn, mean_squares_within_groups=mean_squ_wn,
+        sum_squares_between_groups=ssbn, degrees_freedom_between_groups=dfbn, mean_squares_between_groups=mean_squ_bn,
+        obriens_msg=obriens_msg)
+
+def get_ssbn_from_moments(sample_ns: Sequence[int], sample_means: Sequence[float]) -> float:
+    """
+    Get sum of squares between treatment from the sizes and means of the samples.
+    """
+    n_tot = sum(sample_ns)
+    grand_mean = sum(n * sample_mean for n, sample_mean in zip(sample_ns, sample_means)) / float(n_tot)
+    ssbn = sum(n * (sample_mean - grand_mean) ** 2 for n, sample_mean in zip(sample_ns, sample_means))
+    return ssbn
+
+def get_exact_ints(vals) -> tuple[list[int], int] | None:
+    """
+    If every value is an integer, or the float nearest to a decimal with no more than MAX_EXACT_DPS decimal places
+    (e.g. 1000000000000.4 as typed in the data), return the values as integers (scaled up by 10 ** dps)
+    plus the scale. Integers can be summed and squared exactly so there is no rounding until the final division.
+    Otherwise None.
+
+    This is what the original Decimal approach achieved by multiplying by 10 (enough for 1dp data e.g. NIST)
+    but with no Decimals, and for up to MAX_EXACT_DPS decimal places.
+    """
+    vals = list(vals)
+    if all(isinstance(val, int) for val in vals):
+        return vals, 1
+    vals = np.asarray(vals, dtype=np.float64)
+    if not np.all(np.isfinite(vals)):
+        return None
+    for dps in range(MAX_EXACT_DPS + 1):
+        scale = 10 ** dps
+        scaled = np.round(vals * scale)
+        if len(scaled) and np.abs(scaled).max() >= 2 ** 53:  ## can't be sure float integers are exact
+            return None
+        if np.array_equal(scaled / scale, vals):
+            return [int(val) for val in scaled.tolist()], scale
+    return None
+
+def precise_mean(vals) -> float:
+    vals = list(vals)
+    exact_ints = get_exact_ints(vals)
+    if exact_ints:
+        ints, scale = exact_ints
+        return sum(ints) / (scale * len(ints))
+    return math.fsum(vals) / len(vals)
+
+def precise_sum_squared_deviations(vals) -> float:
+    """
+    Sum of squared deviations from the mean.
+
+    Exact integers: (n * sum(x ** 2) - sum(x) ** 2) / n with a single rounding at the end.
+
+    Otherwise: deviations from the (correctly rounded) mean. Values close to the mean subtract exactly
+    so all the information in the data survives into the deviations;
+    their squares and the correction for the mean not being exact are summed with fsum.
+    """
+    vals = list(vals)
+    n = len(vals)
+    exact_ints = get_exact_ints(vals)
+    if exact_ints:
+        ints, scale = exact_ints
+        sum_ints = sum(ints)
+        sum_squ_ints = sum(val * val for val in ints)
+        return (n * sum_squ_ints - sum_ints * sum_ints) / (n * scale * scale)
+    vals = np.asarray(vals, dtype=np.float64)
+    deviations = vals - math.fsum(vals) / n
+    return math.fsum(deviations * deviations) - math.fsum(deviations) ** 2 / n
+
+def get_sswn_precise(samples_vals: Sequence[Sequence[float]]) -> float:
+    """
+    Get sum of squares within treatment (high precision without Decimals).
+    """
+    return math.fsum(precise_sum_squared_deviations(sample_vals) for sample_vals in samples_vals)
+
+def get_ssbn_precise(samples_vals: Sequence[Sequence[float]]) -> float:
+    """
+    Get sum of squares between treatment (high precision without Decimals).
+
+    Exact integers: sum(sample_sum ** 2 / sample_n) - grand_sum ** 2 / grand_n as exact fractions.
+    Otherwise from correctly rounded means, summed with fsum.
+    """
+    sample_ns = [len(sample_vals) for sample_vals in samples_vals]
+    exact_ints = get_exact_ints([val for sample_vals in samples_vals for val in sample_vals])
+    if exact_ints:
+        ints, scale = exact_ints
+        sample_sums = []
+        start = 0
+        for n in sample_ns:
+            sample_sums.append(sum(ints[start: start + n]))
+            start += n
+        ssbn = (sum(Fraction(sample_sum ** 2, n) for sample_sum, n in zip(sample_sums, sample_ns))
+            - Fraction(sum(sample_sums) ** 2, sum(sample_ns)))
+        return float(ssbn / (scale * scale))
+    sample_means = [math.fsum(sample_vals) / len(sample_vals) for sample_vals in samples_vals]
+    grand_mean = math.fsum(val for sample_vals in samples_vals for val in sample_vals) / sum(sample_ns)
+    return math.fsum(n * (sample_mean - grand_mean) ** 2 for n, sample_mean in zip(sample_ns, sample_means))
+
 def get_sswn(samples, sample_means, *, high=False):
     """
     Get sum of squares within treatment.
@@ -492,6 +672,31 @@ def ttest_ind(sample_a: Sample, sample_b: Sample, *, use_orig_var=False) -> TTes
         group_a_spec=sample_a_spec, group_b_spec=sample_b_spec,
         degrees_of_freedom=df, obriens_msg=obriens_msg)
 
+def ttest_ind_from_moments(sample_a_moments: SampleMoments, sample_b_moments: SampleMoments) -> TTestResult:
+    """
+    Same as ttest_ind() but from each sample's moments - only n, mean, and m2 (for the variance) are needed
+    for t and p. m3 and m4 are for the skew, kurtosis, and normality test details.
+    """
+    n_a = sample_a_moments.n
+    n_b = sample_b_moments.n
+    if n_a < 2 or n_b < 2:
+        raise Exception(f"Need more than 1 value to calculate variance. Values supplied: {n_a} and {n_b}")
+    se_a = sample_a_moments.m2 / float(n_a - 1)
+    se_b = sample_b_moments.m2 / float(n_b - 1)
+    df = n_a + n_b - 2
+    svar = ((n_a - 1) * se_a + (n_b - 1) * se_b) / float(df)
+    denom = math.sqrt(svar * (1.0 / n_a + 1.0 / n_b))
+    if denom == 0:
+        raise ValueError("Inadequate variability - denom is 0")
+    sample_a_spec = get_numeric_sample_spec_ext_from_moments(sample_a_moments)
+    sample_b_spec = get_numeric_sample_spec_ext_from_moments(sample_b_moments)
+    t = (sample_a_moments.mean - sample_b_moments.mean) / denom
+    p = betai(0.5 * df, 0.5, df / (df + t * t))
+    obriens_msg = get_obriens_msg([sample_a_moments, sample_b_moments], sim_variance_from_moments)
+    return TTestResult(t=t, p=p,
+        group_a_spec=sample_a_spec, group_b_spec=sample_b_spec,
+        degrees_of_freedom=df, obriens_msg=obriens_msg)
+
 def ttest_rel(sample_a, sample_b, label_a='Sample1', label_b='Sample2'):
     """
     From stats.py - there are changes to variable labels and comments; and the
@@ -843,6 +1048,84 @@ def spearmansr(x, y, *, high_volume_ok=False) -> CorrelationCalcResult:
     ## Numerical Recipes, p.510.  They are close to tables, but not exact. (?)
     return CorrelationCalcResult(r=rs, p=probrs, degrees_of_freedom=df)
 
+def rankdata_columns(vals: np.ndarray) -> np.ndarray:
+    """
+    Same ranks as rankdata (ties get the average rank) but for every column of a 2D array at once.
+    A numpy sort per column so no need for the MAX_RANK_DATA_VALS limit.
+    """
+    n, k = vals.shape
+    ranks = np.empty((n, k), dtype=np.float64)
+    for col_idx in range(k):
+        col_vals = vals[:, col_idx]
+        order = np.argsort(col_vals, kind='stable')
+        sorted_vals = col_vals[order]
+        is_run_start = np.concatenate([[True], sorted_vals[1:] != sorted_vals[:-1]])
+        run_starts = np.flatnonzero(is_run_start)
+        run_ends = np.append(run_starts[1:], n)  ## exclusive
+        avg_ranks = (run_starts + run_ends + 1) / 2.0  ## average of ranks run_start + 1 to run_end
+        ranks[order, col_idx] = avg_ranks[np.cumsum(is_run_start) - 1]
+    return ranks
+
+def get_correlation_matrix_result(rs: np.ndarray, ts: np.ndarray, df: int) -> CorrelationMatrixCalcResult:
+    """
+    Two-tailed p values (as for pearsonr and spearmansr) for every pair in one call.
+    Only the upper triangle is calculated - then mirrored.
+    """
+    k = len(rs)
+    ps = np.full((k, k), np.nan)
+    upper_idxs = np.triu_indices(k, 1)
+    upper_ts = ts[upper_idxs]
+    is_usable = np.isfinite(rs[upper_idxs])
+    if df > 0 and is_usable.any():
+        with np.errstate(invalid='ignore'):  ## t of +/- inf (perfect correlation) => x of 0 => p of 0
+            upper_ps = np.full(len(upper_ts), np.nan)
+            upper_ts = upper_ts[is_usable]
+            upper_ps[is_usable] = special.betai(0.5 * df, 0.5, df / (df + upper_ts * upper_ts))
+        ps[upper_idxs] = upper_ps
+        ps.T[upper_idxs] = upper_ps
+    return CorrelationMatrixCalcResult(rs=rs, ps=ps, degrees_of_freedom=df)
+
+def pearsonr_matrix(vals: np.ndarray) -> CorrelationMatrixCalcResult:
+    """
+    Pearson's r and p for every pair of columns in vals (n rows x k variables) using matrix operations.
+    Centred before multiplying so, unlike pearsonr, no large sums are subtracted from each other.
+    A column with no variability gets r (and p) of nan with every other column.
+    """
+    TINY = 1.0e-30
+    n = len(vals)
+    df = n - 2
+    centred_vals = vals - vals.mean(axis=0)
+    sums_of_products = centred_vals.T @ centred_vals
+    sums_of_squares = np.diag(sums_of_products)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = np.clip(sums_of_products / np.sqrt(np.outer(sums_of_squares, sums_of_squares)), -1.0, 1.0)
+        np.fill_diagonal(rs, 1.0)
+        ts = rs * np.sqrt(df / ((1.0 - rs + TINY) * (1.0 + rs + TINY)))
+    return get_correlation_matrix_result(rs, ts, df)
+
+def spearmansr_matrix(vals: np.ndarray) -> CorrelationMatrixCalcResult:
+    """
+    Spearman's r and p for every pair of columns in vals (n rows x k variables) using matrix operations.
+    Same formula as spearmansr - the sums of squared rank differences come from
+    sum(rank_a ** 2) + sum(rank_b ** 2) - 2 * sum(rank_a * rank_b) for every pair at once.
+    Ranks are whole or half numbers so this is exact for all practical n.
+    A column with no variability gets r (and p) of nan with every other column.
+    """
+    n = len(vals)
+    df = n - 2
+    ranks = rankdata_columns(vals)
+    sums_of_squared_ranks = (ranks * ranks).sum(axis=0)
+    sums_of_rank_products = ranks.T @ ranks
+    dsqs = sums_of_squared_ranks[:, None] + sums_of_squared_ranks[None, :] - 2 * sums_of_rank_products
+    rs = 1 - 6 * dsqs / float(n * (n ** 2 - 1))
+    is_constant = (vals == vals[0]).all(axis=0)  ## the formula would give a meaningless r - nan as in pearsonr_matrix
+    rs[is_constant, :] = np.nan
+    rs[:, is_constant] = np.nan
+    np.fill_diagonal(rs, 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ts = rs * np.sqrt((n - 2) / ((rs + 1.0) * (1.0 - rs)))
+    return get_correlation_matrix_result(rs, ts, df)
+
 def spearmanr_details(sample_x, sample_y, *, high_volume_ok=False) -> SpearmansResult:
     initial_tbl = []
     n_x = len(sample_x)
@@ -1884,6 +2167,12 @@ def skewtest(a, dimension=None):
         dimension = 0
     b2 = skew(a, dimension)
     n = float(a.shape[dimension])
+    return skewtest_from_skew(b2, n)
+
+def skewtest_from_skew(b2, n):
+    """
+    The part of skewtest() after the skew has been calculated - so it can also be used with skew from moments.
+    """
     rooted_var0 = ((n + 1) * (n + 3)) / (6.0 * (n - 2))
     y = b2 * np.sqrt(rooted_var0)
     beta2 = (3.0 * (n * n + 27 * n - 70) * (n + 1) * (n + 3)) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
@@ -1922,9 +2211,16 @@ def kurtosistest(a, dimension=None):
         a = np.ravel(a)
         dimension = 0
     n = float(a.shape[dimension])
+    kurt = kurtosis(a, dimension)  ## I changed the kurtosis code to subtract the Fischer Adjustment (3)
+    return kurtosistest_from_kurtosis(kurt, n)
+
+def kurtosistest_from_kurtosis(kurt, n):
+    """
+    The part of kurtosistest() after the (Fisher) kurtosis has been calculated
+    - so it can also be used with kurtosis from moments.
+    """
     if n < 20:
         logger.warning(f'kurtosistest only valid for n>=20 ... continuing anyway, n={n}')
-    kurt = kurtosis(a, dimension)  ## I changed the kurtosis code to subtract the Fischer Adjustment (3)
     b2 = kurt + FISHER_KURTOSIS_ADJUSTMENT  ## added so b2 is exactly as it would have been in the original stats.py
     E = 3.0 * (n - 1) / (n + 1)
     varb2 = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1) * (n + 3) * (n + 5))
@@ -1989,6 +2285,36 @@ def normal_test(a, dimension=None) -> NormalTestResult:
         p = None
     return NormalTestResult(k2, p, c_skew, z_skew, c_kurtosis, z_kurtosis)
 
+# noinspection PyBroadException
+def normal_test_from_moments(sample_moments: SampleMoments) -> NormalTestResult:
+    """
+    Same as normal_test() but from moments. Skew and kurtosis only need the 2nd, 3rd, and 4th moments about the mean.
+    As in skew() and kurtosis(), zero variance means zero skew and zero kurtosis (before the Fisher adjustment).
+    """
+    n = float(sample_moments.n)
+    m2 = sample_moments.m2 / n
+    m3 = sample_moments.m3 / n
+    m4 = sample_moments.m4 / n
+    skew_val = m3 / m2 ** 1.5 if m2 != 0 else 0.0
+    kurtosis_val = (m4 / m2 ** 2 if m2 != 0 else 0.0) - FISHER_KURTOSIS_ADJUSTMENT
+    try:
+        z_skew, unused, c_skew = skewtest_from_skew(skew_val, n)
+    except Exception:
+        z_skew = None
+        c_skew = None
+    try:
+        z_kurtosis, unused, c_kurtosis = kurtosistest_from_kurtosis(kurtosis_val, n)
+    except Exception:
+        z_kurtosis = None
+        c_kurtosis = None
+    try:
+        k2 = np.power(z_skew, 2) + np.power(z_kurtosis, 2)
+        p = achisqprob(k2, 2)
+    except Exception:
+        k2 = None
+        p = None
+    return NormalTestResult(k2, p, c_skew, z_skew, c_kurtosis, z_kurtosis)
+
 ## misc
 
 def obrientransform(*args):
@@ -2064,6 +2390,43 @@ def sim_variance(samples: Sequence[Sequence[float]], *, threshold=0.05, high=Fal
     is_similar = (p >= threshold)
     return is_similar, p
 
+def sim_variance_from_moments(samples_moments: Sequence[SampleMoments], *,
+        threshold=0.05, high=False) -> tuple[bool, float]:
+    """
+    Same as sim_variance() (float precision only - high is ignored) but from moments.
+
+    O'Brien's transform of each value is a * (x - mean) ** 2 + c (a and c depending only on n and variance)
+    so the mean of the transformed values is a * m2 / n + c (which works out as the variance)
+    and their sum of squared deviations from that mean is a ** 2 * (m4 - m2 ** 2 / n).
+    That is all the ANOVA on the first two transformed samples needs.
+    """
+    for sample_moments in samples_moments:
+        if sample_moments.n < 3:
+            raise Exception(f"Must have at least 3 values in each sample to run obrientransform.\n{sample_moments}")
+    transformed_ns = []
+    transformed_means = []
+    transformed_sswn = 0
+    for sample_moments in samples_moments[:2]:  ## as in sim_variance, only the first two samples are compared
+        n = float(sample_moments.n)
+        v = sample_moments.m2 / (n - 1)
+        t3 = (n - 1.0) * (n - 2.0)
+        a = (n - 1.5) * n / t3
+        c = -(0.5 * v * (n - 1.0)) / t3
+        transformed_ns.append(sample_moments.n)
+        transformed_means.append(a * sample_moments.m2 / n + c)
+        transformed_sswn += a ** 2 * max(sample_moments.m4 - sample_moments.m2 ** 2 / n, 0)
+    dfwn = sum(transformed_ns) - len(transformed_ns)
+    mean_squ_wn = transformed_sswn / dfwn
+    if mean_squ_wn == 0:
+        raise ValueError("Inadequate variability in samples - mean_squ_wn is 0")
+    ssbn = get_ssbn_from_moments(transformed_ns, transformed_means)
+    dfbn = len(transformed_ns) - 1
+    mean_squ_bn = ssbn / dfbn
+    F = mean_squ_bn / mean_squ_wn
+    p = fprob(dfbn, dfwn, F)
+    is_similar = (p >= threshold)
+    return is_similar, p
+
 def normpdf_from_old_mpl(x, *args):
     """
     Return the normal pdf evaluated at *x*; args provides *mu*, *sigma*
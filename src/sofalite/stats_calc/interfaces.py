@@ -7,12 +7,14 @@ from collections.abc import Sequence
 from dataclasses import dataclass
 from decimal import Decimal
 from enum import StrEnum
-from statistics import median
+from typing import TYPE_CHECKING
 
-from sofalite.stats_calc.boxplot import get_bottom_whisker, get_top_whisker
+from sofalite.stats_calc.boxplot import get_bottom_whisker, get_order_stats, get_outliers, get_top_whisker
 from sofalite.stats_calc.histogram import BinSpec  ## noqa - so available for import from here as the one-stop shop for stats interfaces
 from sofalite.output.charts.scatterplot import Coord  ## TODO: put somewhere not in wrong level
-from sofalite.utils.stats import get_quartiles
+
+if TYPE_CHECKING:
+    import numpy as np
 
 ## samples
 
@@ -31,7 +33,7 @@ class NumericSampleSpecExt(NumericSampleSpec):
     kurtosis: float | str
     skew: float | str
     p: float | str
-    vals: Sequence[float]
+    vals: Sequence[float] | None = None  ## None if calculated from SampleMoments (no values fetched)
 
 @dataclass(frozen=True)
 class NumericSampleSpecFormatted:
@@ -64,6 +66,24 @@ class Sample:
     lbl: str
     vals: Sequence[float]
 
+@dataclass(frozen=True)
+class SampleMoments:
+    """
+    Everything needed for descriptive statistics, normality tests, t-tests, and ANOVA
+    without the values themselves e.g. as aggregated by the database.
+
+    m2, m3, m4: sums of squared, cubed, and 4th power deviations from the mean
+    (not divided by n so they can be combined with other samples' sums)
+    """
+    lbl: str
+    n: int
+    mean: float
+    m2: float
+    m3: float
+    m4: float
+    sample_min: float
+    sample_max: float
+
 ## other
 
 @dataclass(frozen=True)
@@ -148,6 +168,35 @@ class ChiSquareResult:
     pct_cells_lt_5: float
     chi_square_worked_result_data: ChiSquareWorkedResultData | None = None
 
+@dataclass(frozen=True)
+class ChiSquareTblsResult:
+    """
+    One element per contingency table - see engine.chisquare_tbls
+    """
+    chi_squares: 'np.ndarray'
+    ps: 'np.ndarray'
+    degrees_of_freedom: 'np.ndarray'
+    cramers_vs: 'np.ndarray'
+    ns: 'np.ndarray'
+    minimum_cell_counts: 'np.ndarray'
+    pcts_cells_lt_5: 'np.ndarray'
+
+@dataclass(frozen=True)
+class AssociationMatrixResult:
+    """
+    Symmetric k x k arrays (for k variables) - nan on the diagonal and for any pair not tested.
+    pair2msg has the reason a pair wasn't tested (keyed by variable name pair in the order supplied) e.g. too many values.
+    """
+    variable_names: Sequence[str]
+    chi_squares: 'np.ndarray'
+    ps: 'np.ndarray'
+    degrees_of_freedom: 'np.ndarray'
+    cramers_vs: 'np.ndarray'
+    ns: 'np.ndarray'
+    minimum_cell_counts: 'np.ndarray'
+    pcts_cells_lt_5: 'np.ndarray'
+    pair2msg: dict[tuple[str, str], str]
+
 @dataclass(frozen=True)
 class MannWhitneyResult:
     lbl: str
@@ -185,6 +234,26 @@ class CorrelationCalcResult:
     p: float
     degrees_of_freedom: int
 
+@dataclass(frozen=True)
+class CorrelationMatrixCalcResult:
+    """
+    rs and ps are symmetric k x k arrays (for k variables) - r of 1 and p of nan on the diagonal.
+    nan elsewhere if a variable has no variability.
+    """
+    rs: 'np.ndarray'
+    ps: 'np.ndarray'
+    degrees_of_freedom: int
+
+@dataclass(frozen=True)
+class CorrelationMatrixResult:
+    """
+    n is the number of rows with values for every variable (the only rows used)
+    """
+    variable_names: Sequence[str]
+    n: int
+    pearsons: CorrelationMatrixCalcResult
+    spearmans: CorrelationMatrixCalcResult
+
 @dataclass(frozen=True)
 class RegressionResult:
     slope: float
@@ -274,35 +343,43 @@ class BoxplotType(StrEnum):
 
 @dataclass(frozen=False)
 class BoxResult:
+    """
+    is_sorted: set if vals are already in ascending order (e.g. as guaranteed by the extractor)
+    so positions can be read off directly. Otherwise linear-time selection is used - no full sort either way.
+    """
     vals: Sequence[float]
     boxplot_type: BoxplotType = BoxplotType.INSIDE_1_POINT_5_TIMES_IQR
+    is_sorted: bool = False
 
     def __post_init__(self):
         """
         lower_box_val=box_spec.lower_box_val,
         upper_box_val=box_spec.upper_box_val,
         """
-        min_measure = min(self.vals)
-        max_measure = max(self.vals)
+        if self.is_sorted:
+            vals = self.vals
+        else:
+            import numpy as np
+            vals = np.asarray(self.vals)  ## no copy if already an array
+        order_stats = get_order_stats(vals, is_sorted=self.is_sorted)
         ## box
-        lower_quartile, upper_quartile = get_quartiles(self.vals)
-        self.box_bottom = lower_quartile
-        self.box_top = upper_quartile
+        self.box_bottom = order_stats.lower_quartile
+        self.box_top = order_stats.upper_quartile
         ## median
-        self.median = median(self.vals)
+        self.median = order_stats.median
         ## whiskers
         if self.boxplot_type == BoxplotType.MIN_MAX_WHISKERS:
-            self.bottom_whisker = min_measure
-            self.top_whisker = max_measure
+            self.bottom_whisker = order_stats.sample_min
+            self.top_whisker = order_stats.sample_max
         else:
             iqr = self.box_top - self.box_bottom
             raw_bottom_whisker = self.box_bottom - (1.5 * iqr)
             raw_top_whisker = self.box_top + (1.5 * iqr)
-            self.bottom_whisker = get_bottom_whisker(raw_bottom_whisker, self.box_bottom, self.vals)
-            self.top_whisker = get_top_whisker(raw_top_whisker, self.box_top, self.vals)
+            self.bottom_whisker = get_bottom_whisker(
+                raw_bottom_whisker, self.box_bottom, vals, is_sorted=self.is_sorted)
+            self.top_whisker = get_top_whisker(raw_top_whisker, self.box_top, vals, is_sorted=self.is_sorted)
         ## outliers
         if self.boxplot_type == BoxplotType.INSIDE_1_POINT_5_TIMES_IQR:
-            self.outliers = [x for x in self.vals
-                if x < self.bottom_whisker or x > self.top_whisker]
+            self.outliers = get_outliers(vals, self.bottom_whisker, self.top_whisker, is_sorted=self.is_sorted)
         else:
             self.outliers = []  ## hidden or inside whiskers
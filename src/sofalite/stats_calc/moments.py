@@ -0,0 +1,124 @@
+"""
+Moments (n, mean, and sums of 2nd, 3rd, and 4th power deviations from the mean) accumulated a chunk at a time
+and merged across chunks or partitions without ever having all the values in memory.
+
+Merging uses the pairwise update formulas of Chan, Golub, & LeVeque (1979) extended to the 3rd and 4th moments
+(Pébay 2008). Only the difference between the two means is ever raised to a power so, unlike raw power sums
+(sum of x, sum of x squared etc.), nothing large is subtracted from something else large
+i.e. no catastrophic cancellation. Within a chunk the moments come from deviations from the chunk mean
+(numpy, so fast) - the chunk is the unit of work, not the value.
+
+E.g.
+
+    accumulator = MomentsAccumulator()
+    for chunk in chunks:
+        accumulator.update(chunk)
+    sample_moments = accumulator.to_sample_moments(lbl='Male')
+
+or for shards processed in parallel:
+
+    total = MomentsAccumulator()
+    for shard_accumulator in shard_accumulators:
+        total.merge(shard_accumulator)
+"""
+from collections.abc import Sequence
+from dataclasses import dataclass
+import math
+
+import numpy as np
+
+from sofalite.stats_calc.interfaces import SampleMoments
+
+@dataclass(frozen=False)
+class MomentsAccumulator:
+    n: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    m3: float = 0.0
+    m4: float = 0.0
+    sample_min: float = math.inf
+    sample_max: float = -math.inf
+
+    @staticmethod
+    def from_vals(vals: Sequence[float]) -> 'MomentsAccumulator':
+        """
+        Two-pass over one chunk of values (all in memory anyway)
+        """
+        vals = np.asarray(vals, dtype=np.float64)
+        n = len(vals)
+        if not n:
+            return MomentsAccumulator()
+        mean = float(vals.mean())
+        deviations = vals - mean
+        squared_deviations = deviations * deviations
+        return MomentsAccumulator(n=n, mean=mean,
+            m2=float(squared_deviations.sum()),
+            m3=float((squared_deviations * deviations).sum()),
+            m4=float((squared_deviations * squared_deviations).sum()),
+            sample_min=float(vals.min()), sample_max=float(vals.max()))
+
+    @staticmethod
+    def from_shifted_sums(*, n: int, shift: float,
+            sum_d: float, sum_d2: float, sum_d3: float, sum_d4: float,
+            sample_min: float, sample_max: float) -> 'MomentsAccumulator':
+        """
+        Sums of powers of d (each value minus shift) e.g. as aggregated by the database => moments about the mean.
+        The shift should be (close to) the mean so the corrections are tiny.
+        """
+        if not n:
+            return MomentsAccumulator()
+        delta = sum_d / n  ## actual mean minus shift
+        m2 = sum_d2 - n * delta ** 2
+        m3 = sum_d3 - 3 * delta * sum_d2 + 2 * n * delta ** 3
+        m4 = sum_d4 - 4 * delta * sum_d3 + 6 * delta ** 2 * sum_d2 - 3 * n * delta ** 4
+        return MomentsAccumulator(n=n, mean=shift + delta, m2=max(m2, 0.0), m3=m3, m4=max(m4, 0.0),
+            sample_min=sample_min, sample_max=sample_max)
+
+    def update(self, vals: Sequence[float]) -> 'MomentsAccumulator':
+        """
+        Add a chunk of values
+        """
+        return self.merge(MomentsAccumulator.from_vals(vals))
+
+    def merge(self, other: 'MomentsAccumulator') -> 'MomentsAccumulator':
+        """
+        Combine with the moments of another (non-overlapping) set of values. Order doesn't matter.
+        """
+        if not other.n:
+            return self
+        if not self.n:
+            self.n, self.mean, self.m2, self.m3, self.m4 = other.n, other.mean, other.m2, other.m3, other.m4
+            self.sample_min, self.sample_max = other.sample_min, other.sample_max
+            return self
+        n_a, n_b = self.n, other.n
+        n = n_a + n_b
+        delta = other.mean - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n_a * n_b  ## delta ** 2 * n_a * n_b / n
+        mean = self.mean + delta_n * n_b
+        m4 = (self.m4 + other.m4
+            + term1 * delta_n2 * (n_a * n_a - n_a * n_b + n_b * n_b)
+            + 6 * delta_n2 * (n_a * n_a * other.m2 + n_b * n_b * self.m2)
+            + 4 * delta_n * (n_a * other.m3 - n_b * self.m3))
+        m3 = (self.m3 + other.m3
+            + term1 * delta_n * (n_a - n_b)
+            + 3 * delta_n * (n_a * other.m2 - n_b * self.m2))
+        m2 = self.m2 + other.m2 + term1
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+        self.sample_min = min(self.sample_min, other.sample_min)
+        self.sample_max = max(self.sample_max, other.sample_max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """
+        Using n - 1 (as for engine.variance)
+        """
+        if self.n < 2:
+            raise Exception(f"Need more than 1 value to calculate variance. Values supplied: {self.n}")
+        return self.m2 / float(self.n - 1)
+
+    def to_sample_moments(self, lbl: str) -> SampleMoments:
+        return SampleMoments(lbl=lbl, n=self.n, mean=self.mean, m2=self.m2, m3=self.m3, m4=self.m4,
+            sample_min=self.sample_min, sample_max=self.sample_max)
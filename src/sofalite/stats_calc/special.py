@@ -0,0 +1,160 @@
+"""
+Array versions of the special functions engine uses to turn test statistics into p values
+(zprob, chisqprob, gammln, betacf, betai, fprob) so the p values for a whole batch of tests
+come from one call instead of one pure-Python series expansion per test e.g.
+
+    p_vals = special.fprob(dfbns, dfwns, Fs)
+
+Arguments can be scalars or arrays (broadcast against each other as usual in numpy).
+Results are always float64 arrays - 0-d if every argument was a scalar.
+
+The algorithms are the same as for the scalar functions in engine so the answers are the same
+to within floating point noise. The only exception is gammln which uses math.lgamma
+rather than the Numerical Recipes series (which is only good to about 10 significant figures).
+Iterative parts (the betacf continued fraction and the chisqprob series) work on every element at once,
+freezing each element as it finishes.
+"""
+import math
+
+import numpy as np
+
+from sofalite import logger
+
+def _to_arrays(*args) -> list[np.ndarray]:
+    return np.broadcast_arrays(*[np.asarray(arg, dtype=np.float64) for arg in args])
+
+def zprob(z) -> np.ndarray:
+    """
+    Area under the normal curve 'to the left of' z. See engine.zprob (same polynomial approximation).
+
+    For any z, 2.0 * (1.0 - zprob(abs(z))) is the 2-tail probability.
+    """
+    Z_MAX = 6.0  ## maximum meaningful z-value
+    z = np.asarray(z, dtype=np.float64)
+    y = np.minimum(0.5 * np.fabs(z), Z_MAX * 0.5)  ## clipped so the polynomials never overflow - all 1.0 at the clip anyway
+    w = y * y
+    x_small_y = ((((((((0.000124818987 * w
+                        - 0.001075204047) * w + 0.005198775019) * w
+                      - 0.019198292004) * w + 0.059054035642) * w
+                    - 0.151968751364) * w + 0.319152932694) * w
+                  - 0.531923007300) * w + 0.797884560593) * y * 2.0
+    y2 = y - 2.0
+    x_large_y = (((((((((((((-0.000045255659 * y2
+                             + 0.000152529290) * y2 - 0.000019538132) * y2
+                           - 0.000676904986) * y2 + 0.001390604284) * y2
+                         - 0.000794620820) * y2 - 0.002034254874) * y2
+                       + 0.006549791214) * y2 - 0.010557625006) * y2
+                     + 0.011630447319) * y2 - 0.009279453341) * y2
+                   + 0.005353579108) * y2 - 0.002141268741) * y2
+                 + 0.000535310849) * y2 + 0.999936657524
+    x = np.where(y >= Z_MAX * 0.5, 1.0, np.where(y < 1.0, x_small_y, x_large_y))
+    return np.where(z > 0.0, (x + 1.0) * 0.5, (1.0 - x) * 0.5)
+
+def chisqprob(chisq, df) -> np.ndarray:
+    """
+    The (1-tailed) probability value associated with each chi-square value and (integer) df.
+    See engine.chisqprob (same series from Gary Perlman's |Stat).
+    Different elements can have different degrees of freedom.
+    """
+    BIG = 20.0
+
+    def ex(x):
+        return np.where(x < -BIG, 0.0, np.exp(np.maximum(x, -BIG)))
+
+    chisq, df = _to_arrays(chisq, df)
+    is_even = (df % 2 == 0)
+    a = 0.5 * chisq
+    with np.errstate(divide='ignore', invalid='ignore'):  ## chisq <= 0 gets 1.0 at the end regardless
+        y = ex(-a)
+        s = np.where(is_even, y, 2.0 * zprob(-np.sqrt(chisq)))
+        ## the series for df > 2 - one term per step for every element still short of its limit
+        limit = 0.5 * (df - 1.0)
+        z = np.where(is_even, 1.0, 0.5)
+        ## a > BIG
+        e_big_a = np.where(is_even, 0.0, math.log(math.sqrt(math.pi)))
+        c_big_a = np.log(a)
+        s_big_a = s
+        ## otherwise
+        e = np.where(is_even, 1.0, 1.0 / math.sqrt(math.pi) / np.sqrt(a))
+        c = np.zeros_like(a)
+        while True:
+            is_active = (z <= limit)
+            if not is_active.any():
+                break
+            e_big_a = np.where(is_active, np.log(z) + e_big_a, e_big_a)
+            s_big_a = np.where(is_active, s_big_a + ex(c_big_a * z - a - e_big_a), s_big_a)
+            e = np.where(is_active, e * (a / z), e)
+            c = np.where(is_active, c + e, c)
+            z = z + 1.0
+        probs = np.where(df > 2, np.where(a > BIG, s_big_a, c * y + s), s)
+    return np.where((chisq <= 0) | (df < 1), 1.0, probs)
+
+def gammln(xx) -> np.ndarray:
+    """
+    Natural log of the gamma function of each xx
+    """
+    return np.vectorize(math.lgamma, otypes=[np.float64])(xx)
+
+def betacf(a, b, x) -> np.ndarray:
+    """
+    Continued fraction form of the incomplete Beta function. See engine.betacf (same algorithm and tolerance).
+    Any element not converging is nan (engine.betacf returns None).
+    """
+    ITMAX = 200
+    EPS = 3.0e-7
+    a, b, x = _to_arrays(a, b, x)
+    bm = np.ones_like(x)
+    az = np.ones_like(x)
+    am = np.ones_like(x)
+    qab = a + b
+    qap = a + 1.0
+    qam = a - 1.0
+    bz = 1.0 - qab * x / qap
+    result = np.full_like(x, np.nan)
+    is_done = np.zeros(x.shape, dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):  ## finished elements carry on regardless
+        for i in range(ITMAX + 1):
+            em = i + 1.0
+            tem = em + em
+            d = em * (b - em) * x / ((qam + tem) * (a + tem))
+            ap = az + d * am
+            bp = bz + d * bm
+            d = -(a + em) * (qab + em) * x / ((qap + tem) * (a + tem))
+            app = ap + d * az
+            bpp = bp + d * bz
+            aold = az
+            am = ap / bpp
+            bm = bp / bpp
+            az = app / bpp
+            bz = 1.0
+            is_newly_done = ~is_done & (np.abs(az - aold) < (EPS * np.abs(az)))
+            result[is_newly_done] = az[is_newly_done]
+            is_done |= is_newly_done
+            if is_done.all():
+                break
+        else:
+            logger.warning('a or b too big, or ITMAX too small in betacf.')
+    return result
+
+def betai(a, b, x) -> np.ndarray:
+    """
+    Incomplete beta function I-sub-x(a,b). See engine.betai (same continued fraction formulation).
+    """
+    a, b, x = _to_arrays(a, b, x)
+    if ((x < 0.0) | (x > 1.0)).any():
+        raise ValueError(f'Bad x in betai - must all be from 0 to 1 (inclusive). Min {x.min()}; max {x.max()}')
+    with np.errstate(divide='ignore', invalid='ignore'):  ## x of 0 or 1 gets bt of 0 regardless
+        bt = np.where((x == 0.0) | (x == 1.0), 0.0,
+            np.exp(gammln(a + b) - gammln(a) - gammln(b) + a * np.log(x) + b * np.log(1.0 - x)))
+    ## one continued fraction per element, swapping a and b (and x for 1 - x) where that converges faster
+    is_direct = x < (a + 1.0) / (a + b + 2.0)
+    cf = betacf(np.where(is_direct, a, b), np.where(is_direct, b, a), np.where(is_direct, x, 1.0 - x))
+    return np.where(is_direct, bt * cf / a, 1.0 - bt * cf / b)
+
+def fprob(dfnum, dfden, F) -> np.ndarray:
+    """
+    The (1-tailed) significance level (p-value) of each F statistic
+    given the degrees of freedom for the numerator and the denominator (usually dfbn and dfwn).
+    """
+    dfnum, dfden, F = _to_arrays(dfnum, dfden, F)
+    return betai(0.5 * dfden, 0.5 * dfnum, dfden / (dfden + dfnum * F))
@@ -1,4 +1,5 @@
 from dataclasses import asdict, dataclass, fields
+import hashlib
 import re
 
 from sofalite import SQLITE_DB
@@ -32,3 +33,21 @@ def close_internal_db():
 
 def get_safer_name(raw_name):
     return re.sub('[^A-Za-z0-9]+', '_', raw_name)
+
+## Element ids derived from content so rendering the same thing twice gives byte-identical HTML
+ELEMENT_ID_PLACEHOLDER = 'sofalite_element_id'  ## render with this as the id then swap in the stable id
+STABLE_ELEMENT_ID_PATTERN = re.compile(r'sofalite_[0-9a-f]{16}(?![0-9a-f])')
+
+def get_stable_element_id(*parts) -> str:
+    """
+    Safe in HTML ids, CSS selectors, and JS variable names
+    """
+    digest = hashlib.sha256('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:16]
+    return f"sofalite_{digest}"
+
+def set_stable_element_id(html: str, *extra_parts) -> str:
+    """
+    Swap ELEMENT_ID_PLACEHOLDER in html for an id derived from the html itself (plus any extra parts
+    e.g. position in the item).
+    """
+    return html.replace(ELEMENT_ID_PLACEHOLDER, get_stable_element_id(html, *extra_parts))
@@ -7,31 +7,6 @@ from typing import Callable
 
 from sofalite.utils.maths import to_precision
 
-def get_quartiles(vals):
-    """
-    From Wild & Seber Introduction to Probability and Statistics 1996 pp.74-77
-    Depth of quartiles is (int(n/2)+1)/2
-    (from left for LQ and from right for UQ).
-    """
-    new_vals = vals[:]
-    new_vals.sort()  ## leaving vals untouched
-    n = len(new_vals)
-    if not n:
-        raise Exception('No values supplied to get_quartiles.')
-    depth = (int(n / 2.0) + 1.0) / 2.0
-    l_depth = int(depth)
-    ## NB zero-based so subtract 1 for position going upwards
-    if int(depth) == depth:
-        lq = new_vals[l_depth - 1]
-        uq = new_vals[-l_depth]
-    else:  ## int truncates towards 0 but depth is always a positive number
-        ## 1,3,4,5,60 depth = 5/2 i.e. [2.5] i.e. 2 -> 2+1 i.e. 3 -> 3/2 i.e. 1.5
-        # so lq = (1+3)/2 i.e. 2 and uq = (5+60)/2 i.e. 32.5
-        u_depth = int(depth) + 1
-        lq = (new_vals[l_depth - 1] + new_vals[u_depth - 1]) / 2.0
-        uq = (new_vals[-l_depth] + new_vals[-u_depth]) / 2.0
-    return lq, uq
-
 ## TODO: clarify what goes in here and what in sofalite.output.utils
 
 def get_p_str(p: float) -> str:
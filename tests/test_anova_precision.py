@@ -0,0 +1,87 @@
+"""
+High precision ANOVA (exact integer / fsum arithmetic) checked against the original Decimal approach
+and the certified values for the NIST StRD "SmLs" ANOVA datasets (lower difficulty 01-03, average 04-06, higher 07-09)
+https://www.itl.nist.gov/div898/strd/anova/anova.html
+
+The SmLs datasets are 9 groups centred on 1.4, 1.3, 1.5, 1.3, 1.5 ... - the first value in each group
+is the centre and the rest alternate 0.1 below and 0.1 above it. Harder datasets add 1000000 or 1000000000000.
+"""
+import random
+
+import pytest
+
+from sofalite.stats_calc import engine
+from sofalite.stats_calc.interfaces import Sample
+from sofalite.utils.maths import n2d
+
+def get_smls_samples_vals(*, n_per_group: int, offset: float) -> list[list[float]]:
+    samples_vals = []
+    for centre in [1.4, 1.3, 1.5, 1.3, 1.5, 1.3, 1.5, 1.3, 1.5]:
+        sample_vals = [round(offset + centre, 1)]  ## the float nearest the value in the data file
+        for i in range(n_per_group - 1):
+            sample_vals.append(round(offset + (centre - 0.1 if i % 2 == 0 else centre + 0.1), 1))
+        samples_vals.append(sample_vals)
+    return samples_vals
+
+def get_decimal_sswn_ssbn(samples_vals):
+    """
+    The original high precision approach - inflate by 10 and use Decimals
+    """
+    inflated_samples = [[x * 10 for x in sample_vals] for sample_vals in samples_vals]
+    sample_means = [n2d(engine.mean(x, high=True)) for x in inflated_samples]
+    sswn = engine.get_sswn(inflated_samples, sample_means, high=True)
+    ssbn = engine.get_ssbn(inflated_samples, sample_means, len(inflated_samples),
+        [len(x) for x in inflated_samples], high=True)
+    return float(sswn), float(ssbn)
+
+## dataset, n per group, offset, certified between SS, certified within SS, certified F
+SMLS_CERTIFIED = [
+    ('SmLs01', 21, 0, 1.68, 1.8, 21.0),
+    ('SmLs02', 201, 0, 16.08, 18.0, 201.0),
+    ('SmLs03', 21, 1_000_000_000_000, 1.68, 1.8, 21.0),
+    ('SmLs04', 21, 1_000_000, 1.68, 1.8, 21.0),
+    ('SmLs06', 201, 1_000_000_000_000, 16.08, 18.0, 201.0),
+    ('SmLs07', 2001, 1_000_000, 160.08, 180.0, 2001.0),
+    ('SmLs09', 2001, 1_000_000_000_000, 160.08, 180.0, 2001.0),
+]
+
+@pytest.mark.parametrize('dataset, n_per_group, offset, ssbn_certified, sswn_certified, F_certified', SMLS_CERTIFIED)
+def test_precise_anova_matches_certified_values(dataset, n_per_group, offset, ssbn_certified, sswn_certified, F_certified):
+    samples_vals = get_smls_samples_vals(n_per_group=n_per_group, offset=offset)
+    samples = [Sample(lbl=str(i), vals=sample_vals) for i, sample_vals in enumerate(samples_vals, 1)]
+    result = engine.anova('group', 'measure', samples, high=True)
+    assert result.sum_squares_between_groups == pytest.approx(ssbn_certified, rel=1e-14)
+    assert result.sum_squares_within_groups == pytest.approx(sswn_certified, rel=1e-14)
+    assert result.F == pytest.approx(F_certified, rel=1e-14)
+    assert result.degrees_freedom_within_groups == 9 * n_per_group - 9
+
+@pytest.mark.parametrize('dataset, n_per_group, offset, ssbn_certified, sswn_certified, F_certified', SMLS_CERTIFIED)
+def test_precise_sums_of_squares_match_decimal(dataset, n_per_group, offset, ssbn_certified, sswn_certified, F_certified):
+    """
+    At least as close to the certified values as Decimal. Decimal's between-groups SS is sometimes slightly out
+    (e.g. 16.080022 for SmLs02 because the means are rounded to the Decimal context precision) so only within-groups
+    SS is compared directly.
+    """
+    samples_vals = get_smls_samples_vals(n_per_group=n_per_group, offset=offset)
+    sswn_decimal, ssbn_decimal = get_decimal_sswn_ssbn(samples_vals)
+    sswn = engine.get_sswn_precise(samples_vals)
+    ssbn = engine.get_ssbn_precise(samples_vals)
+    assert sswn == pytest.approx(sswn_decimal, rel=1e-12)
+    assert abs(sswn - sswn_certified) <= abs(sswn_decimal - sswn_certified)
+    assert abs(ssbn - ssbn_certified) <= abs(ssbn_decimal - ssbn_certified)
+
+def test_precise_sums_of_squares_match_decimal_for_arbitrary_floats():
+    """
+    Values with no exact short decimal form go down the fsum path
+    """
+    rng = random.Random(1)
+    samples_vals = [[rng.gauss(50_000 + i, 3) for _ in range(500)] for i in range(4)]
+    assert engine.get_exact_ints(samples_vals[0]) is None
+    sswn_decimal, ssbn_decimal = get_decimal_sswn_ssbn(samples_vals)
+    assert engine.get_sswn_precise(samples_vals) == pytest.approx(sswn_decimal, rel=1e-12)
+    assert engine.get_ssbn_precise(samples_vals) == pytest.approx(ssbn_decimal, rel=1e-9)
+
+def test_exact_ints():
+    assert engine.get_exact_ints([1, 2, 3]) == ([1, 2, 3], 1)
+    assert engine.get_exact_ints([1000000000000.4, 2.25]) == ([100000000000040, 225], 100)
+    assert engine.get_exact_ints([0.1 + 0.2]) is None  ## 0.30000000000000004 is not the float nearest to 0.3
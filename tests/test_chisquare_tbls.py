@@ -0,0 +1,127 @@
+"""
+Chi Square tests for a zero-padded stack of tables of different shapes (as in the association matrix)
+checked table by table against chisquare and against the single Chi Square test run on each pair
+"""
+from itertools import combinations
+import sqlite3
+
+import numpy as np
+import pytest
+
+from sofalite.conf.main import DbeName
+from sofalite.data_extraction.count_cube import CountCube
+from sofalite.data_extraction.db import ExtendedCursor, get_dbe_spec
+from sofalite.data_extraction.stats import association_matrix, chi_square
+from sofalite.stats_calc import engine
+
+RNG = np.random.default_rng(1)
+
+RTOL = 1e-12
+
+VARIABLE2VALS = {
+    'a': [1, 2, 3],
+    'b': ['x', 'y'],
+    'c': [1, 2, 3, 4, 5],
+    'd': ['p', 'q', 'r', 's'],
+}
+VARIABLE2PROBS = {
+    'a': [0.5, 0.3, 0.2],
+    'b': [0.6, 0.4],
+    'c': [0.4, 0.3, 0.2, 0.07, 0.03],  ## rare values so some expected counts are under 5
+    'd': [0.25, 0.25, 0.25, 0.25],
+}
+
+@pytest.fixture(scope='module')
+def cur() -> ExtendedCursor:
+    n_rows = 300
+    con = sqlite3.connect(':memory:')
+    cur = ExtendedCursor(con.cursor())
+    cur.exe("CREATE TABLE tbl (a INTEGER, b TEXT, c INTEGER, d TEXT, e INTEGER)")
+    cols = []
+    for variable_name, vals in VARIABLE2VALS.items():
+        col = [vals[idx] for idx in RNG.choice(len(vals), size=n_rows, p=VARIABLE2PROBS[variable_name])]
+        for idx in RNG.choice(n_rows, size=15, replace=False):
+            col[idx] = None  ## missing values left out of any pair including the variable
+        cols.append(col)
+    cols.append([7, ] * n_rows)  ## only one value so can't be tested
+    cur.executemany("INSERT INTO tbl VALUES (?, ?, ?, ?, ?)", list(zip(*cols)))
+    return cur
+
+def get_padded_tbls(observed_tbls) -> np.ndarray:
+    max_rows = max(observed.shape[0] for observed in observed_tbls)
+    max_cols = max(observed.shape[1] for observed in observed_tbls)
+    padded_tbls = np.zeros((len(observed_tbls), max_rows, max_cols), dtype=np.int64)
+    for padded_tbl, observed in zip(padded_tbls, observed_tbls):
+        padded_tbl[:observed.shape[0], :observed.shape[1]] = observed
+    return padded_tbls
+
+@pytest.fixture(scope='module')
+def pairs_and_observed(cur) -> list[tuple[tuple[str, str], np.ndarray]]:
+    cube = CountCube.from_src(cur, src_tbl_name='tbl', tbl_filt_clause=None, variables=list(VARIABLE2VALS))
+    pairs_and_observed = []
+    for variable_a_name, variable_b_name in combinations(VARIABLE2VALS, 2):
+        observed, msg = association_matrix.get_pair_observed(cube, variable_a_name, variable_b_name)
+        assert observed is not None, msg
+        pairs_and_observed.append(((variable_a_name, variable_b_name), observed))
+    assert len({observed.shape for _pair, observed in pairs_and_observed}) > 1  ## mixed shapes so padding needed
+    return pairs_and_observed
+
+def test_matches_chisquare(pairs_and_observed):
+    observed_tbls = [observed for _pair, observed in pairs_and_observed]
+    result = engine.chisquare_tbls(get_padded_tbls(observed_tbls))
+    for idx, observed in enumerate(observed_tbls):
+        expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / observed.sum()
+        degrees_of_freedom = (observed.shape[0] - 1) * (observed.shape[1] - 1)
+        chi_square, p = engine.chisquare(observed.ravel().tolist(), expected.ravel().tolist(), df=degrees_of_freedom)
+        np.testing.assert_allclose([result.chi_squares[idx], result.ps[idx]], [chi_square, p], rtol=RTOL)
+        assert result.degrees_of_freedom[idx] == degrees_of_freedom
+        assert result.ns[idx] == observed.sum()
+        np.testing.assert_allclose(result.minimum_cell_counts[idx], expected.min(), rtol=RTOL)
+        assert result.pcts_cells_lt_5[idx] == 100 * (expected < 5).sum() / expected.size
+        np.testing.assert_allclose(result.cramers_vs[idx],
+            np.sqrt(chi_square / (observed.sum() * (min(observed.shape) - 1))), rtol=RTOL)
+
+def test_matches_chi_square_results(cur, pairs_and_observed):
+    dbe_spec = get_dbe_spec(DbeName.SQLITE)
+    result = engine.chisquare_tbls(get_padded_tbls([observed for _pair, observed in pairs_and_observed]))
+    assert (result.pcts_cells_lt_5 > 0).any()  ## some pairs with low expected counts
+    for idx, ((variable_a_name, variable_b_name), _observed) in enumerate(pairs_and_observed):
+        expected = chi_square.get_results(cur, dbe_spec, 'tbl', variable_a_name, variable_b_name)
+        np.testing.assert_allclose(
+            [result.chi_squares[idx], result.ps[idx], result.minimum_cell_counts[idx], result.pcts_cells_lt_5[idx]],
+            [expected.chi_square, expected.p, expected.minimum_cell_count, expected.pct_cells_lt_5], rtol=RTOL)
+        assert result.degrees_of_freedom[idx] == expected.degrees_of_freedom
+
+def test_padding_makes_no_difference(pairs_and_observed):
+    observed_tbls = [observed for _pair, observed in pairs_and_observed]
+    padded_result = engine.chisquare_tbls(get_padded_tbls(observed_tbls))
+    for idx, observed in enumerate(observed_tbls):
+        unpadded_result = engine.chisquare_tbls(observed[None, :, :])
+        for attr in ['chi_squares', 'ps', 'degrees_of_freedom', 'cramers_vs', 'ns',
+                'minimum_cell_counts', 'pcts_cells_lt_5']:
+            np.testing.assert_allclose(getattr(padded_result, attr)[idx], getattr(unpadded_result, attr)[0],
+                rtol=RTOL)
+
+def test_association_matrix_results(cur):
+    """
+    Every pair in the matrix (both halves) the same as the single Chi Square test - n/a for the untestable variable
+    """
+    dbe_spec = get_dbe_spec(DbeName.SQLITE)
+    variable_names = ['a', 'b', 'e', 'c', 'd']
+    result = association_matrix.get_results(cur, src_tbl_name='tbl', tbl_filt_clause=None,
+        variable_names=variable_names)
+    e_idx = variable_names.index('e')
+    for idx_a, idx_b in combinations(range(len(variable_names)), 2):
+        for row_idx, col_idx in [(idx_a, idx_b), (idx_b, idx_a)]:
+            if e_idx in (idx_a, idx_b):
+                assert np.isnan(result.chi_squares[row_idx, col_idx])
+                continue
+            expected = chi_square.get_results(cur, dbe_spec, 'tbl', variable_names[idx_a], variable_names[idx_b])
+            np.testing.assert_allclose(
+                [result.chi_squares[row_idx, col_idx], result.ps[row_idx, col_idx],
+                    result.minimum_cell_counts[row_idx, col_idx], result.pcts_cells_lt_5[row_idx, col_idx]],
+                [expected.chi_square, expected.p, expected.minimum_cell_count, expected.pct_cells_lt_5], rtol=RTOL)
+            assert result.degrees_of_freedom[row_idx, col_idx] == expected.degrees_of_freedom
+    assert set(result.pair2msg) == {(variable_name, 'e') for variable_name in ['a', 'b']} | {
+        ('e', variable_name) for variable_name in ['c', 'd']}
+    assert all(msg.startswith('Not enough separate values') for msg in result.pair2msg.values())
@@ -0,0 +1,83 @@
+"""
+Correlation matrices checked pair by pair against pearsonr and spearmansr (and rankdata) - with ties,
+a variable with no variability (r and p of nan), and perfectly correlated variables
+"""
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from sofalite.stats_calc import engine
+
+RNG = np.random.default_rng(1)
+
+RTOL = 1e-10
+
+def get_vals(n=60, *, with_ties=False) -> np.ndarray:
+    """
+    n rows x 4 variables, correlated with each other to varying degrees
+    """
+    a = RNG.normal(50, 10, n)
+    b = 0.8 * a + RNG.normal(0, 6, n)
+    c = -0.3 * a + RNG.normal(20, 8, n)
+    d = RNG.lognormal(1, 0.75, n)
+    vals = np.column_stack([a, b, c, d])
+    if with_ties:
+        vals = np.round(vals / 5)  ## lots of repeated values in every column
+    return vals
+
+@pytest.mark.parametrize('with_ties', [False, True])
+def test_rankdata_columns(with_ties):
+    vals = get_vals(with_ties=with_ties)
+    ranks = engine.rankdata_columns(vals)
+    for col_idx in range(vals.shape[1]):
+        np.testing.assert_array_equal(ranks[:, col_idx], engine.rankdata(vals[:, col_idx].tolist()))
+
+def test_rankdata_columns_all_tied():
+    ranks = engine.rankdata_columns(np.array([[3.0, 1.0], [3.0, 2.0], [3.0, 2.0], [3.0, 0.0]]))
+    np.testing.assert_array_equal(ranks, [[2.5, 2.0], [2.5, 3.5], [2.5, 3.5], [2.5, 1.0]])
+
+@pytest.mark.parametrize('matrix_fn, pair_fn, with_ties', [
+    (engine.pearsonr_matrix, engine.pearsonr, False),
+    (engine.pearsonr_matrix, engine.pearsonr, True),
+    (engine.spearmansr_matrix, engine.spearmansr, False),
+    (engine.spearmansr_matrix, engine.spearmansr, True),
+])
+def test_matches_pairs(matrix_fn, pair_fn, with_ties):
+    vals = get_vals(with_ties=with_ties)
+    result = matrix_fn(vals)
+    k = vals.shape[1]
+    assert result.degrees_of_freedom == len(vals) - 2
+    np.testing.assert_array_equal(result.rs, result.rs.T)
+    np.testing.assert_array_equal(result.ps, result.ps.T)
+    np.testing.assert_array_equal(np.diag(result.rs), np.ones(k))
+    assert np.isnan(np.diag(result.ps)).all()
+    for i, j in combinations(range(k), 2):
+        expected = pair_fn(vals[:, i].tolist(), vals[:, j].tolist())
+        np.testing.assert_allclose([result.rs[i, j], result.ps[i, j]], [expected.r, expected.p], rtol=RTOL)
+        assert result.degrees_of_freedom == expected.degrees_of_freedom
+
+@pytest.mark.parametrize('matrix_fn', [engine.pearsonr_matrix, engine.spearmansr_matrix])
+def test_constant_column_not_available(matrix_fn):
+    vals = get_vals()
+    vals[:, 2] = 7.0
+    result = matrix_fn(vals)
+    for other_idx in (0, 1, 3):
+        assert np.isnan(result.rs[2, other_idx]) and np.isnan(result.rs[other_idx, 2])
+        assert np.isnan(result.ps[2, other_idx]) and np.isnan(result.ps[other_idx, 2])
+    with pytest.raises(ValueError):
+        engine.pearsonr(vals[:, 2].tolist(), vals[:, 0].tolist())  ## inadequate variability
+    ## every other pair is unaffected
+    expected = matrix_fn(vals[:, [0, 1, 3]])
+    np.testing.assert_allclose(result.rs[np.ix_([0, 1, 3], [0, 1, 3])], expected.rs, rtol=RTOL)
+    np.testing.assert_allclose(result.ps[np.ix_([0, 1, 3], [0, 1, 3])], expected.ps, rtol=RTOL)
+
+@pytest.mark.parametrize('matrix_fn', [engine.pearsonr_matrix, engine.spearmansr_matrix])
+def test_perfect_correlation(matrix_fn):
+    """
+    pearsonr gets by with TINY and spearmansr gives up - the matrix gives r of +/-1 and p of 0
+    """
+    a = RNG.normal(50, 10, 30)
+    result = matrix_fn(np.column_stack([a, 2 * a + 3, -a]))
+    np.testing.assert_allclose(result.rs, [[1, 1, -1], [1, 1, -1], [-1, -1, 1]], rtol=RTOL)
+    np.testing.assert_allclose(result.ps[np.triu_indices(3, 1)], 0, atol=1e-12)
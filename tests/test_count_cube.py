@@ -0,0 +1,199 @@
+"""
+Count cube slices checked against counts made directly from the rows (the same counts the old GROUP BY
+per combination of totalled variables gave us)
+"""
+from collections import Counter
+from itertools import product
+import sqlite3
+
+import numpy as np
+import pytest
+
+from sofalite.conf.var_labels import VarLabels, VarLabelSpec
+from sofalite.data_extraction.count_cube import CountCube
+from sofalite.data_extraction.db import ExtendedCursor
+from sofalite.output.tables.interfaces import BLANK, TOTAL, Metric, Sort
+from sofalite.output.tables.utils.count_cube import get_block_metrics_strs, get_dim_cells
+from sofalite.output.tables.utils.multi_index_sort import get_sorted_multi_index_list
+
+ROWS = [
+    (1, 'x', 10), (1, 'x', 10), (1, 'y', 20), (1, None, 10),
+    (2, 'x', 20), (2, 'y', 10), (2, 'y', 10), (2, 'y', 20), (2, None, 20), (2, None, 20),
+    (1, 'y', 10), (2, 'x', 10),
+]
+VARIABLES = ['a', 'b', 'c']
+VAR_LABELS = VarLabels([
+    VarLabelSpec(name='a', lbl='A', val2lbl={1: 'One', 2: 'Two'}),
+    VarLabelSpec(name='b', lbl='B'),
+    VarLabelSpec(name='c', lbl='C'),
+])
+
+@pytest.fixture(scope='module')
+def cube() -> CountCube:
+    con = sqlite3.connect(':memory:')
+    cur = ExtendedCursor(con.cursor())
+    cur.exe("CREATE TABLE tbl (a INTEGER, b TEXT, c INTEGER)")
+    cur.executemany("INSERT INTO tbl VALUES (?, ?, ?)", ROWS)
+    return CountCube.from_src(cur, src_tbl_name='tbl', tbl_filt_clause=None, variables=VARIABLES)
+
+def get_expected_counts(variables, totalled_variables=()) -> Counter:
+    """
+    Every combination of totalled / not totalled for the totalled variables - TOTAL instead of the value when totalled
+    """
+    idxs = [VARIABLES.index(var) for var in variables]
+    counts = Counter()
+    for is_totalled_flags in product(*[(False, True) if var in totalled_variables else (False, ) for var in variables]):
+        for row in ROWS:
+            key = tuple(TOTAL if is_totalled else row[idx] for idx, is_totalled in zip(idxs, is_totalled_flags))
+            counts[key] += 1
+    return counts
+
+def get_freq(cube, variables, totalled_variables, key) -> int:
+    freqs = cube.get_freqs(variables, totalled_variables=totalled_variables)
+    vals_by_var = [cube.var2vals[var] + ([TOTAL, ] if var in totalled_variables else []) for var in variables]
+    return int(freqs[tuple(vals.index(val) for vals, val in zip(vals_by_var, key))])
+
+def test_var2vals_includes_null_group(cube):
+    assert sorted(cube.var2vals['a']) == [1, 2]
+    assert set(cube.var2vals['b']) == {'x', 'y', None}
+    assert int(cube.freqs.sum()) == len(ROWS)
+
+@pytest.mark.parametrize('variables, totalled_variables', [
+    (['a'], []),
+    (['b'], ['b']),
+    (['a', 'b'], []),
+    (['a', 'b'], ['a']),
+    (['b', 'a'], ['a', 'b']),
+    (['c', 'b', 'a'], ['b', 'c']),
+    ([], []),
+])
+def test_get_freqs(cube, variables, totalled_variables):
+    freqs = cube.get_freqs(variables, totalled_variables=totalled_variables)
+    assert freqs.shape == tuple(len(cube.var2vals[var]) + (var in totalled_variables) for var in variables)
+    expected_counts = get_expected_counts(variables, totalled_variables)
+    for key, expected_count in expected_counts.items():
+        assert get_freq(cube, variables, totalled_variables, key) == expected_count
+    ## every other cell has no rows
+    assert int(freqs.sum()) == sum(expected_counts.values())
+
+def test_get_freqs_total_slots(cube):
+    freqs = cube.get_freqs(['a', 'b'], totalled_variables=['a', 'b'])
+    np.testing.assert_array_equal(freqs[-1, :], freqs[:-1, :].sum(axis=0))
+    np.testing.assert_array_equal(freqs[:, -1], freqs[:, :-1].sum(axis=1))
+    assert freqs[-1, -1] == len(ROWS)
+
+@pytest.mark.parametrize('variables, totalled_variables', [
+    (['a', 'b'], []),
+    (['a', 'b'], ['b']),
+    (['b', 'c'], ['b', 'c']),
+    (['a', 'b', 'c'], ['a', 'c']),
+])
+def test_get_data(cube, variables, totalled_variables):
+    data = cube.get_data(variables, totalled_variables=totalled_variables)
+    assert all(row[-1] > 0 for row in data)  ## only cells with counts
+    assert Counter({tuple(row[:-1]): row[-1] for row in data}) == get_expected_counts(variables, totalled_variables)
+    assert len(data) == len(get_expected_counts(variables, totalled_variables))  ## no repeats
+
+def test_get_dim_cells(cube):
+    dim_cells = get_dim_cells(cube, VAR_LABELS, dim_vars=['a', 'b'], totalled_variables=['b'], n_fillers=1)
+    expected_lbls = set()
+    for (a_val, b_val), _n in get_expected_counts(['a', 'b'], ['b']).items():
+        expected_lbls.add(('A', VAR_LABELS.get_val_lbls('a', [a_val])[0], 'B', str(b_val), BLANK, BLANK))
+    assert set(dim_cells.lbls) == expected_lbls
+    assert len(dim_cells.lbls) == len(expected_lbls)
+    assert ('A', 'One', 'B', 'None', BLANK, BLANK) in dim_cells.lbls  ## NULL is a group like any other
+    assert ('A', 'Two', 'B', TOTAL, BLANK, BLANK) in dim_cells.lbls
+    ## idxs point at the cells the lbls describe
+    freqs = cube.get_freqs(['a', 'b'], totalled_variables=['b'])
+    assert (freqs.ravel()[dim_cells.idxs] > 0).all()
+    assert len(dim_cells.idxs) == len(dim_cells.lbls)
+
+def test_get_dim_cells_leaves_out_empty_cells(cube):
+    dim_cells = get_dim_cells(cube, VAR_LABELS, dim_vars=['a', 'b', 'c'], totalled_variables=[], n_fillers=0)
+    freqs = cube.get_freqs(['a', 'b', 'c'])
+    assert len(dim_cells.lbls) == int((freqs > 0).sum()) < freqs.size
+    assert ('A', 'One', 'B', 'None', 'C', '20') not in dim_cells.lbls  ## no rows with that combination
+
+def get_block(cube, *, row_vars, col_vars, totalled_variables, metrics, dp=2):
+    row_dim_cells = get_dim_cells(cube, VAR_LABELS, dim_vars=row_vars,
+        totalled_variables=[var for var in row_vars if var in totalled_variables], n_fillers=0)
+    col_dim_cells = get_dim_cells(cube, VAR_LABELS, dim_vars=col_vars,
+        totalled_variables=[var for var in col_vars if var in totalled_variables], n_fillers=0)
+    strs_by_metric = get_block_metrics_strs(cube, row_vars=row_vars, col_vars=col_vars,
+        totalled_variables=totalled_variables, metrics=metrics,
+        row_idxs=row_dim_cells.idxs, col_idxs=col_dim_cells.idxs, dp=dp)
+    return row_dim_cells, col_dim_cells, strs_by_metric
+
+@pytest.mark.parametrize('totalled_variables', [[], ['a'], ['b'], ['a', 'b']])
+def test_get_block_metrics_strs(cube, totalled_variables):
+    dp = 2
+    row_dim_cells, col_dim_cells, (freq_strs, row_pct_strs, col_pct_strs) = get_block(cube,
+        row_vars=['a'], col_vars=['b'], totalled_variables=totalled_variables,
+        metrics=[Metric.FREQ, Metric.ROW_PCT, Metric.COL_PCT], dp=dp)
+    ## counts with no TOTAL slots - totals (and percentage denominators) worked out here
+    counts = get_expected_counts(['a', 'b'])
+    a_vals, b_vals = cube.var2vals['a'], cube.var2vals['b']
+    for i, row_lbl in enumerate(row_dim_cells.lbls):
+        a_lbl = row_lbl[1]
+        row_a_vals = a_vals if a_lbl == TOTAL else [VAR_LABELS.get_vals('a', [a_lbl])[0]]
+        for j, col_lbl in enumerate(col_dim_cells.lbls):
+            b_lbl = col_lbl[1]
+            col_b_vals = b_vals if b_lbl == TOTAL else [None if b_lbl == 'None' else b_lbl]
+            freq = sum(counts[(a_val, b_val)] for a_val in row_a_vals for b_val in col_b_vals)
+            row_tot = sum(counts[(a_val, b_val)] for a_val in row_a_vals for b_val in b_vals)
+            col_tot = sum(counts[(a_val, b_val)] for a_val in a_vals for b_val in col_b_vals)
+            assert freq_strs[i, j] == str(freq)
+            assert float(row_pct_strs[i, j]) == round(100 * freq / row_tot, dp)
+            assert float(col_pct_strs[i, j]) == round(100 * freq / col_tot, dp)
+            assert len(row_pct_strs[i, j].split('.')[1]) == dp
+            assert len(col_pct_strs[i, j].split('.')[1]) == dp
+
+def test_get_block_metrics_strs_pct_of_totals(cube):
+    row_dim_cells, col_dim_cells, (row_pct_strs, col_pct_strs) = get_block(cube,
+        row_vars=['a'], col_vars=['b'], totalled_variables=['a', 'b'], metrics=[Metric.ROW_PCT, Metric.COL_PCT])
+    total_col_idx = [lbl[1] for lbl in col_dim_cells.lbls].index(TOTAL)
+    total_row_idx = [lbl[1] for lbl in row_dim_cells.lbls].index(TOTAL)
+    assert set(row_pct_strs[:, total_col_idx]) == {'100.00'}
+    assert set(col_pct_strs[total_row_idx, :]) == {'100.00'}
+
+def test_get_block_metrics_strs_nested_cols(cube):
+    """
+    Row % is within each combination of the other column variables (per b here, across c)
+    """
+    _row_dim_cells, col_dim_cells, (freq_strs, row_pct_strs) = get_block(cube,
+        row_vars=['a'], col_vars=['b', 'c'], totalled_variables=['c'], metrics=[Metric.FREQ, Metric.ROW_PCT])
+    freqs = freq_strs.astype(int)
+    b_lbls = [lbl[1] for lbl in col_dim_cells.lbls]
+    c_lbls = [lbl[3] for lbl in col_dim_cells.lbls]
+    for j, (b_lbl, c_lbl) in enumerate(zip(b_lbls, c_lbls)):
+        total_j = next(k for k, (b, c) in enumerate(zip(b_lbls, c_lbls)) if b == b_lbl and c == TOTAL)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            expected = np.round(100 * freqs[:, j] / freqs[:, total_j], 2)
+        np.testing.assert_array_equal(np.where(np.isnan(expected), 0, expected), row_pct_strs[:, j].astype(float))
+
+@pytest.mark.parametrize('sort_order, expected_a_lbls', [
+    (Sort.INCREASING, ['One', 'Two', TOTAL]),
+    (Sort.DECREASING, ['Two', 'One', TOTAL]),
+])
+def test_sort_by_freq_labelled(cube, sort_order, expected_a_lbls):
+    """
+    Frequencies come from the cube by value (not by comparing labels to the raw values)
+    """
+    dim_cells = get_dim_cells(cube, VAR_LABELS, dim_vars=['a'], totalled_variables=['a'], n_fillers=0)
+    sorted_lbls = get_sorted_multi_index_list(list(dim_cells.lbls),
+        order_rules_for_multi_index_branches={('a', ): (0, sort_order)}, var_labels=VAR_LABELS, cube=cube,
+        has_metrics=False)
+    assert [lbl[1] for lbl in sorted_lbls] == expected_a_lbls
+
+def test_sort_by_freq_within_parent(cube):
+    dim_cells = get_dim_cells(cube, VAR_LABELS, dim_vars=['a', 'b'], totalled_variables=['a', 'b'], n_fillers=0)
+    sorted_lbls = get_sorted_multi_index_list(list(dim_cells.lbls),
+        order_rules_for_multi_index_branches={('a', 'b'): (0, Sort.LBL, 0, Sort.DECREASING)}, var_labels=VAR_LABELS,
+        cube=cube, has_metrics=False)
+    counts = get_expected_counts(['a', 'b'], ['a'])
+    for a_lbl in ['One', 'Two', TOTAL]:
+        a_val = TOTAL if a_lbl == TOTAL else VAR_LABELS.get_vals('a', [a_lbl])[0]
+        b_lbls = [lbl[3] for lbl in sorted_lbls if lbl[1] == a_lbl]
+        assert b_lbls[-1] == TOTAL
+        b_freqs = [counts[(a_val, None if b_lbl == 'None' else b_lbl)] for b_lbl in b_lbls[:-1]]
+        assert b_freqs == sorted(b_freqs, reverse=True)
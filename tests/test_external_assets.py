@@ -0,0 +1,53 @@
+"""
+Externally written assets - every URL must resolve (the way a browser would) to a file that was actually written
+"""
+import base64
+import re
+from urllib.parse import urljoin
+from urllib.request import url2pathname
+
+from sofalite.output.interfaces import (
+    AssetCollector, AssetKey, AssetType, ExternalAssetsConf, externalise_images, get_asset_html)
+
+PNG = base64.b64encode(b'\x89PNG\r\n\x1a\n not really a png').decode()
+
+def get_external_assets(tmp_path) -> ExternalAssetsConf:
+    return ExternalAssetsConf(asset_dpath=tmp_path / 'assets', asset_url_root='assets', images_as_files=True)
+
+def to_fpath(url: str):
+    return url2pathname(url.removeprefix('file://'))
+
+def test_css_asset_images_relative_to_css_file(tmp_path):
+    """
+    The table CSS for grey_spirals has an embedded background image
+    """
+    external_assets = get_external_assets(tmp_path)
+    report_url = (tmp_path / 'report.html').as_uri()
+    asset_html = get_asset_html(AssetKey(AssetType.STYLED_MAIN_TBL_CSS, 'grey_spirals'), external_assets)
+    href, = re.findall(r'href="([^"]+)"', asset_html)
+    css_url = urljoin(report_url, href)
+    css = open(to_fpath(css_url)).read()
+    img_urls = re.findall(r'url\(([^)]+)\)', css)
+    assert img_urls
+    for img_url in img_urls:
+        assert '/' not in img_url.strip('\'"')  ## next to the CSS file
+        img_fpath = to_fpath(urljoin(css_url, img_url.strip('\'"')))
+        assert open(img_fpath, 'rb').read()
+        assert img_fpath.startswith(str(external_assets.asset_dpath))
+
+def test_item_images_relative_to_report(tmp_path):
+    external_assets = get_external_assets(tmp_path)
+    report_url = (tmp_path / 'report.html').as_uri()
+    item_html = AssetCollector(external_assets).get_item_html(f"<img src='data:image/png;base64,{PNG}'>")
+    src, = re.findall(r"src='([^']+)'", item_html)
+    assert src.startswith('assets/')
+    assert open(to_fpath(urljoin(report_url, src)), 'rb').read() == base64.b64decode(PNG)
+
+def test_same_image_written_once(tmp_path):
+    external_assets = get_external_assets(tmp_path)
+    html = f"data:image/png;base64,{PNG} and again data:image/png;base64,{PNG}"
+    assert externalise_images(html, external_assets) == 'assets/{0} and again assets/{0}'.format(
+        next((tmp_path / 'assets').iterdir()).name)
+    assert externalise_images(html, external_assets, is_css_asset=True) == '{0} and again {0}'.format(
+        next((tmp_path / 'assets').iterdir()).name)
+    assert len(list((tmp_path / 'assets').iterdir())) == 1
@@ -0,0 +1,112 @@
+"""
+t-tests, ANOVA, normality tests, and O'Brien's test from sample moments checked against the versions using the values
+"""
+import numpy as np
+import pytest
+
+from sofalite.stats_calc import engine
+from sofalite.stats_calc.interfaces import Sample
+from sofalite.stats_calc.moments import MomentsAccumulator
+
+RNG = np.random.default_rng(1)
+
+RTOL = 1e-13
+
+def get_samples(*, sizes=(40, 55, 70), skewed=False) -> list[Sample]:
+    samples = []
+    for i, size in enumerate(sizes):
+        if skewed:
+            vals = 20 + RNG.lognormal(1, 0.75, size)
+        else:
+            vals = RNG.normal(100 + 3 * i, 10 + i, size)
+        samples.append(Sample(lbl=f"Group {i + 1}", vals=vals.tolist()))
+    return samples
+
+def get_samples_moments(samples: list[Sample]):
+    return [MomentsAccumulator.from_vals(sample.vals).to_sample_moments(lbl=sample.lbl) for sample in samples]
+
+def check_group_specs_match(group_specs_from_moments, group_specs):
+    for spec_from_moments, spec in zip(group_specs_from_moments, group_specs, strict=True):
+        assert (spec_from_moments.lbl, spec_from_moments.n) == (spec.lbl, spec.n)
+        assert (spec_from_moments.sample_min, spec_from_moments.sample_max) == (spec.sample_min, spec.sample_max)
+        np.testing.assert_allclose(
+            [spec_from_moments.mean, spec_from_moments.std_dev, *spec_from_moments.ci95,
+                spec_from_moments.skew, spec_from_moments.kurtosis, spec_from_moments.p],
+            [spec.mean, spec.std_dev, *spec.ci95, spec.skew, spec.kurtosis, spec.p], rtol=RTOL)
+
+@pytest.mark.parametrize('skewed', [False, True])
+def test_ttest_ind_from_moments(skewed):
+    sample_a, sample_b = get_samples(sizes=(35, 48), skewed=skewed)
+    sample_a_moments, sample_b_moments = get_samples_moments([sample_a, sample_b])
+    expected = engine.ttest_ind(sample_a, sample_b)
+    result = engine.ttest_ind_from_moments(sample_a_moments, sample_b_moments)
+    np.testing.assert_allclose([result.t, result.p], [expected.t, expected.p], rtol=RTOL)
+    assert result.degrees_of_freedom == expected.degrees_of_freedom
+    assert result.obriens_msg == expected.obriens_msg
+    check_group_specs_match([result.group_a_spec, result.group_b_spec], [expected.group_a_spec, expected.group_b_spec])
+
+@pytest.mark.parametrize('skewed', [False, True])
+def test_anova_from_moments(skewed):
+    samples = get_samples(sizes=(40, 55, 70, 33), skewed=skewed)
+    expected = engine.anova('Group', 'Measure', samples, high=False)
+    result = engine.anova_from_moments('Group', 'Measure', get_samples_moments(samples))
+    np.testing.assert_allclose(
+        [result.F, result.p, result.sum_squares_within_groups, result.sum_squares_between_groups,
+            result.mean_squares_within_groups, result.mean_squares_between_groups],
+        [expected.F, expected.p, expected.sum_squares_within_groups, expected.sum_squares_between_groups,
+            expected.mean_squares_within_groups, expected.mean_squares_between_groups], rtol=RTOL)
+    assert result.degrees_freedom_within_groups == expected.degrees_freedom_within_groups
+    assert result.degrees_freedom_between_groups == expected.degrees_freedom_between_groups
+    assert result.obriens_msg == expected.obriens_msg
+    check_group_specs_match(result.group_specs, expected.group_specs)
+
+def test_anova_from_moments_no_variability():
+    samples = [Sample(lbl='a', vals=[5.0, 5.0, 5.0]), Sample(lbl='b', vals=[7.0, 7.0, 7.0])]
+    with pytest.raises(ValueError):
+        engine.anova('Group', 'Measure', samples, high=False)
+    with pytest.raises(ValueError):
+        engine.anova_from_moments('Group', 'Measure', get_samples_moments(samples))
+
+@pytest.mark.parametrize('size, skewed', [(25, False), (200, False), (60, True), (1_000, True)])
+def test_normal_test_from_moments(size, skewed):
+    sample, = get_samples(sizes=(size, ), skewed=skewed)
+    expected = engine.normal_test(sample.vals)
+    result = engine.normal_test_from_moments(get_samples_moments([sample])[0])
+    np.testing.assert_allclose(
+        [result.k2, result.p, result.c_skew, result.z_skew, result.c_kurtosis, result.z_kurtosis],
+        [expected.k2, expected.p, expected.c_skew, expected.z_skew, expected.c_kurtosis, expected.z_kurtosis],
+        rtol=RTOL)
+    np.testing.assert_allclose(result.c_skew, engine.skew(sample.vals), rtol=RTOL)
+    np.testing.assert_allclose(result.c_kurtosis, engine.kurtosis(sample.vals), rtol=RTOL)
+
+def test_normal_test_from_moments_too_few():
+    """
+    Too few values for the normality test - no overall p either way
+    """
+    sample, = get_samples(sizes=(3, ))
+    expected = engine.normal_test(sample.vals)
+    result = engine.normal_test_from_moments(get_samples_moments([sample])[0])
+    assert (result.k2, result.p) == (expected.k2, expected.p) == (None, None)
+
+@pytest.mark.parametrize('skewed', [False, True])
+def test_sim_variance_from_moments(skewed):
+    samples = get_samples(sizes=(30, 45), skewed=skewed)
+    samples_vals = [sample.vals for sample in samples]
+    expected_is_similar, expected_p = engine.sim_variance(samples_vals)
+    is_similar, p = engine.sim_variance_from_moments(get_samples_moments(samples))
+    assert is_similar == expected_is_similar
+    np.testing.assert_allclose(p, expected_p, rtol=RTOL)
+
+def test_sim_variance_from_moments_only_first_two_samples():
+    samples = get_samples(sizes=(30, 45, 60))
+    _is_similar, expected_p = engine.sim_variance([sample.vals for sample in samples])
+    _is_similar, p = engine.sim_variance_from_moments(get_samples_moments(samples))
+    _is_similar, p_first_two = engine.sim_variance_from_moments(get_samples_moments(samples[:2]))
+    np.testing.assert_allclose([p, p_first_two], [expected_p, expected_p], rtol=RTOL)
+
+def test_sim_variance_from_moments_too_few():
+    samples = [Sample(lbl='a', vals=[1.0, 2.0]), Sample(lbl='b', vals=[1.0, 2.0, 4.0])]
+    with pytest.raises(Exception):
+        engine.sim_variance([sample.vals for sample in samples])
+    with pytest.raises(Exception):
+        engine.sim_variance_from_moments(get_samples_moments(samples))
@@ -0,0 +1,188 @@
+"""
+Moments accumulated a chunk at a time, merged across shards, and from the database's shifted sums
+checked against exact moments - on values with a large offset where raw power sums would lose everything
+"""
+from dataclasses import replace
+from fractions import Fraction
+import math
+import sqlite3
+
+import numpy as np
+import pytest
+
+from sofalite.conf.main import DbeName
+from sofalite.data_extraction.db import ExtendedCursor, get_dbe_spec
+from sofalite.data_extraction.interfaces import ValSpec
+from sofalite.data_extraction.utils import get_samples_moments, get_samples_moments_streamed
+from sofalite.stats_calc.moments import MomentsAccumulator
+
+RNG = np.random.default_rng(1)
+
+OFFSET = 1e9
+
+def get_vals(n=2_000, *, offset=OFFSET) -> list[float]:
+    return (offset + RNG.lognormal(0, 0.5, n)).tolist()  ## skewed so m3 isn't ~0
+
+def get_exact_moments(vals) -> tuple[float, ...]:
+    """
+    n, mean, m2, m3, m4 - exact (rational) arithmetic on the floats then rounded
+    """
+    exact_vals = [Fraction(val) for val in vals]
+    n = len(exact_vals)
+    exact_mean = sum(exact_vals) / n
+    deviations = [val - exact_mean for val in exact_vals]
+    return (n, float(exact_mean), *(float(sum(deviation ** power for deviation in deviations)) for power in (2, 3, 4)))
+
+def check_moments(accumulator: MomentsAccumulator, vals):
+    n, exact_mean, exact_m2, exact_m3, exact_m4 = get_exact_moments(vals)
+    assert accumulator.n == n
+    assert (accumulator.sample_min, accumulator.sample_max) == (min(vals), max(vals))
+    np.testing.assert_allclose(accumulator.mean, exact_mean, rtol=1e-15)
+    ## a float mean near 1e9 can only be within half an ulp (about 6e-8) of the exact mean
+    ## and every deviation inherits that so that's as good as the sums of powers of deviations can get
+    np.testing.assert_allclose([accumulator.m2, accumulator.m3, accumulator.m4], [exact_m2, exact_m3, exact_m4],
+        rtol=1e-6)
+
+def test_from_vals():
+    vals = get_vals()
+    check_moments(MomentsAccumulator.from_vals(vals), vals)
+
+def test_raw_power_sums_fail():
+    """
+    Why not sums of x and x squared - at this offset the variance is lost completely
+    """
+    vals = get_vals()
+    n, _exact_mean, exact_m2, _exact_m3, _exact_m4 = get_exact_moments(vals)
+    naive_m2 = math.fsum(val * val for val in vals) - math.fsum(vals) ** 2 / n
+    assert abs(naive_m2 - exact_m2) > 0.5 * exact_m2
+
+@pytest.mark.parametrize('chunk_sizes', [
+    [1, ] * 50,
+    [7, 0, 300, 1, 2, 999],
+    [2_000, ],
+    [500, ] * 4,
+])
+def test_update_in_chunks(chunk_sizes):
+    vals = get_vals(sum(chunk_sizes))
+    accumulator = MomentsAccumulator()
+    start = 0
+    for chunk_size in chunk_sizes:
+        accumulator.update(vals[start: start + chunk_size])
+        start += chunk_size
+    check_moments(accumulator, vals)
+    whole = MomentsAccumulator.from_vals(vals)
+    np.testing.assert_allclose([accumulator.mean, accumulator.m2, accumulator.m3, accumulator.m4],
+        [whole.mean, whole.m2, whole.m3, whole.m4], rtol=1e-6)
+
+def test_merge():
+    """
+    Shards merged in any order or grouping give the same moments
+    """
+    vals = get_vals(3_000)
+    shards_vals = [vals[:10], vals[10:1_700], vals[1_700:1_701], vals[1_701:]]
+    shard_accumulators = [MomentsAccumulator.from_vals(shard_vals) for shard_vals in shards_vals]
+    forwards = MomentsAccumulator()
+    for shard_accumulator in shard_accumulators:
+        forwards.merge(MomentsAccumulator(**vars(shard_accumulator)))
+    backwards = MomentsAccumulator()
+    for shard_accumulator in reversed(shard_accumulators):
+        backwards.merge(MomentsAccumulator(**vars(shard_accumulator)))
+    pairs = (MomentsAccumulator(**vars(shard_accumulators[0])).merge(shard_accumulators[2])
+        .merge(MomentsAccumulator(**vars(shard_accumulators[1])).merge(shard_accumulators[3])))
+    for accumulator in (forwards, backwards, pairs):
+        check_moments(accumulator, vals)
+
+def test_merge_empty():
+    vals = get_vals(100)
+    accumulator = MomentsAccumulator.from_vals(vals)
+    assert MomentsAccumulator().merge(accumulator) == accumulator
+    assert MomentsAccumulator(**vars(accumulator)).merge(MomentsAccumulator()) == accumulator
+    assert MomentsAccumulator().update([]) == MomentsAccumulator()
+
+@pytest.mark.parametrize('shift_error', [0, 0.37, -25])
+def test_from_shifted_sums(shift_error):
+    """
+    As the database supplies them - shifted by (roughly) the mean
+    """
+    vals = get_vals()
+    shift = math.fsum(vals) / len(vals) + shift_error
+    deviations = [val - shift for val in vals]
+    accumulator = MomentsAccumulator.from_shifted_sums(n=len(vals), shift=shift,
+        sum_d=math.fsum(deviations), sum_d2=math.fsum(d ** 2 for d in deviations),
+        sum_d3=math.fsum(d ** 3 for d in deviations), sum_d4=math.fsum(d ** 4 for d in deviations),
+        sample_min=min(vals), sample_max=max(vals))
+    check_moments(accumulator, vals)
+
+def test_from_shifted_sums_empty():
+    assert MomentsAccumulator.from_shifted_sums(n=0, shift=0, sum_d=0, sum_d2=0, sum_d3=0, sum_d4=0,
+        sample_min=0, sample_max=0) == MomentsAccumulator()
+
+def test_variance():
+    vals = get_vals(100, offset=0)
+    np.testing.assert_allclose(MomentsAccumulator.from_vals(vals).variance, np.var(vals, ddof=1), rtol=1e-13)
+    with pytest.raises(Exception):
+        _variance = MomentsAccumulator.from_vals([1.0]).variance
+
+@pytest.fixture
+def cur() -> ExtendedCursor:
+    con = sqlite3.connect(':memory:')
+    cur = ExtendedCursor(con.cursor())
+    cur.exe("CREATE TABLE tbl (grp INTEGER, grp_name TEXT, val REAL)")
+    grps = RNG.integers(1, 4, 1_000).tolist()
+    rows = [(grp, f"Group {grp}", val) for grp, val in zip(grps, get_vals(1_000))]
+    rows += [(None, None, 1.0), (1, 'Group 1', None)]  ## missing values left out
+    cur.executemany("INSERT INTO tbl VALUES (?, ?, ?)", rows)
+    return cur
+
+@pytest.mark.parametrize('grouping_fld_name, grouping_vals, is_numeric', [
+    ('grp', [1, 2, 3], True),
+    ('grp_name', ['Group 3', 'Group 1'], False),
+])
+def test_streamed_matches_aggregate(cur, grouping_fld_name, grouping_vals, is_numeric):
+    dbe_spec = get_dbe_spec(DbeName.SQLITE)
+    kwargs = dict(cur=cur, src_tbl_name='tbl', grouping_filt_fld_name=grouping_fld_name,
+        grouping_filt_val_specs=[ValSpec(val=val, lbl=str(val)) for val in grouping_vals],
+        grouping_filt_val_is_numeric=is_numeric, measure_fld_name='val', tbl_filt_clause='val > 1000000000.5')
+    aggregated = get_samples_moments(dbe_spec=dbe_spec, **kwargs)
+    streamed = get_samples_moments_streamed(dbe_spec=dbe_spec, chunk_size=37, **kwargs)
+    other_dbe = get_samples_moments(dbe_spec=replace(dbe_spec, dbe_name='other'), **kwargs)  ## streams
+    for aggregated_moments, streamed_moments, other_dbe_moments in zip(aggregated, streamed, other_dbe, strict=True):
+        assert aggregated_moments.lbl == streamed_moments.lbl == other_dbe_moments.lbl
+        assert aggregated_moments.n == streamed_moments.n == other_dbe_moments.n
+        for moments in (streamed_moments, other_dbe_moments):
+            np.testing.assert_allclose(
+                [moments.mean, moments.m2, moments.m3, moments.m4, moments.sample_min, moments.sample_max],
+                [aggregated_moments.mean, aggregated_moments.m2, aggregated_moments.m3, aggregated_moments.m4,
+                    aggregated_moments.sample_min, aggregated_moments.sample_max], rtol=1e-6)
+    assert sum(moments.n for moments in streamed) == cur.cur.connection.execute(
+        f"SELECT COUNT(*) FROM tbl WHERE val > 1000000000.5 AND {grouping_fld_name} IN "
+        f"({', '.join(repr(val) for val in grouping_vals)})").fetchone()[0]
+
+def test_streamed_too_few(cur):
+    with pytest.raises(Exception):
+        get_samples_moments_streamed(cur=cur, dbe_spec=get_dbe_spec(DbeName.SQLITE), src_tbl_name='tbl',
+            grouping_filt_fld_name='grp', grouping_filt_val_specs=[ValSpec(val=99, lbl='99')],
+            grouping_filt_val_is_numeric=True, measure_fld_name='val')
+
+def test_group_matched_by_database():
+    """
+    Groups are matched the way the database filters e.g. a TEXT field holding '1' and '2' is in groups 1 and 2
+    """
+    con = sqlite3.connect(':memory:')
+    cur = ExtendedCursor(con.cursor())
+    cur.exe("CREATE TABLE tbl (grp TEXT, val REAL)")
+    cur.executemany("INSERT INTO tbl VALUES (?, ?)",
+        [(str(grp), val) for grp, val in zip(RNG.integers(1, 3, 20).tolist(), get_vals(20, offset=0))])
+    dbe_spec = get_dbe_spec(DbeName.SQLITE)
+    kwargs = dict(cur=cur, src_tbl_name='tbl', grouping_filt_fld_name='grp',
+        grouping_filt_val_specs=[ValSpec(val=1, lbl='1'), ValSpec(val=2, lbl='2')],
+        grouping_filt_val_is_numeric=True, measure_fld_name='val')
+    expected_ns = [cur.cur.connection.execute(f"SELECT COUNT(*) FROM tbl WHERE grp = {grp}").fetchone()[0]
+        for grp in (1, 2)]
+    assert sum(expected_ns) == 20
+    aggregated = get_samples_moments(dbe_spec=dbe_spec, **kwargs)
+    streamed = get_samples_moments_streamed(dbe_spec=dbe_spec, chunk_size=7, **kwargs)
+    for samples_moments in (aggregated, streamed):
+        assert [moments.n for moments in samples_moments] == expected_ns
+    np.testing.assert_allclose([moments.mean for moments in aggregated], [moments.mean for moments in streamed],
+        rtol=1e-13)
@@ -0,0 +1,64 @@
+"""
+Array versions of the p value special functions checked against the scalar versions in engine
+"""
+import numpy as np
+import pytest
+
+from sofalite.stats_calc import engine, special
+
+RNG = np.random.default_rng(1)
+
+def test_zprob_matches_scalar():
+    zs = np.concatenate([np.linspace(-8, 8, 1601), [0, 2, -2, 3, -3, 6, -6]])
+    expected = [engine.zprob(z) for z in zs.tolist()]
+    np.testing.assert_array_equal(special.zprob(zs), expected)
+
+@pytest.mark.parametrize('df', [1, 2, 3, 4, 5, 9, 10, 24, 25, 60])
+def test_chisqprob_matches_scalar(df):
+    chisqs = np.concatenate([[-1, 0], np.geomspace(0.01, 500, 200)])  ## includes the a > 20 branch
+    expected = [engine.chisqprob(chisq, df) for chisq in chisqs.tolist()]
+    np.testing.assert_allclose(special.chisqprob(chisqs, df), expected, rtol=1e-12, atol=0)
+
+def test_chisqprob_mixed_dfs():
+    chisqs = RNG.exponential(10, 500)
+    dfs = RNG.integers(1, 40, 500)
+    expected = [engine.chisqprob(chisq, df) for chisq, df in zip(chisqs.tolist(), dfs.tolist())]
+    np.testing.assert_allclose(special.chisqprob(chisqs, dfs), expected, rtol=1e-12, atol=0)
+
+def test_gammln_matches_scalar():
+    """
+    engine.gammln is the Numerical Recipes series - only good to about 1e-10
+    """
+    xs = np.linspace(0.5, 500, 1000)
+    expected = [engine.gammln(x) for x in xs.tolist()]
+    np.testing.assert_allclose(special.gammln(xs), expected, rtol=1e-10, atol=1e-9)
+
+def test_betacf_matches_scalar():
+    a = RNG.uniform(0.5, 50, 300)
+    b = RNG.uniform(0.5, 50, 300)
+    x = RNG.uniform(0, 1, 300) * (a + 1) / (a + b + 2)  ## where betai would use it directly
+    expected = [engine.betacf(*args) for args in zip(a.tolist(), b.tolist(), x.tolist())]
+    np.testing.assert_allclose(special.betacf(a, b, x), expected, rtol=1e-12)
+
+def test_betai_matches_scalar():
+    dfs = RNG.integers(1, 500, 1000)
+    ts = RNG.normal(0, 3, 1000)
+    xs = dfs / (dfs + ts * ts)
+    expected = [engine.betai(0.5 * df, 0.5, x) for df, x in zip(dfs.tolist(), xs.tolist())]
+    np.testing.assert_allclose(special.betai(0.5 * dfs, 0.5, xs), expected, rtol=1e-8, atol=1e-12)
+    np.testing.assert_array_equal(special.betai(2, 3, [0, 1]), [0, 1])
+    with pytest.raises(ValueError):
+        special.betai(2, 3, [0.5, 1.5])
+
+def test_fprob_matches_scalar():
+    dfnums = RNG.integers(1, 30, 1000)
+    dfdens = RNG.integers(2, 3000, 1000)
+    Fs = RNG.exponential(3, 1000)
+    expected = [engine.fprob(*args) for args in zip(dfnums.tolist(), dfdens.tolist(), Fs.tolist())]
+    np.testing.assert_allclose(special.fprob(dfnums, dfdens, Fs), expected, rtol=1e-8, atol=1e-12)
+
+def test_scalars_broadcast():
+    p = special.fprob(2, 10, 3.5)
+    assert p.shape == ()
+    assert float(p) == pytest.approx(engine.fprob(2, 10, 3.5), rel=1e-8)
+    assert special.chisqprob([[1, 2], [3, 4]], 3).shape == (2, 2)
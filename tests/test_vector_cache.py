@@ -0,0 +1,166 @@
+"""
+Vector cache hits, invalidation when the data changes, least recently used eviction, and one-pass grouping
+"""
+import gc
+import sqlite3
+
+import numpy as np
+
+from sofalite.conf.main import DbeName
+from sofalite.data_extraction.db import ExtendedCursor, get_dbe_spec
+from sofalite.data_extraction.interfaces import ValSpec
+from sofalite.data_extraction.utils import get_sample
+from sofalite.data_extraction.vector_cache import (
+    VectorCache, get_data_src_and_version, get_grouped_vals, get_val2idxs)
+
+RNG = np.random.default_rng(1)
+
+def get_cur(db_fpath=':memory:', *, n_rows=100) -> ExtendedCursor:
+    con = sqlite3.connect(db_fpath, isolation_level=None)  ## autocommit so nothing is left mid-transaction
+    cur = ExtendedCursor(con.cursor())
+    cur.exe("CREATE TABLE IF NOT EXISTS tbl (grp INTEGER, val REAL)")
+    cur.executemany("INSERT INTO tbl VALUES (?, ?)",
+        [(int(grp), float(val)) for grp, val in zip(RNG.integers(1, 4, n_rows), RNG.normal(50, 10, n_rows))])
+    return cur
+
+def get_vals(cur, vector_cache: VectorCache, *, fld_name='val', tbl_filt_clause=None):
+    return get_grouped_vals(cur=cur, dbe_spec=get_dbe_spec(DbeName.SQLITE), src_tbl_name='tbl',
+        fld_name=fld_name, grouping_fld_names=['grp', ], tbl_filt_clause=tbl_filt_clause, vector_cache=vector_cache)
+
+def test_hit():
+    cur = get_cur()
+    vector_cache = VectorCache()
+    grouped_vals = get_vals(cur, vector_cache)
+    assert get_vals(cur, vector_cache) is grouped_vals
+    assert get_vals(cur, vector_cache, tbl_filt_clause='val > 50') is not grouped_vals  ## different key
+    assert (vector_cache.n_hits, vector_cache.n_misses) == (1, 2)
+    assert vector_cache.n_bytes == grouped_vals.nbytes + get_vals(cur, vector_cache, tbl_filt_clause='val > 50').nbytes
+
+def test_hit_other_cursor_same_connection():
+    cur = get_cur()
+    vector_cache = VectorCache()
+    grouped_vals = get_vals(cur, vector_cache)
+    other_cur = ExtendedCursor(cur.cur.connection.cursor())
+    assert get_vals(other_cur, vector_cache) is grouped_vals
+
+def test_hit_other_connection_same_file(tmp_path):
+    """
+    e.g. report workers each with their own connection
+    """
+    db_fpath = str(tmp_path / 'test.db')
+    get_cur(db_fpath).cur.connection.close()
+    cur = ExtendedCursor(sqlite3.connect(db_fpath).cursor())
+    vector_cache = VectorCache()
+    grouped_vals = get_vals(cur, vector_cache)
+    other_cur = ExtendedCursor(sqlite3.connect(db_fpath).cursor())
+    assert get_vals(other_cur, vector_cache) is grouped_vals
+
+def test_invalidated_by_change():
+    cur = get_cur()
+    vector_cache = VectorCache()
+    grouped_vals = get_vals(cur, vector_cache)
+    cur.exe("INSERT INTO tbl VALUES (1, 1000)")
+    changed_grouped_vals = get_vals(cur, vector_cache)
+    assert changed_grouped_vals is not grouped_vals
+    assert len(changed_grouped_vals.vals) == len(grouped_vals.vals) + 1
+    assert 1000 in changed_grouped_vals.vals.tolist()
+
+def test_invalidated_by_change_in_file(tmp_path):
+    db_fpath = str(tmp_path / 'test.db')
+    cur = get_cur(db_fpath)
+    vector_cache = VectorCache()
+    grouped_vals = get_vals(cur, vector_cache)
+    other_cur = ExtendedCursor(sqlite3.connect(db_fpath, isolation_level=None).cursor())
+    other_cur.exe("DELETE FROM tbl WHERE grp = 1")  ## another connection so only the file shows the change
+    changed_grouped_vals = get_vals(cur, vector_cache)
+    assert changed_grouped_vals is not grouped_vals
+    assert 1 not in changed_grouped_vals.grouping_vals[0].tolist()
+
+def test_not_cached_mid_transaction():
+    cur = get_cur()
+    cur.exe("BEGIN")
+    cur.exe("INSERT INTO tbl VALUES (1, 1000)")
+    assert get_data_src_and_version(cur) is None
+    vector_cache = VectorCache()
+    get_vals(cur, vector_cache)
+    assert vector_cache.n_bytes == 0
+
+def test_in_memory_dbs_never_share():
+    """
+    A later in-memory database (even at the same address as a dead one) is never served the dead one's vectors
+    """
+    vector_cache = VectorCache()
+    data_srcs = set()
+    for _i in range(5):
+        cur = get_cur(n_rows=10)
+        grouped_vals = get_vals(cur, vector_cache)
+        np.testing.assert_array_equal(grouped_vals.vals,
+            [val for _grp, val in cur.cur.connection.execute("SELECT grp, val FROM tbl")])
+        data_src, _data_version = get_data_src_and_version(cur)
+        data_srcs.add(data_src)
+        cur.cur.connection.close()
+        del cur
+        gc.collect()
+    assert len(data_srcs) == 5
+    assert vector_cache.n_hits == 0
+
+def test_eviction():
+    cur = get_cur()
+    vector_cache = VectorCache()
+    by_val = get_vals(cur, vector_cache)
+    by_grp = get_vals(cur, vector_cache, fld_name='grp')
+    vector_cache.set_max_bytes(by_val.nbytes + by_grp.nbytes)
+    get_vals(cur, vector_cache)  ## by_val now most recently used
+    filtered = get_vals(cur, vector_cache, tbl_filt_clause='val > 50')
+    assert vector_cache.n_bytes <= vector_cache.max_bytes
+    assert get_vals(cur, vector_cache) is by_val
+    assert get_vals(cur, vector_cache, fld_name='grp') is not by_grp  ## least recently used so dropped
+    assert filtered.nbytes + by_val.nbytes + by_grp.nbytes > vector_cache.max_bytes
+
+def test_too_big_never_cached():
+    cur = get_cur()
+    vector_cache = VectorCache(max_bytes=10)
+    grouped_vals = get_vals(cur, vector_cache)
+    assert get_vals(cur, vector_cache) is not grouped_vals
+    assert vector_cache.n_bytes == 0
+
+def test_get_val2idxs():
+    vals = RNG.integers(1, 6, 1_000).astype(object)
+    val2idxs = get_val2idxs(vals)
+    assert list(val2idxs) == [1, 2, 3, 4, 5]
+    for val, idxs in val2idxs.items():
+        np.testing.assert_array_equal(idxs, np.flatnonzero(vals == val))
+
+def test_get_val2idxs_mixed_types():
+    vals = np.array([2, 'b', 1, 2.0, 'a', 'b', 1], dtype=object)
+    val2idxs = get_val2idxs(vals)
+    assert list(val2idxs) == [2, 'b', 1, 'a']  ## can't be sorted so in order of appearance
+    for val, idxs in val2idxs.items():
+        np.testing.assert_array_equal(idxs, np.flatnonzero(vals == val))
+
+def test_get_val2idxs_empty():
+    assert get_val2idxs(np.array([], dtype=object)) == {}
+
+def test_group_mask_matches_database():
+    """
+    Same rows as filtering in the database e.g. a TEXT field holding '1' and '2' for groups 1 and 2
+    """
+    con = sqlite3.connect(':memory:')
+    cur = ExtendedCursor(con.cursor())
+    cur.exe("CREATE TABLE tbl (grp TEXT, val REAL)")
+    grps = ['1', '2', '1.0', 'x', '2'] * 4
+    cur.executemany("INSERT INTO tbl VALUES (?, ?)", [(grp, float(i)) for i, grp in enumerate(grps)])
+    grouped_vals = get_vals(cur, VectorCache())
+    for grp_val, grp_val_is_numeric in [(1, True), (2, True), (1.0, True), ('1', False), ('1.0', False), ('x', False)]:
+        grp_val_clause = grp_val if grp_val_is_numeric else f"'{grp_val}'"
+        expected_vals = [val for val, in con.execute(f"SELECT val FROM tbl WHERE grp = {grp_val_clause}")]
+        group_mask = grouped_vals.get_group_mask('grp', grp_val, grouping_val_is_numeric=grp_val_is_numeric)
+        assert grouped_vals.vals[group_mask].tolist() == expected_vals
+        assert expected_vals
+    sample = get_sample(cur=cur, dbe_spec=get_dbe_spec(DbeName.SQLITE), src_tbl_name='tbl',
+        grouping_filt_fld_name='grp', grouping_filt_val_spec=ValSpec(val=1, lbl='One'),
+        grouping_filt_val_is_numeric=True, measure_fld_name='val')
+    assert sample.vals == [val for val, in con.execute("SELECT val FROM tbl WHERE grp = 1")]
+    mixed_grouped_vals = get_vals(get_cur(n_rows=20), VectorCache())  ## numbers as numbers
+    group_mask = mixed_grouped_vals.get_group_mask('grp', 2.0, grouping_val_is_numeric=True)
+    np.testing.assert_array_equal(group_mask, mixed_grouped_vals.grouping_vals[0] == 2)